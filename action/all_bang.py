@@ -1,13 +1,28 @@
-import asyncio, inspect
+import asyncio, inspect, logging
+from functools import partial
 from typing import cast, Any, TypedDict
 from collections.abc import Coroutine
 
-from aiohttp import ClientSession, TCPConnector
-
 import src.bang as bang
 import src.util as util
 
 NET_CONNECT_LIMIT = 20
+JOB_WORKERS = 16
+
+# 设为路径（如 './manifest.sqlite3'，放在资源目录之外）则启用资源清单
+ASSET_MANIFEST: str | None = None
+# 剧情解析进程总数，按 reader 平分；0 为在事件循环线程内解析
+PARSE_WORKERS = 0
+# 设为路径（如 './build_state.json'）则启用增量重建，输入未变的输出文件直接跳过
+BUILD_STATE: str | None = None
+# 设为路径（如 './metrics.json'）则在结束时写出各阶段的耗时与计数；
+# METRICS_PROMETHEUS 另写一份 Prometheus 文本格式
+METRICS_REPORT: str | None = None
+METRICS_PROMETHEUS: str | None = None
+# 设为路径（如 './negative_cache.json'）则记录上游确定缺失的资源，复查前不再请求
+NEGATIVE_CACHE: str | None = None
+# assets_bang.py 的续跑日志；带 --resume 运行时跳过中断前已完成的 job 与资源
+CHECKPOINT_JOURNAL = './checkpoint_bang.jsonl'
 
 LANGS: tuple[tuple[str, str], ...] = (
     ('cn', 'cn'),
@@ -60,25 +75,52 @@ def create_getters(
     }
 
 
-def add_all_tasks(
-    tasks: TaskList_type, getters: Getters_type, if_exclude_new: bool = False
+def add_all_jobs(
+    queue: util.JobQueue, getters: Getters_type, if_exclude_new: bool = False
 ) -> None:
+    '''
+    newest first for events and cards: priority is the rank from the newest
+    '''
+    main_getter = getters['main_getter']
+    band_getter = getters['band_getter']
+    event_getter = getters['event_getter']
+    card_getter = getters['card_getter']
+    area_getter = getters['area_getter']
     for lang, mark_lang in LANGS:
-        tasks.append(getters['main_getter'].get(None, lang, mark_lang))
-        tasks.append(getters['band_getter'].get(None, None, lang, mark_lang))
-        tasks.append(
-            getters['event_getter'].get_newest(
-                lang, mark_lang, quantity=0, exclude_new=2 if if_exclude_new else None
+        for story_id in main_getter.tell_ids():
+            queue.add(
+                partial(main_getter.get, [story_id], lang, mark_lang),
+                name=f'{lang} main {story_id}',
+            )
+        for band_id in band_getter.tell_band_ids():
+            queue.add(
+                partial(band_getter.get, band_id, None, lang, mark_lang),
+                name=f'{lang} band {band_id}',
             )
+        event_ids = event_getter.newest_ids(
+            lang, quantity=0, exclude_new=2 if if_exclude_new else None
         )
-        tasks.append(
-            getters['card_getter'].get_newest(
-                lang, mark_lang, quantity=0, exclude_new=10 if if_exclude_new else None
+        for rank, event_id in enumerate(reversed(event_ids)):
+            queue.add(
+                partial(event_getter.get, event_id, lang, mark_lang),
+                rank,
+                f'{lang} event {event_id}',
             )
+        card_ids = card_getter.newest_ids(
+            lang, quantity=0, exclude_new=10 if if_exclude_new else None
         )
-        for area_id in (area_getter := getters['area_getter']).tell_area_ids():
+        for rank, card_id in enumerate(reversed(card_ids)):
+            queue.add(
+                partial(card_getter.get, card_id, lang, mark_lang),
+                rank,
+                f'{lang} card {card_id}',
+            )
+        for area_id in area_getter.tell_area_ids():
             for talk_type in area_getter.types:
-                tasks.append(area_getter.get(area_id, talk_type, lang, mark_lang))
+                queue.add(
+                    partial(area_getter.get, area_id, talk_type, lang, mark_lang),
+                    name=f'{lang} talk {talk_type} {area_id}',
+                )
 
 
 async def main() -> None:
@@ -87,16 +129,49 @@ async def main() -> None:
 
     getters = create_getters(use_parent_save_dir=True, args=args)
 
-    async with ClientSession(
-        trust_env=True, connector=TCPConnector(limit=NET_CONNECT_LIMIT)
-    ) as session:
+    asset_store = util.AssetStore(ASSET_MANIFEST) if ASSET_MANIFEST else None
+    if BUILD_STATE:
+        util.BuildState.load(BUILD_STATE)
+    if NEGATIVE_CACHE:
+        util.NegativeCache.load(NEGATIVE_CACHE)
+
+    async with util.Connections.create_session(NET_CONNECT_LIMIT) as session:
         await asyncio.gather(
-            *[cast(util.Base_fetcher, obj).init(session) for obj in getters.values()]
+            *[
+                cast(util.Base_fetcher, obj).init(session, asset_store=asset_store)
+                for obj in getters.values()
+            ]
         )
 
-        tasks: TaskList_type = []
-        add_all_tasks(tasks, getters)
-        await asyncio.gather(*tasks)
+        readers = [getters['reader']]
+        if PARSE_WORKERS > 0:
+            for reader in readers:
+                reader.start_parse_pool(max(1, PARSE_WORKERS // len(readers)))
+
+        queue = util.JobQueue(JOB_WORKERS)
+        add_all_jobs(queue, getters)
+        try:
+            await queue.run()
+        finally:
+            for reader in readers:
+                reader.close_parse_pool()
+            util.BuildState.save()
+            util.NegativeCache.save()
+            util.AssetLog.flush()
+            if METRICS_REPORT:
+                util.Metrics.write_report(METRICS_REPORT, METRICS_PROMETHEUS)
+
+    logging.info(f'master cache: {util.MasterCache.stats()}')
+    logging.info(f'rate limit: {util.RateLimit.rates()}')
+    logging.info(f'mirror health: {util.MirrorHealth.report()}')
+    logging.info(f'build state: {util.BuildState.stats()}')
+    logging.info(f'negative cache: {util.NegativeCache.stats()}')
+    logging.info(f'dir index: {util.DirIndex.stats()}')
+    logging.info(f'file writes: {util.FileWrites.stats()}')
+    logging.info(f'connections: {util.Connections.report()}')
+
+    if asset_store is not None:
+        asset_store.close()
 
 
 if __name__ == '__main__':
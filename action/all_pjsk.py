@@ -1,15 +1,31 @@
-import asyncio, inspect
+import asyncio, inspect, logging
+from functools import partial
 from typing import cast, Any, TypedDict
 from collections.abc import Coroutine
 from datetime import datetime, timedelta, timezone
 
-from aiohttp import ClientSession, TCPConnector
-
 import src.pjsk as pjsk
+import src.util as util
 
 NET_CONNECT_LIMIT = 20
+JOB_WORKERS = 16
 TIMESTAMP13 = int((datetime.now(timezone.utc) + timedelta(hours=36)).timestamp() * 1000)
 
+# 设为路径（如 './manifest.sqlite3'，放在资源目录之外）则启用资源清单
+ASSET_MANIFEST: str | None = None
+# 剧情解析进程总数，按 reader 平分；0 为在事件循环线程内解析
+PARSE_WORKERS = 0
+# 设为路径（如 './build_state.json'）则启用增量重建，输入未变的输出文件直接跳过
+BUILD_STATE: str | None = None
+# 设为路径（如 './metrics.json'）则在结束时写出各阶段的耗时与计数；
+# METRICS_PROMETHEUS 另写一份 Prometheus 文本格式
+METRICS_REPORT: str | None = None
+METRICS_PROMETHEUS: str | None = None
+# 设为路径（如 './negative_cache.json'）则记录上游确定缺失的资源，复查前不再请求
+NEGATIVE_CACHE: str | None = None
+# assets_pjsk.py 的续跑日志；带 --resume 运行时跳过中断前已完成的 job 与资源
+CHECKPOINT_JOURNAL = './checkpoint_pjsk.jsonl'
+
 TaskList_type = list[Coroutine[Any, Any, Any]]
 
 
@@ -68,50 +84,65 @@ def create_getters(
     }
 
 
-def add_common_tasks(
-    tasks: TaskList_type, lang_getters: dict[str, Getters_type]
+def add_common_jobs(
+    queue: util.JobQueue, lang_getters: dict[str, Getters_type]
 ) -> None:
-    for getters in lang_getters.values():
+    for lang, getters in lang_getters.items():
         unit_getter = getters['unit_getter']
-        tasks.extend(unit_getter.get(story_id) for story_id in unit_getter.tell_ids())
+        for story_id in unit_getter.tell_ids():
+            queue.add(
+                partial(unit_getter.get, story_id), name=f'{lang} unit {story_id}'
+            )
         self_getter = getters['self_getter']
-        tasks.extend(self_getter.get(story_id) for story_id in self_getter.tell_ids())
+        for story_id in self_getter.tell_ids():
+            queue.add(
+                partial(self_getter.get, story_id), name=f'{lang} self {story_id}'
+            )
         special_getter = getters['special_getter']
-        tasks.extend(
-            special_getter.get(story_id) for story_id in special_getter.tell_ids()
-        )
+        for story_id in special_getter.tell_ids():
+            queue.add(
+                partial(special_getter.get, story_id),
+                name=f'{lang} special {story_id}',
+            )
         area_getter = getters['area_getter']
-        tasks.extend(
-            area_getter.get(category)
-            for category in area_getter.tell_categories()
-            if not isinstance(category, int)
-        )
+        for category in area_getter.tell_categories():
+            if not isinstance(category, int):
+                queue.add(
+                    partial(area_getter.get, category), name=f'{lang} talk {category}'
+                )
         mysekai_getter = getters['mysekai_getter']
-        tasks.extend(
-            mysekai_getter.get(chara_unit_id)
-            for chara_unit_id in mysekai_getter.tell_ids()
-        )
+        for chara_unit_id in mysekai_getter.tell_ids():
+            queue.add(
+                partial(mysekai_getter.get, chara_unit_id),
+                name=f'{lang} mysekai {chara_unit_id}',
+            )
 
 
-def add_timestamp_tasks(
-    tasks: TaskList_type,
+def add_timestamp_jobs(
+    queue: util.JobQueue,
     getters: Getters_type,
     timestamp13: int | None = None,
     if_exclude_new: bool = False,
 ) -> None:
-    tasks.append(
-        getters['event_getter'].get_newest(
-            0,
-            area_getter=getters['area_getter'],
-            timestamp13=timestamp13,
-            exclude_new=2 if if_exclude_new else None,
-        )
+    '''
+    newest first: priority is the rank from the newest
+    '''
+    lang = getters['reader'].lang
+    event_getter = getters['event_getter']
+    area_getter = getters['area_getter']
+    event_ids = event_getter.newest_ids(
+        0, timestamp13=timestamp13, exclude_new=2 if if_exclude_new else None
     )
-    tasks.append(
-        getters['card_getter'].get_newest(
-            0, timestamp13=timestamp13, exclude_new=10 if if_exclude_new else None
-        )
+    for rank, event_id in enumerate(reversed(event_ids)):
+        queue.add(partial(event_getter.get, event_id), rank, f'{lang} event {event_id}')
+        queue.add(partial(area_getter.get, event_id), rank, f'{lang} talk {event_id}')
+
+    card_getter = getters['card_getter']
+    card_ids = card_getter.newest_ids(
+        0, timestamp13=timestamp13, exclude_new=10 if if_exclude_new else None
     )
+    for rank, card_id in enumerate(reversed(card_ids)):
+        queue.add(partial(card_getter.get, card_id), rank, f'{lang} card {card_id}')
 
 
 async def main() -> None:
@@ -125,25 +156,55 @@ async def main() -> None:
         'en': create_getters('en', mark_lang='en', use_parent_save_dir=True, args=args),
     }
 
-    async with ClientSession(
-        trust_env=True, connector=TCPConnector(limit=NET_CONNECT_LIMIT)
-    ) as session:
+    asset_store = util.AssetStore(ASSET_MANIFEST) if ASSET_MANIFEST else None
+    if BUILD_STATE:
+        util.BuildState.load(BUILD_STATE)
+    if NEGATIVE_CACHE:
+        util.NegativeCache.load(NEGATIVE_CACHE)
+
+    async with util.Connections.create_session(NET_CONNECT_LIMIT) as session:
         await asyncio.gather(
             *[
-                cast(pjsk.Pjsk_fetcher, obj).init(session)
+                cast(pjsk.Pjsk_fetcher, obj).init(session, asset_store=asset_store)
                 for getters in lang_getters.values()
                 for obj in getters.values()
             ]
         )
 
-        tasks: TaskList_type = []
-        add_common_tasks(tasks, lang_getters)
-        add_timestamp_tasks(tasks, lang_getters['jp'], if_exclude_new=True)
+        readers = [getters['reader'] for getters in lang_getters.values()]
+        if PARSE_WORKERS > 0:
+            for reader in readers:
+                reader.start_parse_pool(max(1, PARSE_WORKERS // len(readers)))
+
+        queue = util.JobQueue(JOB_WORKERS)
+        add_common_jobs(queue, lang_getters)
+        add_timestamp_jobs(queue, lang_getters['jp'], if_exclude_new=True)
         for lang in ('cn', 'tw', 'en'):
-            add_timestamp_tasks(
-                tasks, lang_getters[lang], TIMESTAMP13, if_exclude_new=True
+            add_timestamp_jobs(
+                queue, lang_getters[lang], TIMESTAMP13, if_exclude_new=True
             )
-        await asyncio.gather(*tasks)
+        try:
+            await queue.run()
+        finally:
+            for reader in readers:
+                reader.close_parse_pool()
+            util.BuildState.save()
+            util.NegativeCache.save()
+            util.AssetLog.flush()
+            if METRICS_REPORT:
+                util.Metrics.write_report(METRICS_REPORT, METRICS_PROMETHEUS)
+
+    logging.info(f'master cache: {util.MasterCache.stats()}')
+    logging.info(f'rate limit: {util.RateLimit.rates()}')
+    logging.info(f'mirror health: {util.MirrorHealth.report()}')
+    logging.info(f'build state: {util.BuildState.stats()}')
+    logging.info(f'negative cache: {util.NegativeCache.stats()}')
+    logging.info(f'dir index: {util.DirIndex.stats()}')
+    logging.info(f'file writes: {util.FileWrites.stats()}')
+    logging.info(f'connections: {util.Connections.report()}')
+
+    if asset_store is not None:
+        asset_store.close()
 
 
 if __name__ == '__main__':
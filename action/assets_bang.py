@@ -1,16 +1,24 @@
 import asyncio, sys
 from typing import cast, Any
 
-from aiohttp import ClientSession, TCPConnector
-
 import src.util as util
 
-from .all_bang import create_getters, TaskList_type, add_all_tasks, NET_CONNECT_LIMIT
+from .all_bang import (
+    create_getters,
+    add_all_jobs,
+    NET_CONNECT_LIMIT,
+    JOB_WORKERS,
+    METRICS_REPORT,
+    METRICS_PROMETHEUS,
+    NEGATIVE_CACHE,
+    CHECKPOINT_JOURNAL,
+)
 
 
 async def main() -> None:
     assert sys.argv[1] in ('full', 'incremental')
     online = sys.argv[1] == 'full'
+    resume = '--resume' in sys.argv[2:]
 
     args: dict[str, Any] = {
         'online': online,
@@ -22,16 +30,25 @@ async def main() -> None:
 
     getters = create_getters(args=args)
 
-    async with ClientSession(
-        trust_env=True, connector=TCPConnector(limit=NET_CONNECT_LIMIT)
-    ) as session:
+    if NEGATIVE_CACHE:
+        util.NegativeCache.load(NEGATIVE_CACHE)
+    util.Checkpoint.start(CHECKPOINT_JOURNAL, resume)
+
+    async with util.Connections.create_session(NET_CONNECT_LIMIT) as session:
         await asyncio.gather(
             *[cast(util.Base_fetcher, obj).init(session) for obj in getters.values()]
         )
 
-        tasks: TaskList_type = []
-        add_all_tasks(tasks, getters)
-        await asyncio.gather(*tasks)
+        queue = util.JobQueue(JOB_WORKERS)
+        add_all_jobs(queue, getters)
+        try:
+            await queue.run()
+            util.Checkpoint.finish()
+        finally:
+            util.Checkpoint.close()
+            util.NegativeCache.save()
+            if METRICS_REPORT:
+                util.Metrics.write_report(METRICS_REPORT, METRICS_PROMETHEUS)
 
 
 if __name__ == '__main__':
@@ -1,24 +1,28 @@
 import asyncio, sys
 from typing import cast, Any
 
-from aiohttp import ClientSession, TCPConnector
-
 import src.pjsk as pjsk
+import src.util as util
 
 from .all_pjsk import (
     create_getters,
     Getters_type,
-    TaskList_type,
-    add_common_tasks,
-    add_timestamp_tasks,
+    add_common_jobs,
+    add_timestamp_jobs,
     NET_CONNECT_LIMIT,
+    JOB_WORKERS,
     TIMESTAMP13,
+    METRICS_REPORT,
+    METRICS_PROMETHEUS,
+    NEGATIVE_CACHE,
+    CHECKPOINT_JOURNAL,
 )
 
 
 async def main() -> None:
     assert sys.argv[1] in ('full', 'incremental')
     online = sys.argv[1] == 'full'
+    resume = '--resume' in sys.argv[2:]
 
     args: dict[str, Any] = {
         'online': online,
@@ -35,9 +39,11 @@ async def main() -> None:
         'en': create_getters('en', mark_lang='en', args=args),
     }
 
-    async with ClientSession(
-        trust_env=True, connector=TCPConnector(limit=NET_CONNECT_LIMIT)
-    ) as session:
+    if NEGATIVE_CACHE:
+        util.NegativeCache.load(NEGATIVE_CACHE)
+    util.Checkpoint.start(CHECKPOINT_JOURNAL, resume)
+
+    async with util.Connections.create_session(NET_CONNECT_LIMIT) as session:
         await asyncio.gather(
             *[
                 cast(pjsk.Pjsk_fetcher, obj).init(session)
@@ -46,12 +52,19 @@ async def main() -> None:
             ]
         )
 
-        tasks: TaskList_type = []
-        add_common_tasks(tasks, lang_getters)
-        add_timestamp_tasks(tasks, lang_getters['jp'])
+        queue = util.JobQueue(JOB_WORKERS)
+        add_common_jobs(queue, lang_getters)
+        add_timestamp_jobs(queue, lang_getters['jp'])
         for lang in ('cn', 'tw', 'en'):
-            add_timestamp_tasks(tasks, lang_getters[lang], TIMESTAMP13)
-        await asyncio.gather(*tasks)
+            add_timestamp_jobs(queue, lang_getters[lang], TIMESTAMP13)
+        try:
+            await queue.run()
+            util.Checkpoint.finish()
+        finally:
+            util.Checkpoint.close()
+            util.NegativeCache.save()
+            if METRICS_REPORT:
+                util.Metrics.write_report(METRICS_REPORT, METRICS_PROMETHEUS)
 
 
 if __name__ == '__main__':
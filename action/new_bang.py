@@ -1,6 +1,6 @@
 import asyncio
 
-from aiohttp import ClientSession, TCPConnector
+import src.util as util
 
 from .all_bang import (
     create_getters,
@@ -22,9 +22,7 @@ def add_new_tasks(tasks: TaskList_type, getters: Getters_type) -> None:
 async def main() -> None:
     getters = create_getters(use_parent_save_dir=True)
 
-    async with ClientSession(
-        trust_env=True, connector=TCPConnector(limit=NET_CONNECT_LIMIT)
-    ) as session:
+    async with util.Connections.create_session(NET_CONNECT_LIMIT) as session:
         await asyncio.gather(
             *[
                 getters[name].init(session)  # type: ignore[literal-required]
@@ -1,6 +1,6 @@
 import asyncio
 
-from aiohttp import ClientSession, TCPConnector
+import src.util as util
 
 from .all_pjsk import (
     create_getters,
@@ -37,9 +37,7 @@ async def main() -> None:
         'en': create_getters('en', mark_lang='en', use_parent_save_dir=True),
     }
 
-    async with ClientSession(
-        trust_env=True, connector=TCPConnector(limit=NET_CONNECT_LIMIT)
-    ) as session:
+    async with util.Connections.create_session(NET_CONNECT_LIMIT) as session:
         await asyncio.gather(
             *[
                 getters[name].init(session)  # type: ignore[literal-required]
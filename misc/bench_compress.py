@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+bench_compress.py — 各压缩档位的压缩率与吞吐量
+
+用法:
+
+    python misc/bench_compress.py [dir_or_file ...]
+
+给出目录时读取其中的 .br/.json/.asset 文件（.br 先解压）；不给时生成合成数据：
+一个大 master 和 2000 个小剧情文件。zstd 档位需安装 zstandard，
+小文件另测带共享字典（用前一半文件训练、后一半测量）的结果。
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import brotli
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def load_inputs(paths: list[str]) -> list[bytes]:
+    files: list[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files.extend(
+                f
+                for f in sorted(p.rglob('*'))
+                if f.is_file() and f.suffix in ('.br', '.json', '.asset')
+            )
+        else:
+            files.append(p)
+    return [
+        brotli.decompress(f.read_bytes()) if f.suffix == '.br' else f.read_bytes()
+        for f in files
+    ]
+
+
+def synthetic_inputs() -> tuple[list[bytes], list[bytes]]:
+    master = json.dumps(
+        [
+            {
+                'id': i,
+                'seq': i * 10,
+                'characterId': i % 26 + 1,
+                'cardRarityType': f'rarity_{i % 4 + 1}',
+                'prefix': f'card prefix {i}',
+                'releaseAt': 1600000000000 + i * 86400000,
+            }
+            for i in range(100_000)
+        ],
+        ensure_ascii=False,
+    ).encode('utf-8')
+    small = [
+        json.dumps(
+            {
+                'ScenarioId': f'areatalk_{i:05d}',
+                'AppearCharacters': [{'Character2dId': i % 50, 'CostumeType': ''}],
+                'Snippets': [
+                    {'Action': 1, 'ProgressBehavior': 1, 'ReferenceIndex': j}
+                    for j in range(6)
+                ],
+                'TalkData': [
+                    {
+                        'WindowDisplayName': f'Character{(i + j) % 26}',
+                        'Body': f'line {j} of talk {i}, something to say here.',
+                        'TalkCharacters': [{'Character2dId': (i + j) % 50}],
+                        'Voices': [{'VoiceId': f'voice_{i:05d}_{j:02d}'}],
+                    }
+                    for j in range(6)
+                ],
+            },
+            ensure_ascii=False,
+        ).encode('utf-8')
+        for i in range(2000)
+    ]
+    return [master], small
+
+
+def run(name: str, inputs: list[bytes], compress: Callable[[bytes], bytes]) -> None:
+    raw_size = sum(map(len, inputs))
+    start = time.perf_counter()
+    compressed_size = sum(len(compress(data)) for data in inputs)
+    elapsed = time.perf_counter() - start
+    print(
+        f'  {name:<22} ratio {raw_size / compressed_size:6.2f}  '
+        f'{raw_size / 2**20 / elapsed:8.2f} MiB/s'
+    )
+
+
+def bench(title: str, inputs: list[bytes], train: list[bytes] | None) -> None:
+    print(f'{title}: {len(inputs)} files, {sum(map(len, inputs)) / 2**20:.2f} MiB')
+    for quality in (4, 5, 9, 11):
+        run(
+            f'brotli q{quality}',
+            inputs,
+            lambda data, q=quality: brotli.compress(data, quality=q),
+        )
+    if zstandard is None:
+        print('  (zstandard not installed, zstd tiers skipped)')
+        return
+    for level in (3, 19):
+        cctx = zstandard.ZstdCompressor(level=level)
+        run(f'zstd {level}', inputs, cctx.compress)
+    if train:
+        dict_data = zstandard.train_dictionary(112640, train)
+        for level in (3, 19):
+            cctx = zstandard.ZstdCompressor(level=level, dict_data=dict_data)
+            run(f'zstd {level} + dict', inputs, cctx.compress)
+
+
+def main() -> None:
+    if sys.argv[1:]:
+        inputs = load_inputs(sys.argv[1:])
+        large = [data for data in inputs if len(data) > 16384]
+        small = [data for data in inputs if len(data) <= 16384]
+    else:
+        large, small = synthetic_inputs()
+
+    if large:
+        bench('large files', large, None)
+    if small:
+        half = len(small) // 2
+        bench('small files', small[half:], small[:half] if half >= 10 else None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+bench_crawl.py — 用本地镜像服务器回放录制的资源，测量爬取吞吐
+
+子命令:
+
+    record <assets_dir> <fixture_dir> [--pattern GLOB] [--limit N]
+        从爬虫保存的资源目录（save_dir，结构为 host/path[.br]）复制一份快照。
+        跳过 .validators.json 与 .zst（依赖共享字典）。
+
+    synth <fixture_dir> [--files N]
+        生成合成快照：pjsk / bang 剧情 .asset、mysekai .lua.txt 及渲染所需 master。
+
+    run <fixture_dir> [--latency MS] [--jitter MS] [--p429 P] [--p5xx P]
+        [--mirrors N] [--workers N] [--connections N] [--per-host N]
+        [--retry-delay S] [--compress] [--no-render] [--output FILE]
+        另起进程在 127.0.0.x 上启动镜像服务器（每个镜像一个地址），按
+        action/all_*.py 的方式用 JobQueue + util.fetch_url_json 获取全部文件：
+        online 阶段保存到临时目录，offline 阶段再从本地读回。剧情与 lua 按
+        内容自动选择 pjsk / bang 的 reader 渲染。结果写入 --output（JSON）。
+
+    compare <old.json> <new.json>
+        对比两次 run 的结果。
+
+CPU 时间按线程 CPU 时间统计：decode（响应 JSON 解析）、render（剧情渲染）、
+compress（brotli 压缩）、local_read（本地读取 + 解压 + 解析），其余（事件循环、
+网络、写文件）计入 other。服务器在独立进程中，不计入。
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+import brotli
+from aiohttp import web
+
+MISC_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(MISC_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, MISC_DIR)
+from src import util, pjsk, bang  # noqa: E402
+
+PORT = 18080
+
+# ---------------------------------------------------------------------------
+# 快照
+# ---------------------------------------------------------------------------
+
+
+def fixture_files(fixture_dir: Path) -> list[str]:
+    """快照中的资源相对路径（去掉 .br 后缀），即 url 去掉 scheme 的部分。"""
+    rel_paths = []
+    for p in sorted(fixture_dir.rglob('*')):
+        if p.is_file():
+            rel = p.relative_to(fixture_dir).as_posix()
+            rel_paths.append(rel[:-3] if rel.endswith('.br') else rel)
+    return rel_paths
+
+
+def read_fixture(fixture_dir: Path, rel_path: str) -> bytes | None:
+    path = fixture_dir / rel_path
+    if path.is_file():
+        return path.read_bytes()
+    br_path = fixture_dir / (rel_path + '.br')
+    if br_path.is_file():
+        return brotli.decompress(br_path.read_bytes())
+    return None
+
+
+def cmd_record(assets_dir: str, fixture_dir: str, pattern: str, limit: int) -> int:
+    src, dst = Path(assets_dir), Path(fixture_dir)
+    copied = 0
+    for p in sorted(src.rglob('*')):
+        if not p.is_file() or p.name.endswith(util.VALIDATORS_SUFFIX):
+            continue
+        if p.suffix == '.zst' or p.name == util.ZSTD_DICT_NAME:
+            continue
+        rel = p.relative_to(src).as_posix()
+        if not fnmatch.fnmatch(rel, pattern):
+            continue
+        target = dst / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(p, target)
+        copied += 1
+        if limit and copied >= limit:
+            break
+    print(f'复制 {copied} 个文件到 {dst}')
+    return 0
+
+
+def cmd_synth(fixture_dir: str, files: int) -> int:
+    import bench_story_render
+    import bench_lua_talk
+
+    dst = Path(fixture_dir)
+    rng = random.Random(0)
+
+    def write(rel_path: str, content: Any) -> None:
+        target = dst / rel_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, str):
+            target.write_text(content, encoding='utf-8')
+        else:
+            target.write_text(json.dumps(content, ensure_ascii=False), encoding='utf-8')
+
+    game_characters, character2ds = bench_story_render.pjsk_masters()
+    write('master.example/gameCharacters.json', game_characters)
+    write('master.example/character2ds.json', character2ds)
+    write(
+        'bestdori.example/api/characters/main.3.json',
+        bench_story_render.bang_characters(),
+    )
+
+    third = max(1, files // 3)
+    for i in range(third):
+        write(
+            f'pjsk.example/event_story/ev_{i // 8:03d}/scenario/'
+            f'event_{i // 8:03d}_{i % 8:02d}.asset',
+            bench_story_render.pjsk_scenario(rng),
+        )
+        write(
+            f'bestdori.example/assets/jp/scenario/eventstory/event{i // 8}/'
+            f'Scenarioevent{i // 8:02d}-{i % 8:02d}.asset',
+            bench_story_render.bang_scenario(rng),
+        )
+    for i, text in enumerate(bench_lua_talk.synthetic(files - 2 * third).values()):
+        write(f'pjsk.example/mysekai/talk/{i // 50}/talk_{i:05d}.lua.txt', text)
+    print(f'生成 {len(fixture_files(dst))} 个文件到 {dst}')
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# 镜像服务器（独立进程）
+# ---------------------------------------------------------------------------
+
+
+def serve(
+    fixture_dir: str,
+    mirrors: int,
+    latency: float,
+    jitter: float,
+    p429: float,
+    p5xx: float,
+    ready: Any,
+    stop: Any,
+) -> None:
+    root = Path(fixture_dir)
+    rng = random.Random(1)
+    cache: dict[str, bytes | None] = {}
+    counters: dict[str, int] = defaultdict(int)
+
+    async def handle(request: web.Request) -> web.Response:
+        if request.path == '/_stats':
+            return web.json_response(counters)
+        counters['requests'] += 1
+        delay = max(0.0, latency + rng.uniform(-jitter, jitter)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        roll = rng.random()
+        if roll < p429:
+            counters['429'] += 1
+            return web.Response(status=429, headers={'Retry-After': '0'})
+        if roll < p429 + p5xx:
+            counters['5xx'] += 1
+            return web.Response(status=503)
+        rel_path = request.path.lstrip('/')
+        if rel_path not in cache:
+            cache[rel_path] = read_fixture(root, rel_path)
+        body = cache[rel_path]
+        if body is None:
+            counters['404'] += 1
+            return web.Response(status=404)
+        counters['bytes'] += len(body)
+        return web.Response(body=body, content_type='application/octet-stream')
+
+    async def main() -> None:
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        for i in range(mirrors):
+            await web.TCPSite(runner, f'127.0.0.{i + 1}', PORT).start()
+        ready.set()
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+        await runner.cleanup()
+
+    asyncio.run(main())
+
+
+# ---------------------------------------------------------------------------
+# 计时
+# ---------------------------------------------------------------------------
+
+
+class CpuSplit:
+    """按类别累计线程 CPU 时间；线程池中的调用也能正确计入。"""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.seconds[name] += seconds
+
+    def wrap(self, name: str, func):
+        def wrapper(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, time.thread_time() - start)
+
+        return wrapper
+
+
+def instrument(cpu: CpuSplit, latencies: list[float]) -> None:
+    util._compress_sync = cpu.wrap('compress', util._compress_sync)
+    util._read_local_file_sync = cpu.wrap('local_read', util._read_local_file_sync)
+
+    orig_json = aiohttp.ClientResponse.json
+
+    async def json_(self, *args, **kwargs):
+        await self.read()
+        start = time.thread_time()
+        try:
+            return await orig_json(self, *args, **kwargs)
+        finally:
+            cpu.add('decode', time.thread_time() - start)
+
+    aiohttp.ClientResponse.json = json_  # type: ignore[method-assign]
+
+    orig_get_url = util._get_url
+
+    async def get_url(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await orig_get_url(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    util._get_url = get_url
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+# ---------------------------------------------------------------------------
+# 渲染
+# ---------------------------------------------------------------------------
+
+
+class Renderers:
+    def __init__(self, fixture_dir: Path, rel_paths: list[str]) -> None:
+        self.pjsk_reader = None
+        self.bang_reader = None
+        by_name = {Path(rel).name: rel for rel in rel_paths}
+        if 'gameCharacters.json' in by_name and 'character2ds.json' in by_name:
+            reader = pjsk.Story_reader(online=False)
+            reader.gameCharacters = json.loads(
+                read_fixture(fixture_dir, by_name['gameCharacters.json'])
+            )
+            reader.character2ds = json.loads(
+                read_fixture(fixture_dir, by_name['character2ds.json'])
+            )
+            reader.gameCharacters_lookup = util.MasterCache.lookup(
+                reader.gameCharacters, 'id'
+            )
+            reader.character2ds_lookup = util.MasterCache.lookup(
+                reader.character2ds, 'id'
+            )
+            self.pjsk_reader = reader
+        characters = [
+            rel for rel in rel_paths if rel.endswith('characters/main.3.json')
+        ]
+        if characters:
+            reader = bang.Story_reader(online=False)
+            reader.characters_json = json.loads(
+                read_fixture(fixture_dir, characters[0])
+            )
+            self.bang_reader = reader
+
+    def render(self, content: Any) -> int:
+        """渲染一个已获取的资源，返回渲染的文本长度（0 为不渲染）。"""
+        if isinstance(content, str):
+            if 'label(' in content:
+                return len(pjsk.parse_lua_talk(content, 'cn'))
+            return 0
+        if not isinstance(content, dict):
+            return 0
+        if 'Snippets' in content and self.pjsk_reader is not None:
+            return len(self.pjsk_reader.read_story_in_json(content))
+        if 'Base' in content and self.bang_reader is not None:
+            return len(self.bang_reader.read_story_in_json(content, 'jp', 'en'))
+        return 0
+
+
+# ---------------------------------------------------------------------------
+# run 子命令
+# ---------------------------------------------------------------------------
+
+
+async def crawl_phase(
+    online: bool,
+    rel_paths: list[str],
+    args: argparse.Namespace,
+    save_dir: str,
+    renderers: Renderers | None,
+    cpu: CpuSplit,
+    latencies: list[float],
+) -> dict[str, Any]:
+    cpu.seconds.clear()
+    latencies.clear()
+    util.MirrorHealth._stats.clear()
+    network_semaphore = asyncio.Semaphore(args.connections)
+    counts: dict[str, int] = defaultdict(int)
+
+    async with util.Connections.create_session(args.connections) as session:
+
+        async def job(rel_path: str) -> None:
+            urls = [
+                f'http://127.0.0.{i + 1}:{PORT}/{rel_path}' for i in range(args.mirrors)
+            ]
+            content = await util.fetch_url_json(
+                urls,
+                online,
+                True,
+                save_dir,
+                False,
+                error_assets_file=None,
+                missing_assets_file=None,
+                session=session,
+                network_semaphore=network_semaphore,
+                compress=args.compress,
+                format='text' if rel_path.endswith('.txt') else 'json',
+            )
+            if isinstance(content, str) and content.startswith('ERROR:'):
+                counts['errors'] += 1
+                return
+            counts['fetched'] += 1
+            if renderers is not None:
+                start = time.thread_time()
+                if renderers.render(content):
+                    counts['rendered'] += 1
+                cpu.add('render', time.thread_time() - start)
+
+        queue = util.JobQueue(args.workers, progress_interval=None)
+        for rel_path in rel_paths:
+            queue.add(lambda rel_path=rel_path: job(rel_path), name=rel_path)
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        await queue.run()
+        wall = time.perf_counter() - wall_start
+        cpu_total = time.process_time() - cpu_start
+
+    split = {name: round(seconds, 4) for name, seconds in sorted(cpu.seconds.items())}
+    split['other'] = round(max(0.0, cpu_total - sum(cpu.seconds.values())), 4)
+    return {
+        'files': len(rel_paths),
+        **counts,
+        'wall_s': round(wall, 4),
+        'files_per_s': round(len(rel_paths) / wall, 2),
+        'requests': len(latencies),
+        'requests_per_s': round(len(latencies) / wall, 2),
+        'latency_p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'cpu_s': round(cpu_total, 4),
+        'cpu_split_s': split,
+        'peak_rss_mib': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    fixture_dir = Path(args.fixture_dir)
+    rel_paths = fixture_files(fixture_dir)
+    if not rel_paths:
+        print(f'错误：快照为空: {fixture_dir}', file=sys.stderr)
+        return 1
+
+    util.RateLimit._qps_config = {}
+    util.RateLimit._default_qps = None
+    util.RateLimit._buckets = {}
+    if args.retry_delay is not None:
+        util.RateLimit._retry_429_delay = args.retry_delay
+    if args.per_host is not None:
+        util.Connections._limits = {}
+        util.Connections._default_limit = args.per_host
+        util.Connections._hosts = {}
+
+    cpu = CpuSplit()
+    latencies: list[float] = []
+    instrument(cpu, latencies)
+    renderers = None if args.no_render else Renderers(fixture_dir, rel_paths)
+
+    ctx = multiprocessing.get_context('spawn')
+    ready, stop = ctx.Event(), ctx.Event()
+    server = ctx.Process(
+        target=serve,
+        args=(
+            str(fixture_dir),
+            args.mirrors,
+            args.latency,
+            args.jitter,
+            args.p429,
+            args.p5xx,
+            ready,
+            stop,
+        ),
+        daemon=True,
+    )
+    server.start()
+    if not ready.wait(30):
+        print('错误：镜像服务器未能启动', file=sys.stderr)
+        return 1
+
+    result: dict[str, Any] = {
+        'revision': git_revision(),
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'args': {k: v for k, v in vars(args).items() if k not in ('command',)},
+        'phases': {},
+    }
+    with tempfile.TemporaryDirectory() as save_dir:
+        try:
+            for phase, online in (('online', True), ('offline', False)):
+                stats = asyncio.run(
+                    crawl_phase(
+                        online, rel_paths, args, save_dir, renderers, cpu, latencies
+                    )
+                )
+                result['phases'][phase] = stats
+                print(f'{phase}: {json.dumps(stats, ensure_ascii=False)}')
+            result['server'] = asyncio.run(fetch_server_stats())
+            print(f"server: {result['server']}")
+        finally:
+            stop.set()
+            server.join(10)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {args.output}')
+    return 0
+
+
+async def fetch_server_stats() -> dict[str, int]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f'http://127.0.0.1:{PORT}/_stats') as res:
+            return await res.json()
+
+
+# ---------------------------------------------------------------------------
+# compare 子命令
+# ---------------------------------------------------------------------------
+
+
+def cmd_compare(old_file: str, new_file: str) -> int:
+    with open(old_file, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_file, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old.get('revision') or old_file} -> {new.get('revision') or new_file}")
+
+    def flatten(stats: dict[str, Any], prefix: str = '') -> dict[str, float]:
+        flat: dict[str, float] = {}
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                flat.update(flatten(value, f'{prefix}{key}.'))
+            elif isinstance(value, (int, float)):
+                flat[prefix + key] = value
+        return flat
+
+    for phase in new['phases']:
+        if phase not in old['phases']:
+            continue
+        print(f'{phase}:')
+        old_flat = flatten(old['phases'][phase])
+        new_flat = flatten(new['phases'][phase])
+        for key, new_value in new_flat.items():
+            old_value = old_flat.get(key)
+            if old_value is None:
+                continue
+            ratio = f'{new_value / old_value:6.2f}x' if old_value else '     -'
+            print(f'  {key:<28} {old_value:>12} -> {new_value:>12}  {ratio}')
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# 入口
+# ---------------------------------------------------------------------------
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description='爬取基准 — record / synth / run / compare 四个子命令',
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_record = sub.add_parser('record', help='从资源目录复制快照')
+    p_record.add_argument('assets_dir')
+    p_record.add_argument('fixture_dir')
+    p_record.add_argument('--pattern', default='*', help='相对路径通配符')
+    p_record.add_argument('--limit', type=int, default=0, help='最多复制的文件数')
+
+    p_synth = sub.add_parser('synth', help='生成合成快照')
+    p_synth.add_argument('fixture_dir')
+    p_synth.add_argument('--files', type=int, default=1500)
+
+    p_run = sub.add_parser('run', help='启动本地镜像并测量')
+    p_run.add_argument('fixture_dir')
+    p_run.add_argument('--latency', type=float, default=30, help='响应延迟（毫秒）')
+    p_run.add_argument('--jitter', type=float, default=10, help='延迟抖动（毫秒）')
+    p_run.add_argument('--p429', type=float, default=0.0, help='返回 429 的概率')
+    p_run.add_argument('--p5xx', type=float, default=0.0, help='返回 503 的概率')
+    p_run.add_argument('--mirrors', type=int, default=2, help='镜像数（127.0.0.x）')
+    p_run.add_argument('--workers', type=int, default=16, help='JobQueue worker 数')
+    p_run.add_argument('--connections', type=int, default=20, help='总连接数上限')
+    p_run.add_argument('--per-host', type=int, help='覆盖每个 host 的连接上限')
+    p_run.add_argument('--retry-delay', type=float, help='覆盖 429/5xx 重试间隔（秒）')
+    p_run.add_argument('--compress', action='store_true', help='以 .br 保存')
+    p_run.add_argument('--no-render', action='store_true', help='不渲染剧情')
+    p_run.add_argument('--output', help='结果 JSON 文件')
+
+    p_compare = sub.add_parser('compare', help='对比两次结果')
+    p_compare.add_argument('old')
+    p_compare.add_argument('new')
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        return cmd_record(args.assets_dir, args.fixture_dir, args.pattern, args.limit)
+    elif args.command == 'synth':
+        return cmd_synth(args.fixture_dir, args.files)
+    elif args.command == 'run':
+        return cmd_run(args)
+    elif args.command == 'compare':
+        return cmd_compare(args.old, args.new)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+bench_lua_talk.py — mysekai lua 对话解析耗时，并与旧版本比对输出
+
+用法:
+
+    python misc/bench_lua_talk.py [--baseline REV] [--repeat N] [dir_or_file ...]
+
+dir_or_file 为已保存的 mysekai_talk 资源（.lua / .lua.br，目录则递归查找）；
+不给时使用合成语料。--baseline 为 git 版本，从中取出旧的 src/pjsk.py，
+调用其 Mysekai_talk_getter._parse_lua_talk 作对照。--repeat 模拟同一 lua
+出现在多个角色文件中（默认 3），用于体现按 (assetbundleName, lua) 缓存的效果。
+
+旧实现按顺序替换转义（\\n → 空格、\\" → "、\\\\ → \\），遇到 \\\\n 这类
+组合时结果不同；这类差异单独列出，不算失败。
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from src import util, pjsk  # noqa: E402
+
+
+def load_baseline(rev: str) -> types.ModuleType:
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:src/pjsk.py'],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    module = types.ModuleType('src._baseline_pjsk')
+    module.__package__ = 'src'
+    module.__file__ = os.path.join(ROOT, 'src', 'pjsk.py')
+    exec(compile(source, f'{rev}:src/pjsk.py', 'exec'), module.__dict__)
+    return module
+
+
+def collect(paths: list[str]) -> dict[str, str]:
+    files: list[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files.extend(sorted(f for f in p.rglob('*.lua*') if f.is_file()))
+        else:
+            files.append(p)
+    corpus: dict[str, str] = {}
+    for f in files:
+        compression = 'br' if f.suffix == '.br' else 'none'
+        corpus[str(f)], _, _ = util._read_local_file_sync(str(f), compression, False)
+    return corpus
+
+
+def synthetic(count: int) -> dict[str, str]:
+    rng = random.Random(0)
+    corpus: dict[str, str] = {}
+    for i in range(count):
+        lines = ['local talk = {}', 'function talk.run()']
+        for _ in range(rng.randint(2, 12)):
+            lines.append(f'  label("角色{rng.randint(1, 26)}")')
+            lines.append('  motion("idle", 0.5)')
+            body = '台词' * rng.randint(2, 20)
+            if rng.random() < 0.3:
+                body += r'\n' + '第二行'
+            if rng.random() < 0.1:
+                body += r'\"引用\"'
+            lines.append(f'  text("{body}")')
+            lines.append('  wait(1.0)')
+        lines.append('end')
+        corpus[f'synthetic_{i:04d}.lua'] = '\n'.join(lines)
+    return corpus
+
+
+def measure(parse: Callable[[str, str], str], corpus: dict[str, str], repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        outputs = {name: parse(name, text) for name, text in corpus.items()}
+    return time.perf_counter() - start, outputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='*')
+    parser.add_argument('--baseline', help='对照用的 git 版本')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--mark-lang', default='cn')
+    args = parser.parse_args()
+
+    corpus = collect(args.paths) if args.paths else synthetic(3000)
+    size = sum(len(text) for text in corpus.values())
+    print(f'{len(corpus)} lua files, {size / 2**20:.1f} MiB, repeat {args.repeat}')
+
+    fake_self: Any = types.SimpleNamespace(
+        reader=types.SimpleNamespace(mark_lang=args.mark_lang), lua_talks={}
+    )
+
+    def current(name: str, text: str) -> str:
+        return pjsk.Mysekai_talk_getter._parse_lua_talk(fake_self, (name, ''), text)
+
+    elapsed, outputs = measure(current, corpus, args.repeat)
+    line = f'  current  {elapsed * 1000:8.1f} ms'
+
+    if args.baseline:
+        old = load_baseline(args.baseline).Mysekai_talk_getter._parse_lua_talk
+        old_elapsed, old_outputs = measure(
+            lambda _, text: old(fake_self, text), corpus, args.repeat
+        )
+        line += (
+            f'  baseline {old_elapsed * 1000:8.1f} ms'
+            f'  speedup {old_elapsed / elapsed:5.2f}x'
+        )
+        diffs = [name for name in corpus if outputs[name] != old_outputs[name]]
+        escape_diffs = [name for name in diffs if '\\\\' in corpus[name]]
+        print(line)
+        for name in escape_diffs:
+            print(f'  [转义差异] {name}')
+        if len(diffs) != len(escape_diffs):
+            for name in diffs:
+                if name not in escape_diffs:
+                    print(f'  [不一致] {name}')
+            sys.exit(1)
+        print(
+            f'  {len(corpus) - len(diffs)} identical, {len(escape_diffs)} escape fixes'
+        )
+    else:
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+bench_offline_read.py — 离线读取（read_json_from_url）在冷缓存下的吞吐与事件循环阻塞
+
+用法:
+
+    python misc/bench_offline_read.py [--baseline REV] [--files N] [--concurrency N]
+        [--drop-caches] [--save-dir DIR --urls FILE]
+
+默认在临时目录生成 N 个 .br 资源（结构类似剧情 asset）。每轮读取前用
+posix_fadvise(DONTNEED) 逐个丢弃文件的页缓存；--drop-caches 额外写
+/proc/sys/vm/drop_caches（需要 root）。--baseline 为 git 版本，从中取出旧的
+src/util.py 作对照。
+
+输出：总耗时、文件/秒、事件循环最大延迟（10 ms 定时器的超时量），以及同时
+争用网络信号量的探针等待一个名额的最长时间。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+import brotli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from src import util  # noqa: E402
+
+
+def load_baseline(rev: str) -> types.ModuleType:
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:src/util.py'],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    module = types.ModuleType('src._baseline_util')
+    module.__file__ = os.path.join(ROOT, 'src', 'util.py')
+    exec(compile(source, f'{rev}:src/util.py', 'exec'), module.__dict__)
+    return module
+
+
+def make_fixture(save_dir: str, files: int) -> list[str]:
+    rng = random.Random(0)
+    urls = []
+    for i in range(files):
+        url = f'https://bench.invalid/scenario/{i // 100}/story_{i:05d}.asset'
+        talks = [
+            {
+                'WindowDisplayName': f'chara{rng.randint(1, 26)}',
+                'Body': '台词' * rng.randint(5, 40),
+            }
+            for _ in range(rng.randint(50, 300))
+        ]
+        path = util.url_to_path(url, save_dir) + '.br'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            data = json.dumps({'TalkData': talks}, ensure_ascii=False)
+            f.write(brotli.compress(data.encode('utf-8'), quality=5))
+            os.fsync(f.fileno())
+        urls.append(url)
+    return urls
+
+
+def drop_caches(save_dir: str, system: bool) -> None:
+    if system:
+        try:
+            with open('/proc/sys/vm/drop_caches', 'w') as f:
+                f.write('3\n')
+            return
+        except OSError as e:
+            print(f'[Warning] 无法写 drop_caches: {e}', file=sys.stderr)
+    for dirpath, _, filenames in os.walk(save_dir):
+        for name in filenames:
+            fd = os.open(os.path.join(dirpath, name), os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+async def run(module, urls: list[str], save_dir: str, concurrency: int):
+    network_semaphore = asyncio.Semaphore(20)
+    done = False
+    max_lag = 0.0
+    max_slot_wait = 0.0
+
+    async def ticker() -> None:
+        nonlocal max_lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.01)
+
+    async def network_probe() -> None:
+        nonlocal max_slot_wait
+        while not done:
+            start = time.perf_counter()
+            async with network_semaphore:
+                max_slot_wait = max(max_slot_wait, time.perf_counter() - start)
+            await asyncio.sleep(0.005)
+
+    job_semaphore = asyncio.Semaphore(concurrency)
+
+    async def read(url: str) -> None:
+        async with job_semaphore:
+            content = await module.read_json_from_url(
+                [url],
+                False,
+                save_dir,
+                '',
+                None,
+                None,
+                None,
+                None,
+                network_semaphore,
+                None,
+                True,
+                False,
+            )
+            assert isinstance(content, dict), content
+
+    background = [
+        asyncio.ensure_future(ticker()),
+        asyncio.ensure_future(network_probe()),
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(*[read(url) for url in urls])
+    elapsed = time.perf_counter() - start
+    done = True
+    await asyncio.gather(*background)
+    return elapsed, max_lag, max_slot_wait
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--baseline', help='对照用的 git 版本')
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64, help='同时进行的读取数')
+    parser.add_argument('--drop-caches', action='store_true')
+    parser.add_argument('--save-dir', help='已有的资源目录')
+    parser.add_argument('--urls', help='每行一个 url 的文件，配合 --save-dir')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.save_dir:
+        save_dir = args.save_dir
+        with open(args.urls, encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        tmp_dir = tempfile.TemporaryDirectory()
+        save_dir = tmp_dir.name
+        urls = make_fixture(save_dir, args.files)
+
+    modules = [('current', util)]
+    if args.baseline:
+        modules.insert(0, ('baseline', load_baseline(args.baseline)))
+
+    size = sum(
+        os.path.getsize(os.path.join(d, n))
+        for d, _, names in os.walk(save_dir)
+        for n in names
+    )
+    print(f'{len(urls)} files, {size / 2**20:.1f} MiB compressed')
+    for name, module in modules:
+        drop_caches(save_dir, args.drop_caches)
+        elapsed, lag, slot_wait = asyncio.run(
+            run(module, urls, save_dir, args.concurrency)
+        )
+        print(
+            f'  {name:<9} {elapsed:7.3f}s  {len(urls) / elapsed:8.0f} files/s'
+            f'  max loop lag {lag * 1000:7.1f} ms'
+            f'  max network slot wait {slot_wait * 1000:7.1f} ms'
+        )
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
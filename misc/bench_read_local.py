@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+bench_read_local.py — 比较 .br 资源整体解压与流式解压读取的耗时和峰值内存
+
+用法:
+
+    python misc/bench_read_local.py [file.json.br ...]
+
+不给文件时生成一个约 50 MB 的合成 master（结构类似 actionSets.json）。
+峰值内存用 tracemalloc 统计，只含 Python 分配（bytes/str/解析出的对象）。
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import brotli
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import util  # noqa: E402
+
+
+def legacy_read(path: str) -> object:
+    """原实现：读入全部压缩数据 → 整体解压 → 解码为 str → json.loads。"""
+    with open(path, 'rb') as f:
+        raw_bytes = f.read()
+    decompressed_bytes = brotli.decompress(raw_bytes)
+    content = decompressed_bytes.decode("utf-8")
+    return json.loads(content)
+
+
+def streaming_read(path: str) -> object:
+    content, _, _ = util._read_local_file_sync(path, 'br', True)
+    return content
+
+
+def make_fixture(dir: str) -> str:
+    rows = [
+        {
+            'id': i,
+            'areaId': i % 100,
+            'isNextGrade': False,
+            'scriptId': f'areatalk_ev_{i:06d}',
+            'characterIds': [i % 26 + 1, (i + 7) % 26 + 1],
+            'scenarioId': f'areatalk_{i:06d}',
+            'actionSetType': 'normal',
+            'releaseConditionId': i * 3,
+        }
+        for i in range(250_000)
+    ]
+    path = os.path.join(dir, 'actionSets.json.br')
+    data = json.dumps(rows, ensure_ascii=False).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(brotli.compress(data, quality=5))
+    return path
+
+
+def measure(func, path: str) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main() -> None:
+    paths = sys.argv[1:]
+    tmp_dir = None
+    if not paths:
+        tmp_dir = tempfile.TemporaryDirectory()
+        paths = [make_fixture(tmp_dir.name)]
+
+    for path in paths:
+        assert legacy_read(path) == streaming_read(path)
+        print(f'{path} ({os.path.getsize(path) / 2**20:.1f} MiB compressed)')
+        for name, func in (('legacy', legacy_read), ('streaming', streaming_read)):
+            elapsed, peak = measure(func, path)
+            print(f'  {name:<10} {elapsed:7.3f}s  peak {peak / 2**20:8.1f} MiB')
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
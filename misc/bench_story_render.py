@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+bench_story_render.py — 剧情渲染（read_story_in_json）耗时，并与旧版本逐字节比对
+
+用法:
+
+    python misc/bench_story_render.py --baseline REV
+        [--pjsk-master DIR --pjsk FILE_OR_DIR ...]
+        [--bang-characters FILE --bang FILE_OR_DIR ...]
+
+--baseline 为 git 版本（如 Story_renderer 引入前的提交），从中取出旧的
+src/pjsk.py、src/bang.py 作为对照；不给时只测当前版本。
+不给剧情文件时使用合成语料。--pjsk-master 目录需含 gameCharacters.json 与
+character2ds.json（可为 .br），--bang-characters 为 characters main 文件。
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from src import util, pjsk, bang  # noqa: E402
+
+Effect = util.SpecialEffectType
+
+
+def load_baseline(rev: str, name: str) -> types.ModuleType:
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:src/{name}.py'],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    module = types.ModuleType(f'src._baseline_{name}')
+    module.__package__ = 'src'
+    module.__file__ = os.path.join(ROOT, 'src', f'{name}.py')
+    exec(compile(source, f'{rev}:src/{name}.py', 'exec'), module.__dict__)
+    return module
+
+
+def read_asset(path: Path) -> Any:
+    compression = 'br' if path.suffix == '.br' else 'none'
+    content, _, _ = util._read_local_file_sync(str(path), compression, True)
+    return content
+
+
+def collect(paths: list[str]) -> list[Any]:
+    files: list[Path] = []
+    for p in map(Path, paths):
+        files.extend(
+            sorted(f for f in p.rglob('*') if f.is_file()) if p.is_dir() else [p]
+        )
+    return [read_asset(f) for f in files]
+
+
+# ---------------------------------------------------------------------------
+# 合成语料
+# ---------------------------------------------------------------------------
+
+EFFECT_CHOICES = [
+    Effect.Telop,
+    Effect.PlaceInfo,
+    Effect.FullScreenText,
+    Effect.SimpleSelectable,
+    Effect.Movie,
+    Effect.PlayMV,
+    Effect.ChangeBackground,
+    Effect.FlashbackIn,
+    Effect.FlashbackOut,
+    Effect.BlackOut,
+    Effect.WhiteOut,
+    Effect.ShakeScreen,
+    Effect.BlackIn,
+    99,
+]
+
+
+def pjsk_masters() -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    units = ['light_sound', 'idol', 'street', 'theme_park', 'school_refusal']
+    game_characters = [
+        {
+            'id': i,
+            'firstName': f'姓{i}' if i % 7 else None,
+            'givenName': f'名{i}',
+            'unit': units[(i - 1) // 4] if i <= 20 else 'piapro',
+        }
+        for i in range(1, 27)
+    ]
+    character2ds = [
+        {
+            'id': i,
+            'characterType': 'game_character' if i % 11 else 'mob',
+            'characterId': (i - 1) % 26 + 1,
+            'unit': units[i % 5] if (i - 1) % 26 + 1 > 20 else 'none',
+        }
+        for i in range(1, 101)
+    ]
+    return game_characters, character2ds
+
+
+def pjsk_scenario(rng: random.Random) -> dict[str, Any]:
+    talks, effects, snippets = [], [], []
+    for index in range(rng.randint(40, 160)):
+        action = rng.choices([1, 6, 0, 4], [6, 3, 1, 1])[0]
+        if action == 1:
+            chara2d = rng.randint(1, 100)
+            talks.append(
+                {
+                    'TalkCharacters': [{'Character2dId': chara2d}],
+                    'WindowDisplayName': rng.choice(
+                        [f'名{(chara2d - 1) % 26 + 1}', '？？？', 'モブ\nA']
+                    ),
+                    'Body': '台词\n' * rng.randint(1, 3),
+                }
+            )
+            reference = len(talks) - 1
+        elif action == 6:
+            effect_type = rng.choice(EFFECT_CHOICES)
+            effects.append(
+                {
+                    'EffectType': int(effect_type),
+                    'StringVal': rng.choice(['bg_a000012', 'bg_c000101', '文字\n']),
+                    'IntVal': rng.randint(1, 300),
+                }
+            )
+            reference = len(effects) - 1
+        else:
+            reference = 0
+        snippets.append({'Index': index, 'Action': action, 'ReferenceIndex': reference})
+    return {
+        'TalkData': talks,
+        'SpecialEffectData': effects,
+        'Snippets': snippets,
+        'AppearCharacters': [
+            {'Character2dId': rng.randint(1, 100)} for _ in range(rng.randint(0, 6))
+        ],
+    }
+
+
+def bang_characters() -> dict[str, Any]:
+    return {
+        str(i): {
+            'characterName': [
+                f'キャラ {i}',
+                f'Chara {i}',
+                f'角色 {i}',
+                f'角色 {i}',
+                '',
+            ],
+            'firstName': [f'名{i}', f'N{i}', f'名{i}', f'名{i}', ''],
+            'bandId': [1, 2, 3, 4, 5, 18, 21, 45][i % 8],
+        }
+        for i in range(1, 41)
+    }
+
+
+def bang_scenario(rng: random.Random) -> dict[str, Any]:
+    talks, effects, snippets = [], [], []
+    for _ in range(rng.randint(40, 160)):
+        action = rng.choices([1, 6, 0, 4], [6, 3, 1, 1])[0]
+        if action == 1:
+            chara = rng.randint(1, 50)
+            talks.append(
+                {
+                    'talkCharacters': [{'characterId': chara}],
+                    'windowDisplayName': rng.choice([f'名{chara}', '？？？']),
+                    'body': '台词\n' * rng.randint(1, 3),
+                }
+            )
+            reference = len(talks) - 1
+        elif action == 6:
+            effects.append(
+                {
+                    'effectType': int(rng.choice(EFFECT_CHOICES)),
+                    'stringVal': '字幕',
+                }
+            )
+            reference = len(effects) - 1
+        else:
+            reference = 0
+        snippets.append({'actionType': action, 'referenceIndex': reference})
+    return {
+        'Base': {
+            'talkData': talks,
+            'specialEffectData': effects,
+            'snippets': snippets,
+            'appearCharacters': [
+                {'characterId': rng.randint(1, 50)} for _ in range(rng.randint(0, 6))
+            ],
+        }
+    }
+
+
+# ---------------------------------------------------------------------------
+# 测量
+# ---------------------------------------------------------------------------
+
+
+def make_pjsk_reader(module: types.ModuleType, masters, **kwargs) -> Any:
+    reader = module.Story_reader(online=False, **kwargs)
+    reader.gameCharacters, reader.character2ds = masters
+    reader.gameCharacters_lookup = util.MasterCache.lookup(reader.gameCharacters, 'id')
+    reader.character2ds_lookup = util.MasterCache.lookup(reader.character2ds, 'id')
+    return reader
+
+
+def make_bang_reader(module: types.ModuleType, characters, **kwargs) -> Any:
+    reader = module.Story_reader(online=False, **kwargs)
+    reader.characters_json = characters
+    return reader
+
+
+def measure(render: Callable[[Any], str], corpus: list[Any], rounds: int):
+    outputs = [render(data) for data in corpus]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for data in corpus:
+            render(data)
+    return (time.perf_counter() - start) / rounds, outputs
+
+
+def compare(
+    title: str,
+    corpus: list[Any],
+    current: Callable[[Any], str],
+    baseline: Callable[[Any], str] | None,
+    rounds: int,
+) -> None:
+    elapsed, outputs = measure(current, corpus, rounds)
+    line = f'  {title:<28} current {elapsed * 1000:8.2f} ms'
+    if baseline is not None:
+        old_elapsed, old_outputs = measure(baseline, corpus, rounds)
+        mismatch = sum(a != b for a, b in zip(outputs, old_outputs))
+        line += (
+            f'  baseline {old_elapsed * 1000:8.2f} ms'
+            f'  speedup {old_elapsed / elapsed:5.2f}x'
+            f'  {"identical" if not mismatch else f"{mismatch} MISMATCHED"}'
+        )
+        if mismatch:
+            print(line)
+            sys.exit(1)
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--baseline', help='对照用的 git 版本')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--pjsk-master')
+    parser.add_argument('--pjsk', nargs='*', default=[])
+    parser.add_argument('--bang-characters')
+    parser.add_argument('--bang', nargs='*', default=[])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    if args.pjsk:
+        master_dir = Path(args.pjsk_master)
+        masters = tuple(
+            read_asset(next(master_dir.glob(f'{name}.json*')))
+            for name in ('gameCharacters', 'character2ds')
+        )
+        pjsk_corpus = collect(args.pjsk)
+    else:
+        masters = pjsk_masters()
+        pjsk_corpus = [pjsk_scenario(rng) for _ in range(500)]
+    if args.bang:
+        characters = read_asset(Path(args.bang_characters))
+        bang_corpus = collect(args.bang)
+    else:
+        characters = bang_characters()
+        bang_corpus = [bang_scenario(rng) for _ in range(500)]
+
+    old_pjsk = load_baseline(args.baseline, 'pjsk') if args.baseline else None
+    old_bang = load_baseline(args.baseline, 'bang') if args.baseline else None
+
+    print(f'pjsk: {len(pjsk_corpus)} scenarios')
+    for mark_lang in ('cn', 'en'):
+        for debug_parse in (False, True):
+            for cg_add_link in (True, False):
+                kwargs = dict(
+                    mark_lang=mark_lang,
+                    debug_parse=debug_parse,
+                    cg_add_link=cg_add_link,
+                )
+                new = make_pjsk_reader(pjsk, masters, **kwargs)
+                old = old_pjsk and make_pjsk_reader(old_pjsk, masters, **kwargs)
+                compare(
+                    f'{mark_lang} debug={debug_parse} cg_link={cg_add_link}',
+                    pjsk_corpus,
+                    new.read_story_in_json,
+                    old.read_story_in_json if old else None,
+                    args.rounds,
+                )
+
+    print(f'bang: {len(bang_corpus)} scenarios')
+    for mark_lang in ('cn', 'en'):
+        for debug_parse in (False, True):
+            new = make_bang_reader(bang, characters, debug_parse=debug_parse)
+            old = old_bang and make_bang_reader(
+                old_bang, characters, debug_parse=debug_parse
+            )
+            compare(
+                f'{mark_lang} debug={debug_parse}',
+                bang_corpus,
+                lambda data: new.read_story_in_json(data, 'cn', mark_lang),
+                (
+                    (lambda data: old.read_story_in_json(data, 'cn', mark_lang))
+                    if old
+                    else None
+                ),
+                args.rounds,
+            )
+
+
+if __name__ == '__main__':
+    main()
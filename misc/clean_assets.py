@@ -96,11 +96,15 @@ def _collect_valid_paths(src_base: Path) -> set[Path]:
     return valid
 
 
+# AssetStore 清单（及 SQLite 的 -wal/-shm 文件）不是资源，不参与比对
+MANIFEST_SUFFIXES = (".sqlite3", ".sqlite3-wal", ".sqlite3-shm")
+
+
 def _collect_all_files(target_dir: Path) -> list[Path]:
-    """递归收集所有文件（不含目录）。"""
+    """递归收集所有文件（不含目录与资源清单）。"""
     files: list[Path] = []
     for entry in target_dir.rglob("*"):
-        if entry.is_file():
+        if entry.is_file() and not entry.name.endswith(MANIFEST_SUFFIXES):
             files.append(entry)
     return files
 
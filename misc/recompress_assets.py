@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+recompress_assets.py — 资源归档压缩工具（路径参数支持通配符）
+
+获取时按 util.COMPRESS_QUALITY 快速压缩，空闲时用本工具升级。dir 为保存资源的
+save_dir（即 pjsk/bang 的 assets_save_dir）。
+
+子命令:
+
+    brotli <dir> [dir ...] [--quality 11] [--manifest FILE] [--state FILE]
+        把 dir 下的 .br 文件按 --quality 重新压缩（变小才替换）。
+        已处理文件记录在 --state（默认 recompressed.json），再次运行时跳过。
+
+    train <dir> [dir ...] [--pattern GLOB] [--max-size N] [--dict-size N]
+        用 dir 下匹配 --pattern 且解压后不超过 --max-size 字节的文件训练
+        zstd 共享字典，保存为 dir/_zstd.dict。需安装 zstandard。
+
+    zstd <dir> [dir ...] [--pattern GLOB] [--max-size N] [--level 19] [--manifest FILE]
+        用 dir/_zstd.dict 把匹配的小 .br 文件转为 .zst（变小才转换），
+        删除原 .br 及其 ETag 记录。需安装 zstandard。
+
+--manifest 为 AssetStore 清单文件，给出时同步更新其中的路径、大小与 sha256。
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import brotli
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import util  # noqa: E402
+
+# ---------------------------------------------------------------------------
+# 共用工具
+# ---------------------------------------------------------------------------
+
+
+def _expand_globs(paths: list[str]) -> list[str]:
+    """展开路径中的通配符（? * [）; 无通配符的路径原样保留。"""
+    expanded: list[str] = []
+    for p in paths:
+        if glob.has_magic(p):
+            matched = sorted(glob.glob(p))
+            if not matched:
+                print(f"[Warning] 通配符未匹配任何路径: {p}", file=sys.stderr)
+            expanded.extend(matched)
+        else:
+            expanded.append(p)
+    return expanded
+
+
+def _check_dirs(dir_list: list[str]) -> list[Path] | None:
+    dirs = [Path(p).resolve() for p in dir_list]
+    for d in dirs:
+        if not d.is_dir():
+            print(f"错误：不是有效目录: {d}", file=sys.stderr)
+            return None
+    return dirs
+
+
+def _open_store(manifest: str | None) -> util.AssetStore | None:
+    return util.AssetStore(manifest) if manifest else None
+
+
+def _require_zstandard() -> bool:
+    if util.zstandard is None:
+        print("错误：未安装 zstandard（pip install zstandard）", file=sys.stderr)
+        return False
+    return True
+
+
+def _small_br_files(d: Path, pattern: str, max_size: int) -> list[tuple[Path, bytes]]:
+    """返回 d 下匹配 pattern、解压后不超过 max_size 字节的 .br 文件及其解压内容。"""
+    result: list[tuple[Path, bytes]] = []
+    for p in sorted(d.rglob(pattern)):
+        if not p.is_file() or p.suffix != ".br":
+            continue
+        data = brotli.decompress(p.read_bytes())
+        if len(data) <= max_size:
+            result.append((p, data))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# brotli 子命令
+# ---------------------------------------------------------------------------
+
+
+def cmd_brotli(
+    dir_list: list[str], quality: int, manifest: str | None, state_file: str
+) -> int:
+    dirs = _check_dirs(dir_list)
+    if dirs is None:
+        return 1
+
+    state: dict[str, list[int]] = {}
+    if os.path.exists(state_file):
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+    store = _open_store(manifest)
+    before_total = after_total = replaced = skipped = 0
+    try:
+        for d in dirs:
+            print(f"重新压缩 {d} (quality {quality}) ...")
+            for p in sorted(d.rglob("*.br")):
+                stat = p.stat()
+                key = str(p)
+                if state.get(key) == [stat.st_size, stat.st_mtime_ns]:
+                    skipped += 1
+                    continue
+                old = p.read_bytes()
+                new = brotli.compress(brotli.decompress(old), quality=quality)
+                before_total += len(old)
+                if len(new) < len(old):
+                    util.atomic_write(p, new)
+                    replaced += 1
+                    if store is not None:
+                        store.update_file(
+                            str(p),
+                            str(p),
+                            len(new),
+                            hashlib.sha256(new).hexdigest(),
+                            "br",
+                        )
+                    after_total += len(new)
+                else:
+                    after_total += len(old)
+                stat = p.stat()
+                state[key] = [stat.st_size, stat.st_mtime_ns]
+    finally:
+        if store is not None:
+            store.close()
+        with open(state_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    print(
+        f"\n替换 {replaced} 个文件，跳过已处理 {skipped} 个；"
+        f"{before_total / 2**20:.2f} MiB -> {after_total / 2**20:.2f} MiB"
+    )
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# train 子命令
+# ---------------------------------------------------------------------------
+
+
+def cmd_train(dir_list: list[str], pattern: str, max_size: int, dict_size: int) -> int:
+    if not _require_zstandard():
+        return 1
+    dirs = _check_dirs(dir_list)
+    if dirs is None:
+        return 1
+
+    for d in dirs:
+        samples = [data for _, data in _small_br_files(d, pattern, max_size)]
+        print(f"{d}: {len(samples)} 个样本")
+        if len(samples) < 10:
+            print("  样本太少，跳过", file=sys.stderr)
+            continue
+        dict_data = util.zstandard.train_dictionary(dict_size, samples)
+        dict_path = d / util.ZSTD_DICT_NAME
+        util.atomic_write(dict_path, dict_data.as_bytes())
+        print(f"  -> {dict_path} ({len(dict_data.as_bytes())} 字节)")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# zstd 子命令
+# ---------------------------------------------------------------------------
+
+
+def cmd_zstd(
+    dir_list: list[str],
+    pattern: str,
+    max_size: int,
+    level: int,
+    manifest: str | None,
+) -> int:
+    if not _require_zstandard():
+        return 1
+    dirs = _check_dirs(dir_list)
+    if dirs is None:
+        return 1
+
+    store = _open_store(manifest)
+    try:
+        for d in dirs:
+            dict_path = d / util.ZSTD_DICT_NAME
+            if not dict_path.is_file():
+                print(f"错误：字典不存在，请先运行 train: {dict_path}", file=sys.stderr)
+                return 1
+            compressor = util.zstandard.ZstdCompressor(
+                level=level,
+                dict_data=util.zstandard.ZstdCompressionDict(dict_path.read_bytes()),
+            )
+            before_total = after_total = converted = 0
+            for p, data in _small_br_files(d, pattern, max_size):
+                old_size = p.stat().st_size
+                new = compressor.compress(data)
+                before_total += old_size
+                if len(new) >= old_size:
+                    after_total += old_size
+                    continue
+                zstd_path = p.with_suffix(".zst")
+                util.atomic_write(zstd_path, new)
+                p.unlink()
+                validators_path = Path(str(p) + util.VALIDATORS_SUFFIX)
+                if validators_path.exists():
+                    validators_path.unlink()
+                if store is not None:
+                    store.update_file(
+                        str(p),
+                        str(zstd_path),
+                        len(new),
+                        hashlib.sha256(new).hexdigest(),
+                        "zstd",
+                    )
+                after_total += len(new)
+                converted += 1
+            print(
+                f"{d}: 转换 {converted} 个文件，"
+                f"{before_total / 2**10:.1f} KiB -> {after_total / 2**10:.1f} KiB"
+            )
+    finally:
+        if store is not None:
+            store.close()
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# 入口
+# ---------------------------------------------------------------------------
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="资源归档压缩工具 — brotli / train / zstd 三个子命令",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    # brotli
+    p_brotli = sub.add_parser("brotli", help="把 .br 文件升级到更高压缩质量")
+    p_brotli.add_argument("dir", nargs="+", help="资源保存目录（可多个）")
+    p_brotli.add_argument("--quality", type=int, default=util.ARCHIVE_QUALITY)
+    p_brotli.add_argument("--manifest", help="AssetStore 清单文件")
+    p_brotli.add_argument(
+        "--state", default="recompressed.json", help="已处理文件记录（默认当前目录）"
+    )
+
+    # train
+    p_train = sub.add_parser("train", help="训练 zstd 共享字典")
+    p_train.add_argument("dir", nargs="+", help="资源保存目录（可多个）")
+    p_train.add_argument("--pattern", default="*.asset.br", help="样本文件通配符")
+    p_train.add_argument("--max-size", type=int, default=16384, help="样本解压后上限")
+    p_train.add_argument("--dict-size", type=int, default=112640, help="字典大小")
+
+    # zstd
+    p_zstd = sub.add_parser("zstd", help="用共享字典把小文件转为 .zst")
+    p_zstd.add_argument("dir", nargs="+", help="资源保存目录（可多个）")
+    p_zstd.add_argument("--pattern", default="*.asset.br", help="转换文件通配符")
+    p_zstd.add_argument("--max-size", type=int, default=16384, help="解压后大小上限")
+    p_zstd.add_argument("--level", type=int, default=19)
+    p_zstd.add_argument("--manifest", help="AssetStore 清单文件")
+
+    args = parser.parse_args()
+
+    if args.command == "brotli":
+        return cmd_brotli(
+            _expand_globs(args.dir), args.quality, args.manifest, args.state
+        )
+    elif args.command == "train":
+        return cmd_train(
+            _expand_globs(args.dir), args.pattern, args.max_size, args.dict_size
+        )
+    elif args.command == "zstd":
+        return cmd_zstd(
+            _expand_globs(args.dir),
+            args.pattern,
+            args.max_size,
+            args.level,
+            args.manifest,
+        )
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@ from pathlib import Path
 from typing import Any
 from asyncio import Semaphore
 
-from aiohttp import ClientSession, TCPConnector
+from aiohttp import ClientSession
 
 from . import util
 from .util import Mark_multi_lang
@@ -61,6 +61,10 @@ class Story_reader(util.Base_fetcher):
         )
 
         self.debug_parse = debug_parse
+        self.renderers: dict[str, util.Story_renderer] = {}
+        self.chara_names: dict[tuple[int, str], tuple[str, str, str]] = {}
+        self.parse_pool: util.Parse_pool | None = None
+        self.characters_digest: str | None = None
 
         self.characters_main_url = URLS['bestdori.com']['characters_main_3']
 
@@ -68,15 +72,52 @@ class Story_reader(util.Base_fetcher):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
-
-        self.characters_json = await self.fetch_url_json(
-            self.characters_main_url, force_online=self.force_master_online
+        await super().init(session, network_semaphore, asset_store)
+
+        self.characters_json = await self.fetch_master_json(self.characters_main_url)
+        self.chara_names = {}
+        self.characters_digest = None
+
+    def build_options(self, lang: str, mark_lang: str) -> tuple:
+        """增量重建指纹中 reader 的部分：解析选项与角色 master 的摘要。"""
+        if self.characters_digest is None:
+            self.characters_digest = util.BuildState.key(self.characters_json)
+        return (lang, mark_lang, self.debug_parse, self.characters_digest)
+
+    def start_parse_pool(self, workers: int) -> None:
+        """之后的 render_story 在 workers 个子进程中解析；须在 init 之后调用。"""
+        self.parse_pool = util.Parse_pool(
+            Story_reader.from_snapshot,
+            (self.debug_parse, self.characters_json),
+            workers,
         )
 
+    def close_parse_pool(self) -> None:
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown()
+            self.parse_pool = None
+
+    @classmethod
+    def from_snapshot(
+        cls, debug_parse: bool, characters_json: dict[str, Any]
+    ) -> 'Story_reader':
+        reader = cls(online=False, debug_parse=debug_parse)
+        reader.characters_json = characters_json
+        return reader
+
     def get_chara_bandAbbr_and_names(
         self, chara_id: int, lang: str
+    ) -> tuple[str, str, str]:
+        names = self.chara_names.get((chara_id, lang))
+        if names is None:
+            names = self.__chara_bandAbbr_and_names(chara_id, lang)
+            self.chara_names[(chara_id, lang)] = names
+        return names
+
+    def __chara_bandAbbr_and_names(
+        self, chara_id: int, lang: str
     ) -> tuple[str, str, str]:
         if str(chara_id) not in self.characters_json:
             return '', '', ''
@@ -92,22 +133,85 @@ class Story_reader(util.Base_fetcher):
         band_abbr = Constant.band_id_abbr[band_id]
         return band_abbr, fullname, shortname
 
+    def get_renderer(self, mark_lang: str) -> util.Story_renderer:
+        renderer = self.renderers.get(mark_lang)
+        if renderer is not None:
+            return renderer
+
+        renderer = util.Story_renderer(
+            mark_lang,
+            self.debug_parse,
+            action_key='actionType',
+            reference_key='referenceIndex',
+            effect_type_key='effectType',
+        )
+        marks = renderer.marks
+        debug_parse = self.debug_parse
+
+        Effect = util.SpecialEffectType
+        renderer.add_effect(
+            Effect.Telop,
+            lambda effect: marks['['] + effect['stringVal'] + marks[']'],
+            block=True,
+        )
+        renderer.add_effect(
+            Effect.ChangeBackground,
+            lambda effect: marks['background'] + (f": {effect}" if debug_parse else ''),
+        )
+        renderer.add_effect(
+            Effect.FlashbackIn, lambda effect: marks['memory in'], block=True
+        )
+        renderer.add_effect(
+            Effect.FlashbackOut, lambda effect: marks['memory out'], block=True
+        )
+        renderer.add_effect(Effect.BlackOut, lambda effect: marks['black out'])
+        renderer.add_effect(Effect.WhiteOut, lambda effect: marks['white out'])
+
+        self.renderers[mark_lang] = renderer
+        return renderer
+
     def make_characters(
         self, chara_id_list: list[int], lang: str, mark_lang: str
     ) -> str:
-        if len(chara_id_list) > 0:
-            return (
-                Mark_multi_lang['characters'][mark_lang]
-                + Mark_multi_lang[','][mark_lang].join(
-                    [
-                        self.get_chara_bandAbbr_and_names(id, lang)[1]
-                        for id in chara_id_list
-                    ]
+        return self.get_renderer(mark_lang).characters_header(
+            [self.get_chara_bandAbbr_and_names(id, lang)[1] for id in chara_id_list]
+        )
+
+    def render_talk(
+        self, talk: dict[str, Any], lang: str, marks: dict[str, str]
+    ) -> str:
+        talk_charaid = talk['talkCharacters'][0]['characterId']
+        _, speaker_fullname, speaker_shortname = self.get_chara_bandAbbr_and_names(
+            talk_charaid, lang
+        )
+
+        displayname = talk['windowDisplayName'].replace('\n', ' ')
+
+        if len(speaker_fullname) > 0 and displayname not in (
+            speaker_fullname,
+            speaker_shortname,
+        ):
+            name = displayname + marks['('] + speaker_shortname + marks[')']
+        else:
+            name = displayname
+
+        return name + marks[':'] + talk['body'].replace('\n', ' ')
+
+    async def render_story(
+        self,
+        json_data: str | dict[str, dict[str, Any]],
+        lang: str,
+        mark_lang: str,
+        show_characters: bool = True,
+    ) -> str:
+        with util.Metrics.timer('story_parse_seconds', reader='bang'):
+            if self.parse_pool is None or isinstance(json_data, str):
+                return self.read_story_in_json(
+                    json_data, lang, mark_lang, show_characters
                 )
-                + Mark_multi_lang[')'][mark_lang]
+            return await self.parse_pool.read_story_in_json(
+                json_data, lang, mark_lang, show_characters
             )
-        else:
-            return ''
 
     def read_story_in_json(
         self,
@@ -119,9 +223,6 @@ class Story_reader(util.Base_fetcher):
         if isinstance(json_data, str):
             return json_data
 
-        talks = json_data['Base']['talkData']
-        specialEffects = json_data['Base']['specialEffectData']
-
         if show_characters:
             appearCharacters = json_data['Base']['appearCharacters']
             chara_id = set()
@@ -132,107 +233,16 @@ class Story_reader(util.Base_fetcher):
         else:
             chara_id_list = []
 
-        ret0 = self.make_characters(chara_id_list, lang, mark_lang)
-
-        snippets = json_data['Base']['snippets']
-        next_talk_need_newline = True
-
-        ret = ''
-        index = -1
-        for snippet in snippets:
-            index += 1
-            if self.debug_parse:
-                ret += f"{index},{snippet['referenceIndex']},"
+        renderer = self.get_renderer(mark_lang)
+        marks = renderer.marks
 
-            if snippet['actionType'] == util.SnippetAction.SpecialEffect:
-                specialEffect = specialEffects[snippet['referenceIndex']]
-                if specialEffect['effectType'] == util.SpecialEffectType.Telop:
-                    ret += (
-                        '\n'
-                        + Mark_multi_lang['['][mark_lang]
-                        + specialEffect['stringVal']
-                        + Mark_multi_lang[']'][mark_lang]
-                        + '\n'
-                    )
-                    next_talk_need_newline = True
-                elif (
-                    specialEffect['effectType']
-                    == util.SpecialEffectType.ChangeBackground
-                ):
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += (
-                        Mark_multi_lang['background'][mark_lang]
-                        + (f": {specialEffect}" if self.debug_parse else '')
-                        + '\n'
-                    )
-                    next_talk_need_newline = False
-                elif specialEffect['effectType'] == util.SpecialEffectType.FlashbackIn:
-                    ret += '\n' + Mark_multi_lang['memory in'][mark_lang] + '\n'
-                    next_talk_need_newline = True
-                elif specialEffect['effectType'] == util.SpecialEffectType.FlashbackOut:
-                    ret += '\n' + Mark_multi_lang['memory out'][mark_lang] + '\n'
-                    next_talk_need_newline = True
-                elif specialEffect['effectType'] == util.SpecialEffectType.BlackOut:
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += Mark_multi_lang['black out'][mark_lang] + '\n'
-                    next_talk_need_newline = False
-                elif specialEffect['effectType'] == util.SpecialEffectType.WhiteOut:
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += Mark_multi_lang['white out'][mark_lang] + '\n'
-                    next_talk_need_newline = False
-                else:
-                    if self.debug_parse:
-                        try:
-                            effect_name = util.SpecialEffectType(
-                                specialEffect['effectType']
-                            ).name
-                        except ValueError:
-                            effect_name = specialEffect['effectType']
-                        ret += f"SpecialEffect-{effect_name}: {specialEffect}\n"
-            elif snippet['actionType'] == util.SnippetAction.Talk:
-                talk = talks[snippet['referenceIndex']]
-
-                talk_charaid = talk['talkCharacters'][0]['characterId']
-                _, speaker_fullname, speaker_shortname = (
-                    self.get_chara_bandAbbr_and_names(talk_charaid, lang)
-                )
-
-                displayname = talk['windowDisplayName'].replace('\n', ' ')
-
-                if len(speaker_fullname) > 0 and displayname not in (
-                    speaker_fullname,
-                    speaker_shortname,
-                ):
-                    name = (
-                        displayname
-                        + util.Mark_multi_lang['('][mark_lang]
-                        + speaker_shortname
-                        + util.Mark_multi_lang[')'][mark_lang]
-                    )
-                else:
-                    name = displayname
-
-                if next_talk_need_newline:
-                    ret += '\n'
-                ret += (
-                    name
-                    + Mark_multi_lang[':'][mark_lang]
-                    + talk['body'].replace('\n', ' ')
-                    + '\n'
-                )
-                next_talk_need_newline = False
-            else:
-                if self.debug_parse:
-                    try:
-                        snippet_name = util.SnippetAction(snippet['actionType']).name
-                    except ValueError:
-                        snippet_name = snippet['actionType']
-                    ret += f"{snippet_name}\n"
-
-        return (ret0 + '\n\n' + ret.strip()).strip()
+        return renderer.render(
+            self.make_characters(chara_id_list, lang, mark_lang),
+            json_data['Base']['snippets'],
+            json_data['Base']['specialEffectData'],
+            json_data['Base']['talkData'],
+            lambda talk: self.render_talk(talk, lang, marks),
+        )
 
 
 class Event_story_getter(util.Base_getter):
@@ -275,11 +285,12 @@ class Event_story_getter(util.Base_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
-        self.events_all_json: dict[str, dict[str, Any]] = await self.fetch_url_json(
-            self.events_all_url, force_online=self.force_master_online
+        self.events_all_json: dict[str, dict[str, Any]] = await self.fetch_master_json(
+            self.events_all_url
         )
 
         self.events_ids: set[int] = {int(id) for id in self.events_all_json.keys()}
@@ -340,19 +351,31 @@ class Event_story_getter(util.Base_getter):
         id = story['scenarioId']
 
         filename = util.valid_filename(name + '.txt')
+        file_path = os.path.join(event_save_dir, filename)
 
-        if ('bandStoryId' not in story) and (
+        has_asset = ('bandStoryId' not in story) and (
             event_id not in Event_story_getter.event_is_main
-        ):
+        )
+        asset_url = self.event_asset_url.format(lang=lang, event_id=event_id, id=id)
+        build_key = await self.build_key(
+            [asset_url] if has_asset else [],
+            self.reader.build_options(lang, mark_lang),
+            event_id,
+            story,
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
+
+        if has_asset:
             story_json = await self.fetch_url_json(
-                self.event_asset_url.format(lang=lang, event_id=event_id, id=id),
+                asset_url,
                 name,
                 compress=self.compress_assets,
                 skip_read=not self.parse,
             )
 
             if self.parse:
-                text = self.reader.read_story_in_json(story_json, lang, mark_lang)
+                text = await self.reader.render_story(story_json, lang, mark_lang)
             else:
                 text = ''
         elif event_id in Event_story_getter.event_is_main:
@@ -363,25 +386,26 @@ class Event_story_getter(util.Base_getter):
             story_json = ''
 
         if self.parse and not util.judge_need_skip(story_json):
-            file_path = os.path.join(event_save_dir, filename)
             util.remove_olds_or_rename_old(file_path, r'([^\s]+) ')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 f.write(name + '\n\n')
                 f.write(f'{synopsis}' + '\n\n')
                 f.write(text + '\n')
+            util.BuildState.record(file_path, build_key)
 
         logging.info(f'get event {event_id} {event_name} {name} done.')
 
-    async def get_newest(
+    def newest_ids(
         self,
         lang: str = 'cn',
-        mark_lang: str = 'cn',
         quantity: int = 10,
         timestamp13: int | None = None,
         exclude_new: int | None = None,
-    ) -> None:
+    ) -> list[int]:
         '''
         quantity 0 = all
+
+        return event ids from old to new
         '''
         if timestamp13 is None:
             timestamp13 = util.LATE_TIMESTAMP13
@@ -400,6 +424,21 @@ class Event_story_getter(util.Base_getter):
         if exclude_new:
             new_eventids = new_eventids[:-exclude_new]
 
+        return new_eventids
+
+    async def get_newest(
+        self,
+        lang: str = 'cn',
+        mark_lang: str = 'cn',
+        quantity: int = 10,
+        timestamp13: int | None = None,
+        exclude_new: int | None = None,
+    ) -> None:
+        '''
+        quantity 0 = all
+        '''
+        new_eventids = self.newest_ids(lang, quantity, timestamp13, exclude_new)
+
         tasks = []
         for i in new_eventids:
             tasks.append(self.get(i, lang, mark_lang))
@@ -443,18 +482,18 @@ class Band_story_getter(util.Base_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
         self.bands_json, self.info_json = await asyncio.gather(
-            self.fetch_url_json(
-                self.bands_main_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.bandstories_5_url, force_online=self.force_master_online
-            ),
+            self.fetch_master_json(self.bands_main_url),
+            self.fetch_master_json(self.bandstories_5_url),
         )
 
+    def tell_band_ids(self) -> list[int]:
+        return sorted({band_story['bandId'] for band_story in self.info_json.values()})
+
     async def get(
         self,
         want_band_id: int | None = None,
@@ -534,23 +573,31 @@ class Band_story_getter(util.Base_getter):
         id = story['scenarioId']
 
         filename = util.valid_filename(name + '.txt')
+        file_path = os.path.join(band_save_dir, filename)
+
+        asset_url = self.band_asset_url.format(lang=lang, band_id=band_id, id=id)
+        build_key = await self.build_key(
+            [asset_url], self.reader.build_options(lang, mark_lang), story
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
 
         story_json: dict[str, dict[str, Any]] = await self.fetch_url_json(
-            self.band_asset_url.format(lang=lang, band_id=band_id, id=id),
+            asset_url,
             name,
             compress=self.compress_assets,
             skip_read=not self.parse,
         )
 
         if self.parse and not util.judge_need_skip(story_json):
-            text = self.reader.read_story_in_json(story_json, lang, mark_lang)
+            text = await self.reader.render_story(story_json, lang, mark_lang)
 
-            file_path = os.path.join(band_save_dir, filename)
             util.remove_olds_or_rename_old(file_path, r'([^\s]+) ')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 f.write(name + '\n\n')
                 f.write(synopsis + '\n\n')
                 f.write(text + '\n')
+            util.BuildState.record(file_path, build_key)
 
         logging.info(
             f'get band story {band_name} {band_story["mainTitle"][Constant.lang_index[lang]]} {name} done.'
@@ -591,13 +638,17 @@ class Main_story_getter(util.Base_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
-        self.info_json: dict[str, dict[str, Any]] = await self.fetch_url_json(
-            self.mainstories_5_url, force_online=self.force_master_online
+        self.info_json: dict[str, dict[str, Any]] = await self.fetch_master_json(
+            self.mainstories_5_url
         )
 
+    def tell_ids(self) -> list[int]:
+        return [int(strId) for strId in self.info_json]
+
     async def get(
         self, id_range: list[int] | None = None, lang: str = 'cn', mark_lang: str = 'cn'
     ) -> None:
@@ -638,22 +689,31 @@ class Main_story_getter(util.Base_getter):
         synopsis: str,
         mark_lang: str,
     ) -> None:
+        file_path = os.path.join(self.save_dir.format(lang=lang), filename)
+
+        asset_url = self.main_asset_url.format(lang=lang, id=id)
+        build_key = await self.build_key(
+            [asset_url], self.reader.build_options(lang, mark_lang), name, synopsis
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
+
         story_json: dict[str, dict[str, Any]] = await self.fetch_url_json(
-            self.main_asset_url.format(lang=lang, id=id),
+            asset_url,
             name,
             compress=self.compress_assets,
             skip_read=not self.parse,
         )
 
         if self.parse and not util.judge_need_skip(story_json):
-            text = self.reader.read_story_in_json(story_json, lang, mark_lang)
+            text = await self.reader.render_story(story_json, lang, mark_lang)
 
-            file_path = os.path.join(self.save_dir.format(lang=lang), filename)
             util.remove_olds_or_rename_old(file_path, r'([^\s]+) ')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 f.write(name + '\n\n')
                 f.write(synopsis + '\n\n')
                 f.write(text + '\n')
+            util.BuildState.record(file_path, build_key)
 
         logging.info(f'get main story {name} done.')
 
@@ -695,11 +755,12 @@ class Card_story_getter(util.Base_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
-        self.cards_all_json: dict[str, dict[str, Any]] = await self.fetch_url_json(
-            self.cards_all_5_url, force_online=self.force_master_online
+        self.cards_all_json: dict[str, dict[str, Any]] = await self.fetch_master_json(
+            self.cards_all_5_url
         )
 
         self.cards_ids: set[int] = {int(id) for id in self.cards_all_json.keys()}
@@ -765,12 +826,30 @@ class Card_story_getter(util.Base_getter):
         story_1_type = card['episodes']['entries'][0]['episodeType']
         story_2_type = card['episodes']['entries'][1]['episodeType']
 
+        story_1_url = self.card_asset_url.format(
+            lang=lang,
+            res_id=resourceSetName,
+            scenarioId=card['episodes']['entries'][0]['scenarioId'],
+        )
+        story_2_url = self.card_asset_url.format(
+            lang=lang,
+            res_id=resourceSetName,
+            scenarioId=card['episodes']['entries'][1]['scenarioId'],
+        )
+
+        file_path = os.path.join(card_save_dir, card_story_filename)
+        build_key = await self.build_key(
+            ([story_1_url] if story_1_type != 'animation' else []) + [story_2_url],
+            self.reader.build_options(lang, mark_lang),
+            card,
+            chara_name,
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
+
         if story_1_type != 'animation':
-            scenarioId_1 = card['episodes']['entries'][0]['scenarioId']
             story_1_json_task = self.fetch_url_json(
-                self.card_asset_url.format(
-                    lang=lang, res_id=resourceSetName, scenarioId=scenarioId_1
-                ),
+                story_1_url,
                 card_story_name + ' part1',
                 compress=self.compress_assets,
                 skip_read=not self.parse,
@@ -782,12 +861,8 @@ class Card_story_getter(util.Base_getter):
 
             story_1_json_task = noop()
 
-        scenarioId_2 = card['episodes']['entries'][1]['scenarioId']
-
         story_2_json_task = self.fetch_url_json(
-            self.card_asset_url.format(
-                lang=lang, res_id=resourceSetName, scenarioId=scenarioId_2
-            ),
+            story_2_url,
             card_story_name + 'part 2',
             compress=self.compress_assets,
             skip_read=not self.parse,
@@ -801,8 +876,10 @@ class Card_story_getter(util.Base_getter):
         story_2_json = bypass_asset_missing(story_2_json)[1]
 
         if self.parse:
-            text_1 = self.reader.read_story_in_json(story_1_json, lang, mark_lang)
-            text_2 = self.reader.read_story_in_json(story_2_json, lang, mark_lang)
+            text_1, text_2 = await asyncio.gather(
+                self.reader.render_story(story_1_json, lang, mark_lang),
+                self.reader.render_story(story_2_json, lang, mark_lang),
+            )
         else:
             text_1 = ''
             text_2 = ''
@@ -812,9 +889,8 @@ class Card_story_getter(util.Base_getter):
             util.remove_olds_or_rename_old(card_save_dir, r'(\d+) ')
             os.makedirs(card_save_dir, exist_ok=True)
 
-            file_path = os.path.join(card_save_dir, card_story_filename)
             util.remove_olds_or_rename_old(file_path, r'(\d+)_')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 f.write(card_story_name + '\n\n')
                 f.write(Mark_multi_lang['skill name'][mark_lang] + skill_name)
                 if card_gachaText:
@@ -838,20 +914,22 @@ class Card_story_getter(util.Base_getter):
                     + '\n\n'
                 )
                 f.write(text_2 + '\n')
+            util.BuildState.record(file_path, build_key)
 
         logging.info(f'get card {card_story_filename} done.')
 
-    async def get_newest(
+    def newest_ids(
         self,
         lang: str = 'cn',
-        mark_lang: str = 'cn',
         quantity: int = 50,
         timestamp13: int | None = None,
         exclude: list[int] | None = None,
         exclude_new: int | None = None,
-    ) -> None:
+    ) -> list[int]:
         '''
         quantity 0 = all
+
+        return card ids from old to new
         '''
         if timestamp13 is None:
             timestamp13 = util.LATE_TIMESTAMP13
@@ -872,6 +950,22 @@ class Card_story_getter(util.Base_getter):
         if exclude_new:
             new_cardids = new_cardids[:-exclude_new]
 
+        return new_cardids
+
+    async def get_newest(
+        self,
+        lang: str = 'cn',
+        mark_lang: str = 'cn',
+        quantity: int = 50,
+        timestamp13: int | None = None,
+        exclude: list[int] | None = None,
+        exclude_new: int | None = None,
+    ) -> None:
+        '''
+        quantity 0 = all
+        '''
+        new_cardids = self.newest_ids(lang, quantity, timestamp13, exclude, exclude_new)
+
         tasks = []
         for i in new_cardids:
             tasks.append(self.get(i, lang, mark_lang))
@@ -920,17 +1014,16 @@ class Area_talk_getter(util.Base_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
         self.area_name_json: dict[str, dict[str, str]]
         self.actionSets_json: dict[str, dict[str, Any]]
 
         self.area_name_json, self.actionSets_json = await asyncio.gather(
-            self.fetch_url_json(self.areas_url, force_online=self.force_master_online),
-            self.fetch_url_json(
-                self.actionSets_url, force_online=self.force_master_online
-            ),
+            self.fetch_master_json(self.areas_url),
+            self.fetch_master_json(self.actionSets_url),
         )
 
     async def get(
@@ -985,27 +1078,53 @@ class Area_talk_getter(util.Base_getter):
             logging.info(f'talk {talk_type} {area_id} does not exist.')
             return
 
-        async def noop(x: str) -> str:
-            return x
-
-        tasks = []
+        scenario_urls: list[str | None] = []
         for talk_id, talk_actionset_json in zip(
             legal_talk_ids, legal_talk_actionset_jsons
         ):
             if isinstance(talk_actionset_json, str):
-                tasks.append(noop(talk_actionset_json))
+                scenario_urls.append(None)
             else:
                 scenario_id = talk_actionset_json['Base']['details'][0][
                     'reactionTypeBelongId'
                 ]
+                scenario_urls.append(
+                    self.talk_scenario_asset.format(
+                        lang=lang,
+                        group=math.floor(talk_id / 256),
+                        scenario_id=scenario_id,
+                    )
+                )
+
+        area_name = self.area_name_json[str(area_id)]['areaName'][
+            Constant.lang_index[lang]
+        ]
+        filename = f'talk_{talk_type}_{area_id:0{self.maxlen_areaID}} {area_name}'
+        filepath = os.path.join(self.save_dir.format(lang=lang), filename) + '.txt'
+
+        build_key = await self.build_key(
+            [url for url in scenario_urls if url is not None],
+            self.reader.build_options(lang, mark_lang),
+            legal_talk_ids,
+            legal_talk_actionset_jsons,
+            area_name,
+        )
+        if util.BuildState.unchanged(filepath, build_key):
+            return
+
+        async def noop(x: str) -> str:
+            return x
 
+        tasks = []
+        for talk_id, talk_actionset_json, scenario_url in zip(
+            legal_talk_ids, legal_talk_actionset_jsons, scenario_urls
+        ):
+            if scenario_url is None:
+                tasks.append(noop(talk_actionset_json))
+            else:
                 tasks.append(
                     self.fetch_url_json(
-                        self.talk_scenario_asset.format(
-                            lang=lang,
-                            group=math.floor(talk_id / 256),
-                            scenario_id=scenario_id,
-                        ),
+                        scenario_url,
                         str(talk_id),
                         print_done=self.print_fetch_detial,
                         compress=self.compress_assets,
@@ -1022,19 +1141,15 @@ class Area_talk_getter(util.Base_getter):
         if self.parse and not util.judge_need_skip(*talk_jsons):
             os.makedirs(self.save_dir.format(lang=lang), exist_ok=True)
 
-            texts = [
-                self.reader.read_story_in_json(talk_json, lang, mark_lang)
-                for talk_json in talk_jsons
-            ]
-
-            area_name = self.area_name_json[str(area_id)]['areaName'][
-                Constant.lang_index[lang]
-            ]
-            filename = f'talk_{talk_type}_{area_id:0{self.maxlen_areaID}} {area_name}'
+            texts = await asyncio.gather(
+                *[
+                    self.reader.render_story(talk_json, lang, mark_lang)
+                    for talk_json in talk_jsons
+                ]
+            )
 
-            filepath = os.path.join(self.save_dir.format(lang=lang), filename) + '.txt'
             util.remove_olds_or_rename_old(filepath, r'([^\s\.]+)')
-            with open(filepath, 'w', encoding='utf8') as f:
+            with util.open_for_write(filepath) as f:
                 left = Mark_multi_lang['['][mark_lang]
                 right = Mark_multi_lang[']'][mark_lang]
 
@@ -1054,6 +1169,7 @@ class Area_talk_getter(util.Base_getter):
                     # if charaters:
                     #     f.write(charaters + '\n\n')
                     f.write(text + '\n\n\n')
+            util.BuildState.record(filepath, build_key)
 
         logging.info(f'get talk {talk_type} {area_id} done.')
 
@@ -1098,7 +1214,7 @@ class Area_talk_getter(util.Base_getter):
         if self.parse and not util.judge_need_skip(talk_json):
             os.makedirs(self.save_dir.format(lang=lang), exist_ok=True)
 
-            text = self.reader.read_story_in_json(talk_json, lang, mark_lang)
+            text = await self.reader.render_story(talk_json, lang, mark_lang)
 
             filename = f'talk_{talk_id}'
 
@@ -1106,10 +1222,8 @@ class Area_talk_getter(util.Base_getter):
                 Constant.lang_index[lang]
             ]
 
-            with open(
-                os.path.join(self.save_dir.format(lang=lang), filename) + '.txt',
-                'w',
-                encoding='utf8',
+            with util.open_for_write(
+                os.path.join(self.save_dir.format(lang=lang), filename) + '.txt'
             ) as f:
                 left = Mark_multi_lang['['][mark_lang]
                 right = Mark_multi_lang[']'][mark_lang]
@@ -1139,9 +1253,7 @@ async def main():
     card_getter = Card_story_getter(reader, online=online)
     area_getter = Area_talk_getter(reader, online=online)
 
-    async with ClientSession(
-        trust_env=True, connector=TCPConnector(limit=net_connect_limit)
-    ) as session:
+    async with util.Connections.create_session(net_connect_limit) as session:
 
         await asyncio.gather(
             reader.init(session),
@@ -3,7 +3,7 @@ from pathlib import Path
 from asyncio import Semaphore
 from typing import Any, Callable, Optional, cast
 
-from aiohttp import ClientSession, TCPConnector
+from aiohttp import ClientSession
 
 from . import util
 from .util import Mark_multi_lang
@@ -98,6 +98,22 @@ class Pjsk_fetcher(util.Base_fetcher):
             raise RuntimeError(url)
         return os.path.normpath(os.path.join(f'pjsk-{lang}-assets', asset_name))
 
+    def asset_append_save_path(
+        self, urls: list[str], lang_for_path: str | None = None
+    ) -> str:
+        lang_for_path = (
+            lang_for_path
+            or getattr(getattr(self, 'reader', None), 'lang', None)
+            or getattr(self, 'lang', None)
+        )
+        assert lang_for_path is not None
+
+        master_name_match = re.search(r'master.*/(\w+\.json)', urls[0])
+        if master_name_match:
+            return Pjsk_fetcher.__url_to_apd_path_master(urls[0], lang_for_path)
+        else:
+            return Pjsk_fetcher.__url_to_apd_path_asset(urls[0], lang_for_path)
+
     async def fetch_url_json(
         self,
         url: str | list[str],
@@ -114,24 +130,8 @@ class Pjsk_fetcher(util.Base_fetcher):
     ) -> Any:
         assert append_save_path is None
 
-        lang_for_path = (
-            lang_for_path
-            or getattr(getattr(self, 'reader', None), 'lang', None)
-            or getattr(self, 'lang', None)
-        )
-        assert lang_for_path is not None
-
         urls = [url] if isinstance(url, str) else url
-
-        master_name_match = re.search(r'master.*/(\w+\.json)', urls[0])
-        if master_name_match:
-            append_save_path = Pjsk_fetcher.__url_to_apd_path_master(
-                urls[0], lang_for_path
-            )
-        else:
-            append_save_path = Pjsk_fetcher.__url_to_apd_path_asset(
-                urls[0], lang_for_path
-            )
+        append_save_path = self.asset_append_save_path(urls, lang_for_path)
 
         return await super().fetch_url_json(
             url,
@@ -146,6 +146,34 @@ class Pjsk_fetcher(util.Base_fetcher):
             format=format,
         )
 
+    async def fetch_master_json(
+        self,
+        url: str | list[str],
+        content_save_edit: Callable | None = None,
+        lang_for_path: str | None = None,
+    ) -> Any:
+        lang_for_path = (
+            lang_for_path
+            or getattr(getattr(self, 'reader', None), 'lang', None)
+            or getattr(self, 'lang', None)
+        )
+        assert lang_for_path is not None
+
+        urls = [url] if isinstance(url, str) else url
+        master_name = os.path.basename(
+            Pjsk_fetcher.__url_to_apd_path_master(urls[0], lang_for_path)
+        )
+
+        return await util.MasterCache.get(
+            ('pjsk', lang_for_path, master_name, self.force_master_online),
+            lambda: self.fetch_url_json(
+                url,
+                force_online=self.force_master_online,
+                content_save_edit=content_save_edit,
+                lang_for_path=lang_for_path,
+            ),
+        )
+
 
 class Pjsk_getter(Pjsk_fetcher, util.Base_getter):
     pass
@@ -183,6 +211,11 @@ class Story_reader(Pjsk_fetcher):
         # self.cg_link = 'https://sekai-assets-bdf29c81.seiunx.net/jp-assets/ondemand/scenario/background/{pic_name}/{pic_name}.png'
         self.cg_link = 'https://storage.sekai.best/sekai-jp-assets/scenario/background/{pic_name}/{pic_name}.webp'
 
+        self.renderer = self.__make_renderer()
+        self.chara2d_names: dict[int, tuple[str, str, str, bool]] = {}
+        self.parse_pool: util.Parse_pool | None = None
+        self.masters_digest: str | None = None
+
         self.gameCharacters_url = Constant.get_srcs_url(
             lang, src, 'master', 'gameCharacters'
         )
@@ -194,20 +227,76 @@ class Story_reader(Pjsk_fetcher):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
         self.gameCharacters, self.character2ds = await asyncio.gather(
-            self.fetch_url_json(
-                self.gameCharacters_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.character2ds_url, force_online=self.force_master_online
-            ),
+            self.fetch_master_json(self.gameCharacters_url),
+            self.fetch_master_json(self.character2ds_url),
         )
 
-        self.gameCharacters_lookup = util.DictLookup(self.gameCharacters, 'id')
-        self.character2ds_lookup = util.DictLookup(self.character2ds, 'id')
+        self.gameCharacters_lookup = util.MasterCache.lookup(self.gameCharacters, 'id')
+        self.character2ds_lookup = util.MasterCache.lookup(self.character2ds, 'id')
+        self.chara2d_names = {}
+        self.masters_digest = None
+
+    def build_options(self) -> tuple:
+        """增量重建指纹中 reader 的部分：解析选项与角色 master 的摘要。"""
+        if self.masters_digest is None:
+            self.masters_digest = util.BuildState.key(
+                self.gameCharacters, self.character2ds
+            )
+        return (
+            self.lang,
+            self.mark_lang,
+            self.cg_add_link,
+            self.debug_parse,
+            self.masters_digest,
+        )
+
+    def start_parse_pool(self, workers: int) -> None:
+        """之后的 render_story 在 workers 个子进程中解析；须在 init 之后调用。"""
+        self.parse_pool = util.Parse_pool(
+            Story_reader.from_snapshot,
+            (
+                self.lang,
+                self.mark_lang,
+                self.debug_parse,
+                self.cg_add_link,
+                self.gameCharacters,
+                self.character2ds,
+            ),
+            workers,
+        )
+
+    def close_parse_pool(self) -> None:
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown()
+            self.parse_pool = None
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        lang: str,
+        mark_lang: str,
+        debug_parse: bool,
+        cg_add_link: bool,
+        gameCharacters: list[dict[str, Any]],
+        character2ds: list[dict[str, Any]],
+    ) -> 'Story_reader':
+        reader = cls(
+            lang=lang,
+            online=False,
+            mark_lang=mark_lang,
+            debug_parse=debug_parse,
+            cg_add_link=cg_add_link,
+        )
+        reader.gameCharacters = gameCharacters
+        reader.character2ds = character2ds
+        reader.gameCharacters_lookup = util.MasterCache.lookup(gameCharacters, 'id')
+        reader.character2ds_lookup = util.MasterCache.lookup(character2ds, 'id')
+        return reader
 
     def get_chara_unitAbbr_names(self, chara_id: int) -> tuple[str, str, str]:
         profile_index = self.gameCharacters_lookup.find_index(chara_id)
@@ -238,6 +327,15 @@ class Story_reader(Pjsk_fetcher):
 
     def get_chara2d_unitAbbr_names_isVS(
         self, chara2dId: int
+    ) -> tuple[str, str, str, bool]:
+        names = self.chara2d_names.get(chara2dId)
+        if names is None:
+            names = self.__chara2d_unitAbbr_names_isVS(chara2dId)
+            self.chara2d_names[chara2dId] = names
+        return names
+
+    def __chara2d_unitAbbr_names_isVS(
+        self, chara2dId: int
     ) -> tuple[str, str, str, bool]:
         chara2d = self.character2ds[self.character2ds_lookup.find_index(chara2dId)]
         if chara2d['characterType'] != 'game_character':
@@ -250,13 +348,107 @@ class Story_reader(Pjsk_fetcher):
         else:
             return Constant.unit_code_abbr[actual_unit], fullname, givenname, True
 
+    def __make_renderer(self) -> util.Story_renderer:
+        renderer = util.Story_renderer(
+            self.mark_lang,
+            self.debug_parse,
+            action_key='Action',
+            reference_key='ReferenceIndex',
+            effect_type_key='EffectType',
+            index_key='Index',
+        )
+        marks = renderer.marks
+        left, right = marks['('], marks[')']
+
+        def bracketed(mark: str) -> Callable[[dict[str, Any]], str]:
+            return lambda effect: f"{mark}{effect['StringVal']}{right}"
+
+        def change_background(effect: dict[str, Any]) -> str:
+            pic_name = effect['StringVal']
+            if Constant.is_cg(pic_name):
+                if not self.cg_add_link:
+                    return f"{marks['cg']}{pic_name}{right}"
+                else:
+                    return (
+                        f"{marks['cg']}{self.cg_link.format(pic_name=pic_name)}{right}"
+                    )
+            else:
+                return marks['background'] + (
+                    f': {pic_name}' if self.debug_parse else ''
+                )
+
+        Effect = util.SpecialEffectType
+        renderer.add_effect(
+            Effect.Telop,
+            lambda effect: marks['['] + effect['StringVal'] + marks[']'],
+            block=True,
+        )
+        renderer.add_effect(Effect.PlaceInfo, bracketed(marks['place']))
+        renderer.add_effect(
+            Effect.FullScreenText,
+            lambda effect: marks['fullscreen text']
+            + effect['StringVal'].replace('\n', ' '),
+        )
+        renderer.add_effect(Effect.SimpleSelectable, bracketed(marks['selection']))
+        renderer.add_effect(Effect.Movie, bracketed(marks['video']))
+        renderer.add_effect(
+            Effect.PlayMV, lambda effect: f"{marks['mv']}{effect['IntVal']}{right}"
+        )
+        renderer.add_effect(Effect.ChangeBackground, change_background)
+        renderer.add_effect(
+            Effect.FlashbackIn, lambda effect: marks['memory in'], block=True
+        )
+        renderer.add_effect(
+            Effect.FlashbackOut, lambda effect: marks['memory out'], block=True
+        )
+        renderer.add_effect(Effect.BlackOut, lambda effect: marks['black out'])
+        renderer.add_effect(Effect.WhiteOut, lambda effect: marks['white out'])
+        return renderer
+
+    def __render_talk(self, talk: dict[str, Any]) -> str:
+        marks = self.renderer.marks
+
+        talk_chara2did = talk['TalkCharacters'][0]['Character2dId']
+        unit, speaker_fullname, speaker_shortname, isVS = (
+            self.get_chara2d_unitAbbr_names_isVS(talk_chara2did)
+        )
+        if isVS and unit not in (
+            'VS',
+            'none',
+        ):  # none for some VS in chara2D, like card 335
+            need_unit_annotation = True
+        else:
+            need_unit_annotation = False
+
+        displayname = talk['WindowDisplayName'].replace('\n', ' ')
+
+        if len(speaker_fullname) > 0 and (
+            displayname not in (speaker_fullname, speaker_shortname)
+        ):
+            name = (
+                displayname
+                + marks['(']
+                + speaker_shortname
+                + (f'-{unit}' if need_unit_annotation else '')
+                + marks[')']
+            )
+        else:
+            name = displayname + (
+                (marks['('] + unit + marks[')']) if need_unit_annotation else ''
+            )
+
+        return name + marks[':'] + talk['Body'].replace('\n', ' ')
+
+    async def render_story(self, json_data: str | dict[str, Any]) -> str:
+        with util.Metrics.timer('story_parse_seconds', reader='pjsk'):
+            if self.parse_pool is None or isinstance(json_data, str):
+                return self.read_story_in_json(json_data)
+            return await self.parse_pool.read_story_in_json(json_data)
+
     def read_story_in_json(self, json_data: str | dict[str, Any]) -> str:
         if isinstance(json_data, str):
             return json_data
 
-        talks = json_data['TalkData']
-        specialEffects = json_data['SpecialEffectData']
-
         appearCharacters = json_data['AppearCharacters']
         chara_id = set()
 
@@ -267,172 +459,17 @@ class Story_reader(Pjsk_fetcher):
                 chara_id.add(chara2d['characterId'])
         chara_id_list = sorted(chara_id)
 
-        if len(chara_id_list) > 0:
-            ret0 = (
-                Mark_multi_lang['characters'][self.mark_lang]
-                + Mark_multi_lang[','][self.mark_lang].join(
-                    [self.get_chara_unitAbbr_names(id)[1] for id in chara_id_list]
-                )
-                + Mark_multi_lang[')'][self.mark_lang]
-            )
-        else:
-            ret0 = ''
-
-        snippets = json_data['Snippets']
-        next_talk_need_newline = True
-
-        ret = ''
-        for snippet in snippets:
-            snippet_index = snippet['Index']
-            if self.debug_parse:
-                ret += f"{snippet_index},{snippet['ReferenceIndex']},"
-
-            if snippet['Action'] == util.SnippetAction.SpecialEffect:
-                specialEffect = specialEffects[snippet['ReferenceIndex']]
-                if specialEffect['EffectType'] == util.SpecialEffectType.Telop:
-                    ret += (
-                        '\n'
-                        + Mark_multi_lang['['][self.mark_lang]
-                        + specialEffect['StringVal']
-                        + Mark_multi_lang[']'][self.mark_lang]
-                        + '\n'
-                    )
-                    next_talk_need_newline = True
-                elif specialEffect['EffectType'] == util.SpecialEffectType.PlaceInfo:
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += f"{Mark_multi_lang['place'][self.mark_lang]}{specialEffect['StringVal']}{Mark_multi_lang[')'][self.mark_lang]}\n"
-                    next_talk_need_newline = False
-                elif (
-                    specialEffect['EffectType'] == util.SpecialEffectType.FullScreenText
-                ):
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += (
-                        Mark_multi_lang['fullscreen text'][self.mark_lang]
-                        + specialEffect['StringVal'].replace('\n', ' ')
-                        + '\n'
-                    )
-                    next_talk_need_newline = False
-                elif (
-                    specialEffect['EffectType']
-                    == util.SpecialEffectType.SimpleSelectable
-                ):
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += f"{Mark_multi_lang['selection'][self.mark_lang]}{specialEffect['StringVal']}{Mark_multi_lang[')'][self.mark_lang]}\n"
-                    next_talk_need_newline = False
-                elif specialEffect['EffectType'] == util.SpecialEffectType.Movie:
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += f"{Mark_multi_lang['video'][self.mark_lang]}{specialEffect['StringVal']}{Mark_multi_lang[')'][self.mark_lang]}\n"
-                    next_talk_need_newline = False
-                elif specialEffect['EffectType'] == util.SpecialEffectType.PlayMV:
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += f"{Mark_multi_lang['mv'][self.mark_lang]}{specialEffect['IntVal']}{Mark_multi_lang[')'][self.mark_lang]}\n"
-                    next_talk_need_newline = False
-                elif (
-                    specialEffect['EffectType']
-                    == util.SpecialEffectType.ChangeBackground
-                ):
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    pic_name = specialEffect['StringVal']
-                    if Constant.is_cg(pic_name):
-                        if not self.cg_add_link:
-                            ret += f"{Mark_multi_lang['cg'][self.mark_lang]}{pic_name}{Mark_multi_lang[')'][self.mark_lang]}\n"
-                        else:
-                            ret += f"{Mark_multi_lang['cg'][self.mark_lang]}{self.cg_link.format(pic_name=pic_name)}{Mark_multi_lang[')'][self.mark_lang]}\n"
-                    else:
-                        ret += (
-                            Mark_multi_lang['background'][self.mark_lang]
-                            + (f': {pic_name}' if self.debug_parse else '')
-                            + '\n'
-                        )
-                    next_talk_need_newline = False
-                elif specialEffect['EffectType'] == util.SpecialEffectType.FlashbackIn:
-                    ret += '\n' + Mark_multi_lang['memory in'][self.mark_lang] + '\n'
-                    next_talk_need_newline = True
-                elif specialEffect['EffectType'] == util.SpecialEffectType.FlashbackOut:
-                    ret += '\n' + Mark_multi_lang['memory out'][self.mark_lang] + '\n'
-                    next_talk_need_newline = True
-                elif specialEffect['EffectType'] == util.SpecialEffectType.BlackOut:
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += Mark_multi_lang['black out'][self.mark_lang] + '\n'
-                    next_talk_need_newline = False
-                elif specialEffect['EffectType'] == util.SpecialEffectType.WhiteOut:
-                    if next_talk_need_newline:
-                        ret += '\n'
-                    ret += Mark_multi_lang['white out'][self.mark_lang] + '\n'
-                    next_talk_need_newline = False
-                else:
-                    if self.debug_parse:
-                        try:
-                            effect_name = util.SpecialEffectType(
-                                specialEffect['EffectType']
-                            ).name
-                        except ValueError:
-                            effect_name = specialEffect['EffectType']
-                        ret += f"SpecialEffect-{effect_name}: {specialEffect}\n"
-
-            elif snippet['Action'] == util.SnippetAction.Talk:
-                talk = talks[snippet['ReferenceIndex']]
-
-                talk_chara2did = talk['TalkCharacters'][0]['Character2dId']
-                unit, speaker_fullname, speaker_shortname, isVS = (
-                    self.get_chara2d_unitAbbr_names_isVS(talk_chara2did)
-                )
-                if isVS and unit not in (
-                    'VS',
-                    'none',
-                ):  # none for some VS in chara2D, like card 335
-                    need_unit_annotation = True
-                else:
-                    need_unit_annotation = False
-
-                displayname = talk['WindowDisplayName'].replace('\n', ' ')
-
-                if len(speaker_fullname) > 0 and (
-                    displayname not in (speaker_fullname, speaker_shortname)
-                ):
-                    name = (
-                        displayname
-                        + util.Mark_multi_lang['('][self.mark_lang]
-                        + speaker_shortname
-                        + (f'-{unit}' if need_unit_annotation else '')
-                        + util.Mark_multi_lang[')'][self.mark_lang]
-                    )
-                else:
-                    name = displayname + (
-                        (
-                            util.Mark_multi_lang['('][self.mark_lang]
-                            + unit
-                            + util.Mark_multi_lang[')'][self.mark_lang]
-                        )
-                        if need_unit_annotation
-                        else ''
-                    )
-
-                if next_talk_need_newline:
-                    ret += '\n'
-                ret += (
-                    name
-                    + Mark_multi_lang[':'][self.mark_lang]
-                    + talk['Body'].replace('\n', ' ')
-                    + '\n'
-                )
-                next_talk_need_newline = False
-            else:
-                if self.debug_parse:
-                    try:
-                        snippet_name = util.SnippetAction(snippet['Action']).name
-                    except ValueError:
-                        snippet_name = snippet['Action']
-                    ret += f"{snippet_name}\n"
+        header = self.renderer.characters_header(
+            [self.get_chara_unitAbbr_names(id)[1] for id in chara_id_list]
+        )
 
-        return (ret0 + '\n\n' + ret.strip()).strip()
+        return self.renderer.render(
+            header,
+            json_data['Snippets'],
+            json_data['SpecialEffectData'],
+            json_data['TalkData'],
+            self.__render_talk,
+        )
 
 
 class Event_story_getter(Pjsk_getter):
@@ -491,8 +528,9 @@ class Event_story_getter(Pjsk_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
         (
             self.events_json,
@@ -500,23 +538,19 @@ class Event_story_getter(Pjsk_getter):
             self.gameCharacterUnits,
             actionSets_jp,
         ) = await asyncio.gather(
-            self.fetch_url_json(self.events_url, force_online=self.force_master_online),
-            self.fetch_url_json(
-                self.eventStories_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.gameCharacterUnits_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.actionSets_jp_url,
-                lang_for_path='jp',
-                force_online=self.force_master_online,
-            ),
+            self.fetch_master_json(self.events_url),
+            self.fetch_master_json(self.eventStories_url),
+            self.fetch_master_json(self.gameCharacterUnits_url),
+            self.fetch_master_json(self.actionSets_jp_url, lang_for_path='jp'),
         )
 
-        self.events_lookup = util.DictLookup(self.events_json, 'id')
-        self.eventStories_lookup = util.DictLookup(self.eventStories_json, 'eventId')
-        self.gameCharacterUnits_lookup = util.DictLookup(self.gameCharacterUnits, 'id')
+        self.events_lookup = util.MasterCache.lookup(self.events_json, 'id')
+        self.eventStories_lookup = util.MasterCache.lookup(
+            self.eventStories_json, 'eventId'
+        )
+        self.gameCharacterUnits_lookup = util.MasterCache.lookup(
+            self.gameCharacterUnits, 'id'
+        )
 
         self.event_type_map = Event_story_getter.__get_event_type_map(actionSets_jp)
 
@@ -664,39 +698,52 @@ class Event_story_getter(Pjsk_getter):
                 )
 
         scenarioId = episode['scenarioId']
+        story_urls = [
+            url.format(assetbundleName=assetbundleName, scenarioId=scenarioId)
+            for url in self.event_asset_url
+        ]
+
+        file_path = os.path.join(event_save_dir, episode_save_name)
+        build_key = await self.build_key(
+            [story_urls],
+            self.reader.build_options(),
+            episode,
+            event_outline,
+            episode_name,
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
 
         story_json: dict[str, Any] = await self.fetch_url_json(
-            [
-                url.format(assetbundleName=assetbundleName, scenarioId=scenarioId)
-                for url in self.event_asset_url
-            ],
+            story_urls,
             episode_name,
             compress=self.compress_assets,
             skip_read=not self.parse,
         )
 
         if self.parse and not util.judge_need_skip(story_json):
-            text = self.reader.read_story_in_json(story_json)
+            text = await self.reader.render_story(story_json)
 
-            file_path = os.path.join(event_save_dir, episode_save_name)
             util.remove_olds_or_rename_old(file_path, r'(\d+-\d+) ')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 if episode['episodeNo'] == 1:
                     f.write(event_outline + '\n\n')
                 f.write(episode_name + '\n\n')
                 f.write(text + '\n')
+            util.BuildState.record(file_path, build_key)
 
         logging.info(f'get event {event_id} {event_name} {episode_name} done.')
 
-    async def get_newest(
+    def newest_ids(
         self,
         quantity: int = 10,
         timestamp13: int | None = None,
-        area_getter: Optional['Area_talk_getter'] = None,
         exclude_new: int | None = None,
-    ) -> None:
+    ) -> list[int]:
         '''
         quantity 0 = all
+
+        return event ids from old to new
         '''
         if timestamp13 is None:
             timestamp13 = util.LATE_TIMESTAMP13
@@ -713,6 +760,20 @@ class Event_story_getter(Pjsk_getter):
         if exclude_new:
             new_eventids = new_eventids[:-exclude_new]
 
+        return new_eventids
+
+    async def get_newest(
+        self,
+        quantity: int = 10,
+        timestamp13: int | None = None,
+        area_getter: Optional['Area_talk_getter'] = None,
+        exclude_new: int | None = None,
+    ) -> None:
+        '''
+        quantity 0 = all
+        '''
+        new_eventids = self.newest_ids(quantity, timestamp13, exclude_new)
+
         tasks = []
         for i in new_eventids:
             tasks.append(self.get(i))
@@ -777,26 +838,21 @@ class Unit_story_getter(Pjsk_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
         (
             self.unitProfiles_json,
             self.unitStoryEpisodeGroups_json,
             self.unitStories_json,
         ) = await asyncio.gather(
-            self.fetch_url_json(
-                self.unitProfiles_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.unitStoryEpisodeGroups_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.unitStories_url, force_online=self.force_master_online
-            ),
+            self.fetch_master_json(self.unitProfiles_url),
+            self.fetch_master_json(self.unitStoryEpisodeGroups_url),
+            self.fetch_master_json(self.unitStories_url),
         )
 
-        self.unitStoryEpisodeGroups_lookup = util.DictLookup(
+        self.unitStoryEpisodeGroups_lookup = util.MasterCache.lookup(
             self.unitStoryEpisodeGroups_json, 'id'
         )
 
@@ -871,27 +927,35 @@ class Unit_story_getter(Pjsk_getter):
             unit_outline = None
 
         episode_save_name = util.valid_filename(episode_name + '.txt')
+        story_urls = [
+            url.format(assetbundleName=assetbundleName, scenarioId=scenarioId)
+            for url in self.unit_asset_url
+        ]
+
+        file_path = os.path.join(unit_save_dir, episode_save_name)
+        build_key = await self.build_key(
+            [story_urls], self.reader.build_options(), unit_outline, episode_name
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
 
         story_json: dict[str, Any] = await self.fetch_url_json(
-            [
-                url.format(assetbundleName=assetbundleName, scenarioId=scenarioId)
-                for url in self.unit_asset_url
-            ],
+            story_urls,
             episode_name,
             compress=self.compress_assets,
             skip_read=not self.parse,
         )
 
         if self.parse and not util.judge_need_skip(story_json):
-            text = self.reader.read_story_in_json(story_json)
+            text = await self.reader.render_story(story_json)
 
-            file_path = os.path.join(unit_save_dir, episode_save_name)
             util.remove_olds_or_rename_old(file_path, r'([^\s]+) ')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 if unit_outline is not None:
                     f.write(unit_outline + '\n\n')
                 f.write(episode_name + '\n\n')
                 f.write(text + '\n')
+            util.BuildState.record(file_path, build_key)
 
         logging.info(f'get unit {unit_id} {unitName} {episode_name} done.')
 
@@ -948,20 +1012,15 @@ class Card_story_getter(Pjsk_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
         self.cards_json, self.cardEpisodes_json, ori_eventCards_json = (
             await asyncio.gather(
-                self.fetch_url_json(
-                    self.cards_url, force_online=self.force_master_online
-                ),
-                self.fetch_url_json(
-                    self.cardEpisodes_url, force_online=self.force_master_online
-                ),
-                self.fetch_url_json(
-                    self.eventCards_url, force_online=self.force_master_online
-                ),
+                self.fetch_master_json(self.cards_url),
+                self.fetch_master_json(self.cardEpisodes_url),
+                self.fetch_master_json(self.eventCards_url),
             )
         )
 
@@ -970,21 +1029,28 @@ class Card_story_getter(Pjsk_getter):
             if item['isDisplayCardStory']:
                 self.eventCards_json.append(item)
 
-        self.cards_lookup = util.DictLookup(self.cards_json, 'id')
-        self.cardEpisodes_lookup = util.DictLookup(self.cardEpisodes_json, 'cardId')
+        self.cards_lookup = util.MasterCache.lookup(self.cards_json, 'id')
+        self.cardEpisodes_lookup = util.MasterCache.lookup(
+            self.cardEpisodes_json, 'cardId'
+        )
         self.eventCards_lookup = util.DictLookup(self.eventCards_json, 'cardId')
 
     async def get(self, card_id: int) -> None:
         card_index = self.cards_lookup.find_index(card_id)
-        cardEpisode_index = self.cardEpisodes_lookup.find_index(card_id)
+        cardEpisodes = sorted(
+            (
+                self.cardEpisodes_json[i]
+                for i in self.cardEpisodes_lookup.find_all(card_id)
+            ),
+            key=lambda episode: episode.get('seq', 0),
+        )
 
-        if (card_index == -1) or (cardEpisode_index == -1):
+        if (card_index == -1) or (len(cardEpisodes) < 2):
             logging.info(f'card {card_id} does not exist.')
             return
 
         card = self.cards_json[card_index]
-        cardEpisode_1 = self.cardEpisodes_json[cardEpisode_index]
-        cardEpisode_2 = self.cardEpisodes_json[cardEpisode_index + 1]
+        cardEpisode_1, cardEpisode_2 = cardEpisodes[:2]
 
         chara_unit_and_name = '_'.join(
             self.reader.get_chara_unitAbbr_names(card['characterId'])[:2]
@@ -1029,25 +1095,37 @@ class Card_story_getter(Pjsk_getter):
             + '.txt'
         )
 
+        story_1_urls = [
+            url.format(assetbundleName=assetbundleName, scenarioId=story_1_scenarioId)
+            for url in self.card_asset_url
+        ]
+        story_2_urls = [
+            url.format(assetbundleName=assetbundleName, scenarioId=story_2_scenarioId)
+            for url in self.card_asset_url
+        ]
+
+        file_path = os.path.join(card_save_dir, card_story_filename)
+        build_key = await self.build_key(
+            [story_1_urls, story_2_urls],
+            self.reader.build_options(),
+            card_story_name,
+            skill_name,
+            card_gachaPhrase,
+            story_1_name,
+            story_2_name,
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
+
         story_1_json, story_2_json = await asyncio.gather(
             self.fetch_url_json(
-                [
-                    url.format(
-                        assetbundleName=assetbundleName, scenarioId=story_1_scenarioId
-                    )
-                    for url in self.card_asset_url
-                ],
+                story_1_urls,
                 card_story_name + ' part1',
                 compress=self.compress_assets,
                 skip_read=not self.parse,
             ),
             self.fetch_url_json(
-                [
-                    url.format(
-                        assetbundleName=assetbundleName, scenarioId=story_2_scenarioId
-                    )
-                    for url in self.card_asset_url
-                ],
+                story_2_urls,
                 card_story_name + ' part2',
                 compress=self.compress_assets,
                 skip_read=not self.parse,
@@ -1059,12 +1137,13 @@ class Card_story_getter(Pjsk_getter):
             util.remove_olds_or_rename_old(card_save_dir, r'(\d+) ')
             os.makedirs(card_save_dir, exist_ok=True)
 
-            text_1 = self.reader.read_story_in_json(story_1_json)
-            text_2 = self.reader.read_story_in_json(story_2_json)
+            text_1, text_2 = await asyncio.gather(
+                self.reader.render_story(story_1_json),
+                self.reader.render_story(story_2_json),
+            )
 
-            file_path = os.path.join(card_save_dir, card_story_filename)
             util.remove_olds_or_rename_old(file_path, r'(\d+)_')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 f.write(card_story_name + '\n\n')
                 f.write(
                     Mark_multi_lang['skill name'][self.reader.mark_lang] + skill_name
@@ -1090,6 +1169,7 @@ class Card_story_getter(Pjsk_getter):
                     + '\n\n'
                 )
                 f.write(text_2 + '\n')
+            util.BuildState.record(file_path, build_key)
 
         logging.info(f'get card {card_story_name} done.')
 
@@ -1140,14 +1220,16 @@ class Card_story_getter(Pjsk_getter):
             tasks.append(self.get(i))
         await asyncio.gather(*tasks)
 
-    async def get_newest(
+    def newest_ids(
         self,
         quantity: int = 50,
         timestamp13: int | None = None,
         exclude_new: int | None = None,
-    ) -> None:
+    ) -> list[int]:
         '''
         quantity 0 = all
+
+        return card ids from old to new
         '''
         if timestamp13 is None:
             timestamp13 = util.LATE_TIMESTAMP13
@@ -1164,6 +1246,19 @@ class Card_story_getter(Pjsk_getter):
         if exclude_new:
             new_cardids = new_cardids[:-exclude_new]
 
+        return new_cardids
+
+    async def get_newest(
+        self,
+        quantity: int = 50,
+        timestamp13: int | None = None,
+        exclude_new: int | None = None,
+    ) -> None:
+        '''
+        quantity 0 = all
+        '''
+        new_cardids = self.newest_ids(quantity, timestamp13, exclude_new)
+
         tasks = []
         for i in new_cardids:
             tasks.append(self.get(i))
@@ -1221,18 +1316,27 @@ class Area_talk_getter(Pjsk_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
         self.area_name_json, self.actionSets_json = await asyncio.gather(
-            self.fetch_url_json(self.areas_url, force_online=self.force_master_online),
-            self.fetch_url_json(
-                self.actionSets_url, force_online=self.force_master_online
-            ),
+            self.fetch_master_json(self.areas_url),
+            self.fetch_master_json(self.actionSets_url),
+        )
+
+        self.area_name_lookup = util.MasterCache.lookup(self.area_name_json, 'id')
+        self.actionSets_json_lookup = util.MasterCache.lookup(
+            self.actionSets_json, 'id'
         )
 
-        self.area_name_lookup = util.DictLookup(self.area_name_json, 'id')
-        self.actionSets_json_lookup = util.DictLookup(self.actionSets_json, 'id')
+        # 每个 action 的分类只算一次：category → [action]（保持 master 中的顺序）
+        self.actionSets_categories: list[int | str] = []
+        self.category_actions: dict[int | str, list[dict[str, Any]]] = {}
+        for action in self.actionSets_json:
+            cate = self.__get_category(action)
+            self.actionSets_categories.append(cate)
+            self.category_actions.setdefault(cate, []).append(action)
 
     def __get_category(self, action: dict[str, Any]) -> int | str:
         '''
@@ -1282,27 +1386,55 @@ class Area_talk_getter(Pjsk_getter):
         target: int: event_id; str: grade1, grade2, theater, limited_{area_id}, aprilfool2022+
         '''
 
-        actions = [
-            action
-            for action in self.actionSets_json
-            if self.__get_category(action) == target
-        ]
+        actions = self.category_actions.get(target, [])
 
         if len(actions) == 0:
             logging.info(f'talk {target} does not exist.')
             return
 
+        talk_urls = [
+            [
+                url.format(
+                    group=math.floor(action['id'] / 100),
+                    scenarioId=action['scenarioId'],
+                )
+                for url in self.talk_asset_url
+            ]
+            for action in actions
+        ]
+
+        if isinstance(target, int):  # event id
+            filename = f'talk_event_{target:0{self.maxlen_eventId_areaID[0]}}'
+        elif target.startswith('limited_'):
+            filename = f'talk_{target.split('_')[0]}_{target.split('_')[1]:0{self.maxlen_eventId_areaID[1]}}'
+
+            area_name_index = self.area_name_lookup.find_index(actions[-1]['areaId'])
+            area_name = self.area_name_json[area_name_index]['name']
+
+            filename += ' ' + area_name
+        else:
+            filename = f'talk_{target}'
+
+        filename = util.valid_filename(filename + '.txt')
+        filepath = os.path.join(self.save_dir, filename)
+
+        build_key = await self.build_key(
+            talk_urls,
+            self.reader.build_options(),
+            actions,
+            [
+                self.area_name_json[self.area_name_lookup.find_index(action['areaId'])]
+                for action in actions
+            ],
+        )
+        if util.BuildState.unchanged(filepath, build_key):
+            return
+
         tasks = []
-        for action in actions:
+        for urls in talk_urls:
             tasks.append(
                 self.fetch_url_json(
-                    [
-                        url.format(
-                            group=math.floor(action['id'] / 100),
-                            scenarioId=action['scenarioId'],
-                        )
-                        for url in self.talk_asset_url
-                    ],
+                    urls,
                     str(target),
                     print_done=self.print_fetch_detial,
                     compress=self.compress_assets,
@@ -1315,27 +1447,12 @@ class Area_talk_getter(Pjsk_getter):
         if self.parse and not util.judge_need_skip(*talk_jsons):
             os.makedirs(self.save_dir, exist_ok=True)
 
-            texts = [
-                self.reader.read_story_in_json(talk_json) for talk_json in talk_jsons
-            ]
-
-            if isinstance(target, int):  # event id
-                filename = f'talk_event_{target:0{self.maxlen_eventId_areaID[0]}}'
-            elif target.startswith('limited_'):
-                filename = f'talk_{target.split('_')[0]}_{target.split('_')[1]:0{self.maxlen_eventId_areaID[1]}}'
-
-                area_name_index = self.area_name_lookup.find_index(action['areaId'])
-                area_name = self.area_name_json[area_name_index]['name']
-
-                filename += ' ' + area_name
-            else:
-                filename = f'talk_{target}'
-
-            filename = util.valid_filename(filename + '.txt')
+            texts = await asyncio.gather(
+                *[self.reader.render_story(talk_json) for talk_json in talk_jsons]
+            )
 
-            filepath = os.path.join(self.save_dir, filename)
             util.remove_olds_or_rename_old(filepath, r'([^\s\.]+)')
-            with open(filepath, 'w', encoding='utf8') as f:
+            with util.open_for_write(filepath) as f:
                 left = Mark_multi_lang['['][self.reader.mark_lang]
                 right = Mark_multi_lang[']'][self.reader.mark_lang]
 
@@ -1350,6 +1467,7 @@ class Area_talk_getter(Pjsk_getter):
                         f"{index+1} {action['id']}:{action['scenarioId']}\n\n{left}{area_name}{right}\n\n"
                     )
                     f.write(text + '\n\n\n')
+            util.BuildState.record(filepath, build_key)
 
         logging.info(f'get talk {target} done.')
 
@@ -1364,7 +1482,9 @@ class Area_talk_getter(Pjsk_getter):
         categories = set()
         for i in range(start, end):
             actionSets_index = self.actionSets_json_lookup.find_index(i)
-            cate = self.__get_category(self.actionSets_json[actionSets_index])
+            if actionSets_index == -1:
+                continue
+            cate = self.actionSets_categories[actionSets_index]
             if cate != '':
                 categories.add(cate)
         tasks = []
@@ -1381,7 +1501,7 @@ class Area_talk_getter(Pjsk_getter):
 
         actionSet = self.actionSets_json[actionSets_index]
 
-        cate = self.__get_category(actionSet)
+        cate = self.actionSets_categories[actionSets_index]
 
         if 'scenarioId' not in actionSet:
             logging.info(f'talk {talk_id} does have content.')
@@ -1402,7 +1522,7 @@ class Area_talk_getter(Pjsk_getter):
         )
 
         if self.parse and not util.judge_need_skip(talk_json):
-            text = self.reader.read_story_in_json(talk_json)
+            text = await self.reader.render_story(talk_json)
 
             filename = f'talk_{talk_id}'
 
@@ -1412,10 +1532,8 @@ class Area_talk_getter(Pjsk_getter):
             if sub_name is not None:
                 area_name += ' - ' + sub_name
 
-            with open(
-                os.path.join(self.save_dir, filename) + '.txt',
-                'w',
-                encoding='utf8',
+            with util.open_for_write(
+                os.path.join(self.save_dir, filename) + '.txt'
             ) as f:
                 left = Mark_multi_lang['['][self.reader.mark_lang]
                 right = Mark_multi_lang[']'][self.reader.mark_lang]
@@ -1427,12 +1545,7 @@ class Area_talk_getter(Pjsk_getter):
         logging.info(f'get talk {talk_id} done.')
 
     def tell_categories(self) -> set[str | int]:
-        ret = set()
-        for actionSet in self.actionSets_json:
-            cate = self.__get_category(actionSet)
-            if cate != '':
-                ret.add(cate)
-        return ret
+        return {cate for cate in self.category_actions if cate != ''}
 
 
 class Self_intro_getter(Pjsk_getter):
@@ -1477,14 +1590,15 @@ class Self_intro_getter(Pjsk_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
-        self.characterProfiles_json: list[dict[str, Any]] = await self.fetch_url_json(
-            self.characterProfiles_url, force_online=self.force_master_online
+        self.characterProfiles_json: list[dict[str, Any]] = (
+            await self.fetch_master_json(self.characterProfiles_url)
         )
 
-        self.characterProfiles_lookup = util.DictLookup(
+        self.characterProfiles_lookup = util.MasterCache.lookup(
             self.characterProfiles_json, 'characterId'
         )
 
@@ -1506,18 +1620,29 @@ class Self_intro_getter(Pjsk_getter):
         scenarioId_common = scenarioId[: scenarioId.rindex('_')]
         scenarioId_2nd = scenarioId_common + '_2nd'
 
+        grade1_urls = [
+            url.format(scenarioId=scenarioId_common) for url in self.self_asset_url
+        ]
+        grade2_urls = [
+            url.format(scenarioId=scenarioId_2nd) for url in self.self_asset_url
+        ]
+
+        file_path = os.path.join(self.save_dir, filename)
+        build_key = await self.build_key(
+            [grade1_urls, grade2_urls], self.reader.build_options(), profile
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
+
         grade1_json, grade2_json = await asyncio.gather(
             self.fetch_url_json(
-                [
-                    url.format(scenarioId=scenarioId_common)
-                    for url in self.self_asset_url
-                ],
+                grade1_urls,
                 chara_unit_name,
                 compress=self.compress_assets,
                 skip_read=not self.parse,
             ),
             self.fetch_url_json(
-                [url.format(scenarioId=scenarioId_2nd) for url in self.self_asset_url],
+                grade2_urls,
                 chara_unit_name,
                 compress=self.compress_assets,
                 skip_read=not self.parse,
@@ -1527,12 +1652,13 @@ class Self_intro_getter(Pjsk_getter):
         if self.parse and not util.judge_need_skip(grade1_json, grade2_json):
             os.makedirs(self.save_dir, exist_ok=True)
 
-            text_1 = self.reader.read_story_in_json(grade1_json)
-            text_2 = self.reader.read_story_in_json(grade2_json)
+            text_1, text_2 = await asyncio.gather(
+                self.reader.render_story(grade1_json),
+                self.reader.render_story(grade2_json),
+            )
 
-            file_path = os.path.join(self.save_dir, filename)
             util.remove_olds_or_rename_old(file_path, r'(\d+) ')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 f.write(
                     f"{Mark_multi_lang['self intro'][self.reader.mark_lang]}{self.reader.get_chara_unitAbbr_names(chara_id)[1]}\n\n"
                 )
@@ -1550,6 +1676,7 @@ class Self_intro_getter(Pjsk_getter):
                     + '\n\n'
                 )
                 f.write(text_2 + '\n')
+            util.BuildState.record(file_path, build_key)
 
         logging.info(f'get self intro {filename} done.')
 
@@ -1602,14 +1729,17 @@ class Special_story_getter(Pjsk_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
-        self.specialStories_json: list[dict[str, Any]] = await self.fetch_url_json(
-            self.specialStories_url, force_online=self.force_master_online
+        self.specialStories_json: list[dict[str, Any]] = await self.fetch_master_json(
+            self.specialStories_url
         )
 
-        self.specialStories_lookup = util.DictLookup(self.specialStories_json, 'id')
+        self.specialStories_lookup = util.MasterCache.lookup(
+            self.specialStories_json, 'id'
+        )
 
     async def get(self, id: int) -> None:
         story_index = self.specialStories_lookup.find_index(id)
@@ -1620,17 +1750,34 @@ class Special_story_getter(Pjsk_getter):
         story = self.specialStories_json[story_index]
         episodes = story['episodes']
 
+        episode_urls = [
+            [
+                url.format(
+                    assetbundleName=episode['assetbundleName'],
+                    scenarioId=episode['scenarioId'],
+                )
+                for url in self.special_asset_url
+            ]
+            for episode in episodes
+        ]
+
+        story_name = f"sp{id} {episodes[0]['title']} ({episodes[0]['scenarioId']})"
+        filename = util.valid_filename(
+            f"sp{id:0{self.maxlen_sp}} {episodes[0]['title']}" + '.txt'
+        )
+        file_path = os.path.join(self.save_dir, filename)
+
+        build_key = await self.build_key(
+            episode_urls, self.reader.build_options(), story
+        )
+        if util.BuildState.unchanged(file_path, build_key):
+            return
+
         tasks = []
-        for episode in episodes:
+        for episode, urls in zip(episodes, episode_urls):
             tasks.append(
                 self.fetch_url_json(
-                    [
-                        url.format(
-                            assetbundleName=episode['assetbundleName'],
-                            scenarioId=episode['scenarioId'],
-                        )
-                        for url in self.special_asset_url
-                    ],
+                    urls,
                     f"sp{id}-{episode['episodeNo']}",
                     compress=self.compress_assets,
                     skip_read=not self.parse,
@@ -1641,19 +1788,15 @@ class Special_story_getter(Pjsk_getter):
         if self.parse and not util.judge_need_skip(*episode_story_jsons):
             os.makedirs(self.save_dir, exist_ok=True)
 
-            texts = [
-                self.reader.read_story_in_json(episode_story_json)
-                for episode_story_json in episode_story_jsons
-            ]
-
-            story_name = f"sp{id} {episodes[0]['title']} ({episodes[0]['scenarioId']})"
-            filename = util.valid_filename(
-                f"sp{id:0{self.maxlen_sp}} {episodes[0]['title']}" + '.txt'
+            texts = await asyncio.gather(
+                *[
+                    self.reader.render_story(episode_story_json)
+                    for episode_story_json in episode_story_jsons
+                ]
             )
 
-            file_path = os.path.join(self.save_dir, filename)
             util.remove_olds_or_rename_old(file_path, r'sp(\d+) ')
-            with open(file_path, 'w', encoding='utf8') as f:
+            with util.open_for_write(file_path) as f:
                 f.write(story_name + '\n\n')
                 if len(episodes) == 1:
                     f.write(texts[0] + '\n')
@@ -1663,6 +1806,7 @@ class Special_story_getter(Pjsk_getter):
                             f"{episode['episodeNo']} {episode['title']} ({episode['scenarioId']})\n\n"
                         )
                         f.write(text + '\n\n\n')
+            util.BuildState.record(file_path, build_key)
 
             logging.info(f'get special {filename} done.')
 
@@ -1673,6 +1817,35 @@ class Special_story_getter(Pjsk_getter):
         return ret
 
 
+# mysekai lua 对话脚本中的 label("名字") 与 text("台词")，按出现顺序匹配
+_LUA_TALK_TOKEN = re.compile(
+    r'label\("(?P<label>[^"]*)"\)|text\("(?P<text>(?:[^"\\]|\\.)*)"\)'
+)
+_LUA_ESCAPE = re.compile(r'\\(.)', re.S)
+# \n 换成空格，\" 与 \\ 还原，其它转义保留原样
+_LUA_ESCAPES = {'n': ' ', '"': '"', '\\': '\\'}
+
+
+def _unescape_lua(raw: str) -> str:
+    if '\\' not in raw:
+        return raw
+    return _LUA_ESCAPE.sub(lambda m: _LUA_ESCAPES.get(m.group(1), m.group(0)), raw)
+
+
+def parse_lua_talk(lua_text: str, mark_lang: str) -> str:
+    """Parse Lua talk script to formatted dialogue text."""
+    colon = Mark_multi_lang[':'][mark_lang]
+    lines: list[str] = []
+    current_label: str | None = None
+    for m in _LUA_TALK_TOKEN.finditer(lua_text):
+        label = m.group('label')
+        if label is not None:
+            current_label = label
+        elif current_label is not None:
+            lines.append(f"{current_label}{colon}{_unescape_lua(m.group('text'))}")
+    return '\n'.join(lines)
+
+
 class Mysekai_talk_getter(Pjsk_getter):
     def __init__(
         self,
@@ -1744,8 +1917,9 @@ class Mysekai_talk_getter(Pjsk_getter):
         self,
         session: ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: util.AssetStore | None = None,
     ) -> None:
-        await super().init(session, network_semaphore)
+        await super().init(session, network_semaphore, asset_store)
 
         (
             self.mysekaiCharacterTalks_json,
@@ -1757,49 +1931,32 @@ class Mysekai_talk_getter(Pjsk_getter):
             self.gameCharacterUnits_json,
             self.releaseConditions_json,
         ) = await asyncio.gather(
-            self.fetch_url_json(
-                self.mysekaiCharacterTalks_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.mysekaiGameCharacterUnitGroups_url,
-                force_online=self.force_master_online,
-            ),
-            self.fetch_url_json(
-                self.mysekaiCharacterTalkConditionGroups_url,
-                force_online=self.force_master_online,
-            ),
-            self.fetch_url_json(
-                self.mysekaiCharacterTalkConditions_url,
-                force_online=self.force_master_online,
-            ),
-            self.fetch_url_json(
-                self.mysekaiPhenomenas_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.mysekaiFixtures_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.gameCharacterUnits_url, force_online=self.force_master_online
-            ),
-            self.fetch_url_json(
-                self.releaseConditions_url, force_online=self.force_master_online
-            ),
+            self.fetch_master_json(self.mysekaiCharacterTalks_url),
+            self.fetch_master_json(self.mysekaiGameCharacterUnitGroups_url),
+            self.fetch_master_json(self.mysekaiCharacterTalkConditionGroups_url),
+            self.fetch_master_json(self.mysekaiCharacterTalkConditions_url),
+            self.fetch_master_json(self.mysekaiPhenomenas_url),
+            self.fetch_master_json(self.mysekaiFixtures_url),
+            self.fetch_master_json(self.gameCharacterUnits_url),
+            self.fetch_master_json(self.releaseConditions_url),
         )
 
         # Build lookups
-        self.mysekaiGameCharacterUnitGroups_lookup = util.DictLookup(
+        self.mysekaiGameCharacterUnitGroups_lookup = util.MasterCache.lookup(
             self.mysekaiGameCharacterUnitGroups_json, 'id'
         )
-        self.gameCharacterUnits_lookup = util.DictLookup(
+        self.gameCharacterUnits_lookup = util.MasterCache.lookup(
             self.gameCharacterUnits_json, 'id'
         )
-        self.mysekaiCharacterTalkConditions_lookup = util.DictLookup(
+        self.mysekaiCharacterTalkConditions_lookup = util.MasterCache.lookup(
             self.mysekaiCharacterTalkConditions_json, 'id'
         )
-        self.mysekaiPhenomenas_lookup = util.DictLookup(
+        self.mysekaiPhenomenas_lookup = util.MasterCache.lookup(
             self.mysekaiPhenomenas_json, 'id'
         )
-        self.mysekaiFixtures_lookup = util.DictLookup(self.mysekaiFixtures_json, 'id')
+        self.mysekaiFixtures_lookup = util.MasterCache.lookup(
+            self.mysekaiFixtures_json, 'id'
+        )
 
         # Group condition IDs by groupId
         self.group_conditions_map: dict[int, list[int]] = {}
@@ -1817,6 +1974,30 @@ class Mysekai_talk_getter(Pjsk_getter):
                 type_id = rc['releaseConditionTypeId']
                 self.release_cond_eventID_map[type_id] = int(str(rc['id'])[1:4]) + 1
 
+        # talk id → 行（id 重复时取第一行），gameCharacterUnitId → 涉及该角色的行
+        # （保持 master 顺序）
+        self.talks_by_id: dict[int, dict] = {}
+        self.chara_talks: dict[int, list[dict]] = {}
+        for talk in self.mysekaiCharacterTalks_json:
+            self.talks_by_id.setdefault(talk['id'], talk)
+            group_index = self.mysekaiGameCharacterUnitGroups_lookup.find_index(
+                talk['mysekaiGameCharacterUnitGroupId']
+            )
+            if group_index == -1:
+                continue
+            chara_group = self.mysekaiGameCharacterUnitGroups_json[group_index]
+            for key_name in [f'gameCharacterUnitId{i}' for i in range(1, 6)]:
+                chara_unit_id = chara_group.get(key_name)
+                if chara_unit_id is None:
+                    continue
+                talks = self.chara_talks.setdefault(chara_unit_id, [])
+                if not talks or talks[-1] is not talk:  # 同一组内重复列出的角色
+                    talks.append(talk)
+        # _get_talk_meta 的结果按 talk id 缓存；角色名来自 reader，故在首次使用时计算
+        self.talk_metas: dict[int, dict] = {}
+        # 解析后的 lua 对话，键为 (assetbundleName, lua)；mark_lang 由 reader 固定
+        self.lua_talks: dict[tuple[str, str], str] = {}
+
     def _get_chara_info(self, gameCharacterUnitId: int) -> tuple[int, str, str]:
         """Return (gameCharacterId, unit_abbr, full_name)."""
         gcu_index = self.gameCharacterUnits_lookup.find_index(gameCharacterUnitId)
@@ -1858,43 +2039,27 @@ class Mysekai_talk_getter(Pjsk_getter):
                 parts.append(self.mysekaiFixtures_json[fix_index]['name'])
         return ', '.join(parts)
 
-    def _parse_lua_talk(self, lua_text: str) -> str:
-        """Parse Lua talk script to formatted dialogue text."""
-        # Find all label and text calls in order by position
-        combined_pattern = re.compile(
-            r'label\("(?P<label>[^"]*)"\)|text\("(?P<text>(?:[^"\\]|\\.)*)"\)'
-        )
-
-        events: list[tuple[int, str, str]] = []  # (pos, type, content)
-        for m in combined_pattern.finditer(lua_text):
-            if m.group('label') is not None:
-                events.append((m.start(), 'label', m.group('label')))
-            elif m.group('text') is not None:
-                raw = m.group('text')
-                content = (
-                    raw.replace('\\n', ' ').replace('\\"', '"').replace('\\\\', '\\')
-                )
-                events.append((m.start(), 'text', content))
-
-        events.sort(key=lambda x: x[0])
-
-        lines: list[str] = []
-        current_label: str | None = None
-        for _, ev_type, ev_content in events:
-            if ev_type == 'label':
-                current_label = ev_content
-            elif ev_type == 'text' and current_label is not None:
-                lines.append(
-                    f"{current_label}{util.Mark_multi_lang[':'][self.reader.mark_lang]}{ev_content}"
-                )
-
-        return '\n'.join(lines)
+    def _parse_lua_talk(self, key: tuple[str, str], lua_text: str) -> str:
+        """Parse one lua file; memoized by (assetbundleName, lua), as the same
+        talk appears in several characters' files."""
+        parsed = self.lua_talks.get(key)
+        if parsed is None:
+            parsed = parse_lua_talk(lua_text, self.reader.mark_lang)
+            self.lua_talks[key] = parsed
+        return parsed
 
     def _get_talk_meta(self, talk: dict) -> dict:
         """Extract metadata for one mysekaiCharacterTalk entry.
         Returns dict with talk_id, archive_group_id, conditions_str, chara_names,
         gameCharacterUnitIds, lua_name, assetbundleName; or None if group missing.
         """
+        meta = self.talk_metas.get(talk['id'])
+        if meta is None:
+            meta = self.__talk_meta(talk)
+            self.talk_metas[talk['id']] = meta
+        return meta
+
+    def __talk_meta(self, talk: dict) -> dict:
         talk_id = talk['id']
         group_id = talk['mysekaiGameCharacterUnitGroupId']
         condition_group_id = talk['mysekaiCharacterTalkConditionGroupId']
@@ -1970,7 +2135,7 @@ class Mysekai_talk_getter(Pjsk_getter):
         right = Mark_multi_lang[')'][self.reader.mark_lang]
         chara_prefix = Mark_multi_lang['characters'][self.reader.mark_lang]
 
-        with open(filepath, 'w', encoding='utf8') as f:
+        with util.open_for_write(filepath) as f:
             for idx, (
                 talk_id,
                 archive_group_id,
@@ -1990,7 +2155,7 @@ class Mysekai_talk_getter(Pjsk_getter):
                 if chara_names_str:
                     f.write(f'\n{chara_prefix}{chara_names_str}{right}\n')
                 if lua_text is not None:
-                    f.write(f'\n{self._parse_lua_talk(lua_text)}\n')
+                    f.write(f'\n{self._parse_lua_talk((ab, lua_name), lua_text)}\n')
                 else:
                     f.write('\n')
                 f.write('\n\n')
@@ -1999,11 +2164,7 @@ class Mysekai_talk_getter(Pjsk_getter):
 
     async def get_id(self, talk_id: int) -> None:
         """Debug: fetch one mysekai talk by id, save to mysekai_talk_id.txt."""
-        talk = None
-        for t in self.mysekaiCharacterTalks_json:
-            if t['id'] == talk_id:
-                talk = t
-                break
+        talk = self.talks_by_id.get(talk_id)
         if talk is None:
             logging.error(f'talk_id {talk_id} not found in mysekaiCharacterTalks')
             return
@@ -2055,12 +2216,10 @@ class Mysekai_talk_getter(Pjsk_getter):
         is_first_group_id: dict[int, bool] = {}
         seen_talk_group_id: set[int] = set()
 
-        for talk in self.mysekaiCharacterTalks_json:
+        for talk in self.chara_talks.get(gameCharacterUnitId, []):
             meta = self._get_talk_meta(talk)
             if meta is None:
                 continue
-            if gameCharacterUnitId not in meta['gameCharacterUnitIds']:
-                continue
 
             entries.append(
                 (
@@ -2090,22 +2249,34 @@ class Mysekai_talk_getter(Pjsk_getter):
             logging.info(f'no talks found for {chara_key}')
             return
 
+        filename = util.valid_filename(chara_key + '.txt')
+        filepath = os.path.join(self.save_dir, filename)
+
+        build_key = await self.build_key(
+            [
+                [url.format(assetbundleName=ab, lua=ln) for url in self.talk_asset_url]
+                for ab, ln in lua_keys
+            ],
+            self.reader.build_options(),
+            entries,
+            is_first_group_id,
+        )
+        if util.BuildState.unchanged(filepath, build_key):
+            return
+
         lua_map, lua_results = await self._fetch_lua_map(lua_keys)
 
         if self.parse and not util.judge_need_skip(*lua_results):
             os.makedirs(self.save_dir, exist_ok=True)
-            filename = util.valid_filename(chara_key + '.txt')
-            filepath = os.path.join(self.save_dir, filename)
             util.remove_olds_or_rename_old(filepath, r'(\d+) ')
             self._write_entries(filepath, entries, lua_map, is_first_group_id)
+            util.BuildState.record(filepath, build_key)
             logging.info(f'wrote {len(entries)} talks to {filename}')
 
     async def get_tutorial(self) -> None:
         """Fetch all mysekai tutorial talks, save to _tutorial.txt."""
 
-        ttalk_list = await self.fetch_url_json(
-            self.mysekaiTutorialTalks_url, force_online=self.force_master_online
-        )
+        ttalk_list = await self.fetch_master_json(self.mysekaiTutorialTalks_url)
         if not ttalk_list:
             logging.info('no tutorial talks.')
             return
@@ -2126,7 +2297,7 @@ class Mysekai_talk_getter(Pjsk_getter):
                 ab = tt['assetbundleName']
                 lua_text = lua_map.get((ab, lua_name))
                 if lua_text is not None:
-                    parsed = self._parse_lua_talk(lua_text)
+                    parsed = self._parse_lua_talk((ab, lua_name), lua_text)
                     parts.append(f'{ttalk_id}:{lua_name}\n\n{parsed}\n')
                 else:
                     parts.append(f'{ttalk_id}:{lua_name}\n\n')
@@ -2135,7 +2306,7 @@ class Mysekai_talk_getter(Pjsk_getter):
             filepath = os.path.join(
                 self.save_dir, f'{0:0{self.maxlen_charaId}} tutorial.txt'
             )
-            with open(filepath, 'w', encoding='utf8') as f:
+            with util.open_for_write(filepath) as f:
                 f.write('\n'.join(parts) + '\n')
             logging.info(f'wrote {len(ttalk_list)} tutorial talks to tutorial.txt')
 
@@ -2202,9 +2373,7 @@ async def main():
     special_getter = Special_story_getter(reader, online=online)
     mysekai_getter = Mysekai_talk_getter(reader, online=online)
 
-    async with ClientSession(
-        trust_env=True, connector=TCPConnector(limit=net_connect_limit)
-    ) as session:
+    async with util.Connections.create_session(net_connect_limit) as session:
         await asyncio.gather(
             reader.init(session),
             unit_getter.init(session),
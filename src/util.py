@@ -1,16 +1,25 @@
-import os, json, asyncio, bisect, logging, re, shutil
+import os, json, asyncio, bisect, logging, re, shutil, sqlite3, hashlib, time, itertools
+import functools, threading, atexit, array, contextlib, io, contextvars
 from pathlib import Path
+from collections import deque
 from urllib.parse import urlsplit
 from enum import Enum
-from typing import Any, Callable
+from typing import Any, Callable, Awaitable
 from asyncio import Semaphore
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 import aiohttp, brotli
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 SKIP_FETCH_ERROR = True
 RECORD_ASSET_SUCCESS = False
+# 为 True 时写入的文件在检查点（每个 job 完成、整轮结束）统一 fsync，见 FileWrites
+FSYNC_WRITES = False
 
 LATE_TIMESTAMP13 = int(
     (datetime.now(timezone.utc) + timedelta(days=365)).timestamp() * 1000
@@ -18,6 +27,13 @@ LATE_TIMESTAMP13 = int(
 
 MISSING_MSG = 'Missing asset'
 
+# 获取时用较快的 brotli 质量；misc/recompress_assets.py 空闲时升级到 ARCHIVE_QUALITY
+COMPRESS_QUALITY = 5
+ARCHIVE_QUALITY = 11
+# 小文件可由 misc/recompress_assets.py 转为带共享字典的 .zst（需安装 zstandard），
+# 字典保存在 save_dir 下
+ZSTD_DICT_NAME = '_zstd.dict'
+
 _net_semaphore = asyncio.Semaphore(20)
 
 
@@ -112,15 +128,153 @@ Mark_multi_lang = {
 }
 
 
+class Story_renderer:
+    """
+    剧情 json → 文本的公共核心，两个游戏的 Story_reader 共用。
+
+    标点按 mark_lang 预先取出（marks），特效按 EffectType 查表分派，输出累积到
+    列表最后一次 join。特效处理函数返回不含首尾换行的正文：block 类前后各换一行，
+    且下一句对话前空一行；其余与对话相同，只在需要时空一行。
+    """
+
+    _special_effect = int(SnippetAction.SpecialEffect)
+    _talk = int(SnippetAction.Talk)
+
+    def __init__(
+        self,
+        mark_lang: str,
+        debug_parse: bool,
+        action_key: str,
+        reference_key: str,
+        effect_type_key: str,
+        index_key: str | None = None,
+    ) -> None:
+        self.marks = {key: marks[mark_lang] for key, marks in Mark_multi_lang.items()}
+        self.debug_parse = debug_parse
+        self.action_key = action_key
+        self.reference_key = reference_key
+        self.effect_type_key = effect_type_key
+        self.index_key = index_key  # None 时调试输出用 snippet 的序号
+        self._effects: dict[int, tuple[Callable[[dict[str, Any]], str], bool]] = {}
+
+    def add_effect(
+        self,
+        effect_type: SpecialEffectType,
+        render: Callable[[dict[str, Any]], str],
+        block: bool = False,
+    ) -> None:
+        self._effects[int(effect_type)] = (render, block)
+
+    def characters_header(self, names: list[str]) -> str:
+        if len(names) == 0:
+            return ''
+        marks = self.marks
+        return marks['characters'] + marks[','].join(names) + marks[')']
+
+    def render(
+        self,
+        header: str,
+        snippets: list[dict[str, Any]],
+        effects: list[dict[str, Any]],
+        talks: list[dict[str, Any]],
+        render_talk: Callable[[dict[str, Any]], str],
+    ) -> str:
+        parts: list[str] = []
+        append = parts.append
+        effect_handlers = self._effects
+        action_key = self.action_key
+        reference_key = self.reference_key
+        effect_type_key = self.effect_type_key
+        index_key = self.index_key
+        debug_parse = self.debug_parse
+        special_effect = self._special_effect
+        talk = self._talk
+        next_talk_need_newline = True
+
+        for index, snippet in enumerate(snippets):
+            if debug_parse:
+                snippet_index = snippet[index_key] if index_key else index
+                append(f'{snippet_index},{snippet[reference_key]},')
+
+            action = snippet[action_key]
+            if action == special_effect:
+                effect = effects[snippet[reference_key]]
+                handler = effect_handlers.get(effect[effect_type_key])
+                if handler is None:
+                    if debug_parse:
+                        try:
+                            effect_name = SpecialEffectType(
+                                effect[effect_type_key]
+                            ).name
+                        except ValueError:
+                            effect_name = effect[effect_type_key]
+                        append(f'SpecialEffect-{effect_name}: {effect}\n')
+                    continue
+                render_effect, block = handler
+                if block:
+                    append('\n')
+                elif next_talk_need_newline:
+                    append('\n')
+                append(render_effect(effect))
+                append('\n')
+                next_talk_need_newline = block
+            elif action == talk:
+                if next_talk_need_newline:
+                    append('\n')
+                append(render_talk(talks[snippet[reference_key]]))
+                append('\n')
+                next_talk_need_newline = False
+            elif debug_parse:
+                try:
+                    snippet_name = SnippetAction(action).name
+                except ValueError:
+                    snippet_name = action
+                append(f'{snippet_name}\n')
+
+        return (header + '\n\n' + ''.join(parts).strip()).strip()
+
+
+class _HostBucket:
+    """单个 host 的令牌桶（GCRA 形式）：按到达顺序预约发送时刻，无需轮询。"""
+
+    def __init__(self, qps: float, max_qps: float):
+        self.qps = qps
+        self.max_qps = max_qps
+        self.tat = 0.0  # theoretical arrival time：下一个可用令牌的时刻
+        self.requests = 0
+        self.throttled = 0
+
+    def reserve(self, now: float, burst: int) -> float:
+        """预约一个令牌，返回需要等待的秒数。"""
+        interval = 1.0 / self.qps
+        start = max(self.tat, now - (burst - 1) * interval)
+        self.tat = start + interval
+        self.requests += 1
+        return max(0.0, start - now)
+
+
 class RateLimit:
-    """按 host 限制 QPS；配置见 qps.json（键按子串匹配 hostname，'default' 兜底）。"""
+    """
+    按 host 自适应限速；初始 QPS 见 qps.json（键按子串匹配 hostname，'default' 兜底）。
+
+    每个 host 一个令牌桶，等待者按到达顺序预约发送时刻（FIFO，一次 sleep）。
+    速率按 AIMD 调整：成功时加性增长（约每秒 +_increase_qps，上限为初始值的
+    _max_qps_factor 倍），429 时乘性减半，并按 Retry-After 暂停该 host。
+    未配置限速的 host 首次收到 429 后以 _unlimited_429_qps 起步限速。
+    """
 
     _qps_file = Path(__file__).parent / 'qps.json'
 
     _qps_config: dict[str, float] = {}
     _default_qps: float | None = None  # None 表示不限速
-    _lock = asyncio.Lock()
-    _last_times: dict[str, float] = {}
+    _buckets: dict[str, _HostBucket] = {}
+
+    _burst = 1
+    _increase_qps = 1.0
+    _decrease_factor = 0.5
+    _max_qps_factor = 4.0
+    _min_qps = 0.5
+    _unlimited_429_qps = 10.0
 
     _retry_429_delay = 1  # 失败重试间隔；Retry-After 更大时按 Retry-After
 
@@ -129,6 +283,7 @@ class RateLimit:
         path = path or cls._qps_file
         cls._qps_config = {}
         cls._default_qps = None
+        cls._buckets = {}
         try:
             with open(path, encoding='utf8') as f:
                 data = json.load(f)
@@ -146,32 +301,74 @@ class RateLimit:
         logging.warning(f'Failed to load QPS config from {path}, no rate limit applied')
 
     @staticmethod
-    def interval_for(host: str) -> float:
-        """该 host 的请求最小间隔秒数；0 表示不限速。"""
+    def qps_for(host: str) -> float:
+        """该 host 的初始 QPS；0 表示不限速。"""
         for key, qps in RateLimit._qps_config.items():
             if key in host:
-                return 1.0 / qps if qps > 0 else 0.0
+                return max(qps, 0.0)
         default_qps = RateLimit._default_qps
         if default_qps is not None and default_qps > 0:
-            return 1.0 / default_qps
+            return default_qps
         return 0.0
 
+    @staticmethod
+    def interval_for(host: str) -> float:
+        """该 host 当前的请求最小间隔秒数；0 表示不限速。"""
+        bucket = RateLimit._bucket(host)
+        return 1.0 / bucket.qps if bucket is not None else 0.0
+
+    @classmethod
+    def _bucket(cls, host: str, create_qps: float | None = None) -> _HostBucket | None:
+        bucket = cls._buckets.get(host)
+        if bucket is None:
+            qps = cls.qps_for(host) or create_qps
+            if not qps:
+                return None
+            bucket = _HostBucket(qps, qps * cls._max_qps_factor)
+            cls._buckets[host] = bucket
+        return bucket
+
     @staticmethod
     async def wait(url: str) -> None:
-        """按 host 静态限速：同一 host 两次请求至少间隔 qps.json 配置的秒数。"""
         host = urlsplit(url).hostname or ''
-        interval = RateLimit.interval_for(host)
-        if interval <= 0:
+        bucket = RateLimit._bucket(host)
+        if bucket is None:
             return
-        loop = asyncio.get_running_loop()
-        while True:
-            async with RateLimit._lock:
-                now = loop.time()
-                delay = RateLimit._last_times.get(host, 0.0) + interval - now
-                if delay <= 0:
-                    RateLimit._last_times[host] = now
-                    return
-            await asyncio.sleep(min(delay, 1.0))
+        delay = bucket.reserve(asyncio.get_running_loop().time(), RateLimit._burst)
+        if delay > 0:
+            Metrics.observe('rate_limit_wait_seconds', delay, host=host)
+            await asyncio.sleep(delay)
+
+    @classmethod
+    def on_success(cls, url: str) -> None:
+        bucket = cls._buckets.get(urlsplit(url).hostname or '')
+        if bucket is not None:
+            # 每个请求加 _increase_qps / qps，即按当前速率约每秒加 _increase_qps
+            bucket.qps = min(
+                bucket.max_qps, bucket.qps + cls._increase_qps / bucket.qps
+            )
+
+    @classmethod
+    def on_rate_limited(cls, url: str, retry_after: str | None) -> None:
+        host = urlsplit(url).hostname or ''
+        bucket = cls._bucket(host, create_qps=cls._unlimited_429_qps)
+        assert bucket is not None
+        bucket.throttled += 1
+        bucket.qps = max(cls._min_qps, bucket.qps * cls._decrease_factor)
+        now = asyncio.get_running_loop().time()
+        bucket.tat = max(bucket.tat, now + cls.retry_delay(retry_after))
+
+    @classmethod
+    def rates(cls) -> dict[str, dict[str, float]]:
+        """各 host 当前速率与计数，用于观察实际吞吐。"""
+        return {
+            host: {
+                'qps': round(bucket.qps, 3),
+                'requests': bucket.requests,
+                'throttled': bucket.throttled,
+            }
+            for host, bucket in cls._buckets.items()
+        }
 
     @staticmethod
     def is_rate_limited(e: Exception) -> bool:
@@ -192,15 +389,892 @@ class RateLimit:
 
 RateLimit.load_qps_config()
 
+
+class _MirrorStats:
+    def __init__(self, window: int):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.ewma_latency: float | None = None
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.hedges = 0
+
+
+class MirrorHealth:
+    """
+    按 host 记录镜像的延迟与错误率，动态调整候选 url 顺序。
+
+    连续失败 _failure_threshold 次后熔断该 host _open_seconds 秒（排到最后，
+    重试中途熔断则直接换下一个镜像）；请求耗时超过该 host 近期延迟的
+    _hedge_percentile 分位时，向下一个可用镜像发对冲请求，先成功者为准。
+    404 等普通 4xx 与 JSON 解析失败只说明资源缺失，不计为镜像故障。
+    """
+
+    hedge = True
+
+    _failure_threshold = 5
+    _open_seconds = 60.0
+    _hedge_percentile = 0.95
+    _hedge_min_samples = 20
+    _window = 200
+    _ewma_alpha = 0.2
+    _error_weight = 10.0
+
+    _stats: dict[str, _MirrorStats] = {}
+
+    @classmethod
+    def _get(cls, url: str) -> _MirrorStats:
+        host = urlsplit(url).hostname or ''
+        stats = cls._stats.get(host)
+        if stats is None:
+            stats = cls._stats[host] = _MirrorStats(cls._window)
+        return stats
+
+    @classmethod
+    def record_success(cls, url: str, latency: float) -> None:
+        stats = cls._get(url)
+        stats.latencies.append(latency)
+        stats.outcomes.append(True)
+        stats.ewma_latency = (
+            latency
+            if stats.ewma_latency is None
+            else stats.ewma_latency + cls._ewma_alpha * (latency - stats.ewma_latency)
+        )
+        stats.consecutive_failures = 0
+
+    @classmethod
+    def record_error(cls, url: str, e: Exception) -> None:
+        if (
+            isinstance(e, aiohttp.ClientResponseError)
+            and 400 <= e.status < 500
+            and e.status != 429
+        ) or isinstance(e, json.decoder.JSONDecodeError):
+            return
+        stats = cls._get(url)
+        stats.outcomes.append(False)
+        stats.consecutive_failures += 1
+        if stats.consecutive_failures >= cls._failure_threshold:
+            if not cls.is_open(url):
+                logging.warning(
+                    f'Mirror {urlsplit(url).hostname} failed '
+                    f'{stats.consecutive_failures} times in a row, '
+                    f'circuit open for {cls._open_seconds}s'
+                )
+            stats.open_until = time.monotonic() + cls._open_seconds
+
+    @classmethod
+    def is_open(cls, url: str) -> bool:
+        return cls._get(url).open_until > time.monotonic()
+
+    @classmethod
+    def _score(cls, url: str) -> float | None:
+        """越小越好：平均延迟按错误率加权；没有成功记录时为 None。"""
+        stats = cls._get(url)
+        if stats.ewma_latency is None:
+            return None
+        error_rate = stats.outcomes.count(False) / len(stats.outcomes)
+        return stats.ewma_latency * (1 + cls._error_weight * error_rate)
+
+    @classmethod
+    def order(cls, urls: list[str]) -> list[str]:
+        """熔断的排最后；其余按得分排序，无记录的按最好得分处理，同分保持原顺序。"""
+        if len(urls) <= 1:
+            return urls
+        scores = {url: cls._score(url) for url in urls}
+        known = [score for score in scores.values() if score is not None]
+        best = min(known) if known else 0.0
+        return sorted(
+            urls,
+            key=lambda url: (
+                cls.is_open(url),
+                scores[url] if scores[url] is not None else best,
+            ),
+        )
+
+    @classmethod
+    def hedge_target(cls, urls: list[str]) -> str | None:
+        if not cls.hedge:
+            return None
+        for url in urls:
+            if not cls.is_open(url):
+                return url
+        return None
+
+    @classmethod
+    def hedge_delay(cls, url: str) -> float | None:
+        stats = cls._get(url)
+        if len(stats.latencies) < cls._hedge_min_samples:
+            return None
+        latencies = sorted(stats.latencies)
+        return latencies[
+            min(len(latencies) - 1, int(len(latencies) * cls._hedge_percentile))
+        ]
+
+    @classmethod
+    def report(cls) -> dict[str, dict[str, Any]]:
+        return {
+            host: {
+                'ewma_latency': (
+                    round(stats.ewma_latency, 3)
+                    if stats.ewma_latency is not None
+                    else None
+                ),
+                'error_rate': (
+                    round(stats.outcomes.count(False) / len(stats.outcomes), 3)
+                    if stats.outcomes
+                    else 0.0
+                ),
+                'open': stats.open_until > time.monotonic(),
+                'hedges': stats.hedges,
+            }
+            for host, stats in cls._stats.items()
+        }
+
+
+class _HostConnStats:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+        self.opened = 0
+        self.reused = 0
+
+
+class Connections:
+    """
+    共享 ClientSession 的工厂：开启 DNS 缓存与 keep-alive，按 connections.json
+    （键按子串匹配 hostname，'default' 兜底，0 或 null 为不限）限制每个 host 的
+    并发连接，并通过 TraceConfig 统计各 host 新建与复用的连接数，用于判断 TLS
+    握手是否占了大头。
+    """
+
+    _limits_file = Path(__file__).parent / 'connections.json'
+
+    _limits: dict[str, int] = {}
+    _default_limit = 0
+    _hosts: dict[str, _HostConnStats] = {}
+
+    DNS_TTL = 300  # 秒
+    KEEPALIVE_TIMEOUT = 30.0  # 空闲连接保留秒数
+    dns_hits = 0
+    dns_misses = 0
+
+    @classmethod
+    def load_config(cls, path: Path | None = None) -> None:
+        path = path or cls._limits_file
+        cls._limits = {}
+        cls._default_limit = 0
+        cls._hosts = {}
+        try:
+            with open(path, encoding='utf8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logging.warning(f'Failed to load connection limits from {path}')
+            return
+        for key, value in data.items():
+            if not isinstance(value, int) or isinstance(value, bool):
+                continue
+            if key == 'default':
+                cls._default_limit = value
+            else:
+                cls._limits[key] = value
+
+    @classmethod
+    def limit_for(cls, host: str) -> int:
+        for key, limit in cls._limits.items():
+            if key in host:
+                return max(limit, 0)
+        return max(cls._default_limit, 0)
+
+    @classmethod
+    def _host(cls, host: str) -> _HostConnStats:
+        stats = cls._hosts.get(host)
+        if stats is None:
+            stats = _HostConnStats(cls.limit_for(host))
+            cls._hosts[host] = stats
+        return stats
+
+    @classmethod
+    def slot(cls, url: str) -> Semaphore | contextlib.nullcontext:
+        """占用该 host 的一个连接名额（async with）。"""
+        semaphore = cls._host(urlsplit(url).hostname or '').semaphore
+        return semaphore if semaphore is not None else contextlib.nullcontext()
+
+    @classmethod
+    def create_session(cls, limit: int = 20) -> aiohttp.ClientSession:
+        """limit 为所有 host 合计的连接上限。"""
+
+        async def on_request_start(session, ctx, params) -> None:
+            ctx.host = params.url.host or ''
+
+        async def on_connection_create_end(session, ctx, params) -> None:
+            cls._host(getattr(ctx, 'host', '')).opened += 1
+
+        async def on_connection_reuseconn(session, ctx, params) -> None:
+            cls._host(getattr(ctx, 'host', '')).reused += 1
+
+        async def on_dns_cache_hit(session, ctx, params) -> None:
+            cls.dns_hits += 1
+
+        async def on_dns_cache_miss(session, ctx, params) -> None:
+            cls.dns_misses += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+
+        connector = aiohttp.TCPConnector(
+            limit=limit,
+            ttl_dns_cache=cls.DNS_TTL,
+            keepalive_timeout=cls.KEEPALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            trust_env=True, connector=connector, trace_configs=[trace_config]
+        )
+
+    @classmethod
+    def report(cls) -> dict[str, Any]:
+        hosts = {
+            host: {
+                'limit': cls.limit_for(host),
+                'opened': stats.opened,
+                'reused': stats.reused,
+            }
+            for host, stats in cls._hosts.items()
+            if stats.opened or stats.reused
+        }
+        return {'dns_hits': cls.dns_hits, 'dns_misses': cls.dns_misses, 'hosts': hosts}
+
+
+Connections.load_config()
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'count', 'sum', 'max')
+
+    def __init__(self, bounds: int) -> None:
+        self.buckets = [0] * (bounds + 1)  # 最后一格为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Metrics:
+    """
+    进程内的计数器与耗时直方图，按 (名称, 标签) 汇总，用于定位慢在哪个阶段。
+    线程安全，线程池中的阶段（压缩等）也可直接记录。
+
+    JobQueue 定期输出各 getter 类、各 host 的速率；结束时由
+    write_report 写出 JSON 报告，可选 Prometheus 文本格式。计数器按 Prometheus
+    惯例以 _total 结尾（导出时缺少则补上），耗时直方图以 _seconds 结尾。
+    """
+
+    BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+    _lock = threading.Lock()
+    _counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+    _histograms: dict[tuple[str, tuple[tuple[str, str], ...]], _Histogram] = {}
+    _started = time.monotonic()
+    _last_progress: tuple[float, dict[str, dict[str, float]]] | None = None
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, Any]) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    @classmethod
+    def inc(cls, name: str, value: float = 1, **labels: Any) -> None:
+        key = cls._key(name, labels)
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + value
+
+    @classmethod
+    def observe(cls, name: str, seconds: float, **labels: Any) -> None:
+        key = cls._key(name, labels)
+        with cls._lock:
+            hist = cls._histograms.get(key)
+            if hist is None:
+                hist = cls._histograms[key] = _Histogram(len(cls.BOUNDS))
+            hist.buckets[bisect.bisect_left(cls.BOUNDS, seconds)] += 1
+            hist.count += 1
+            hist.sum += seconds
+            hist.max = max(hist.max, seconds)
+
+    @classmethod
+    @contextlib.contextmanager
+    def timer(cls, name: str, **labels: Any):
+        """记录 with 块的耗时（含其中的 await），异常时同样记录。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.observe(name, time.perf_counter() - start, **labels)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._counters = {}
+            cls._histograms = {}
+            cls._started = time.monotonic()
+            cls._last_progress = None
+
+    @classmethod
+    def report(cls) -> dict[str, Any]:
+        with cls._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(cls._counters.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': hist.count,
+                    'sum': round(hist.sum, 6),
+                    'max': round(hist.max, 6),
+                    'buckets': dict(zip([*map(str, cls.BOUNDS), '+Inf'], hist.buckets)),
+                }
+                for (name, labels), hist in sorted(cls._histograms.items())
+            ]
+        return {
+            'elapsed_seconds': round(time.monotonic() - cls._started, 3),
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    @classmethod
+    def prometheus_text(cls) -> str:
+        def fmt(name: str, labels: tuple, extra: tuple = ()) -> str:
+            pairs = ','.join(
+                '{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"'))
+                for k, v in (*labels, *extra)
+            )
+            return f'{name}{{{pairs}}}' if pairs else name
+
+        lines = []
+        with cls._lock:
+            for name in sorted({name for name, _ in cls._counters}):
+                metric = name if name.endswith('_total') else name + '_total'
+                lines.append(f'# TYPE {metric} counter')
+                for (n, labels), value in sorted(cls._counters.items()):
+                    if n == name:
+                        lines.append(f'{fmt(metric, labels)} {value}')
+            for name in sorted({name for name, _ in cls._histograms}):
+                lines.append(f'# TYPE {name} histogram')
+                for (n, labels), hist in sorted(cls._histograms.items()):
+                    if n != name:
+                        continue
+                    total = 0
+                    for bound, count in zip(
+                        [*map(str, cls.BOUNDS), '+Inf'], hist.buckets
+                    ):
+                        total += count
+                        le = fmt(f'{name}_bucket', labels, (('le', bound),))
+                        lines.append(f'{le} {total}')
+                    lines.append(f'{fmt(name + "_sum", labels)} {hist.sum}')
+                    lines.append(f'{fmt(name + "_count", labels)} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def write_report(cls, path: str, prometheus_path: str | None = None) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cls.report(), f, ensure_ascii=False, indent=2)
+        if prometheus_path:
+            with open(prometheus_path, 'w', encoding='utf-8') as f:
+                f.write(cls.prometheus_text())
+
+    @classmethod
+    def _totals(cls) -> dict[str, dict[str, float]]:
+        """各 getter 类的获取数与各 host 的请求数。"""
+        totals: dict[str, dict[str, float]] = {'getter': {}, 'host': {}}
+        with cls._lock:
+            for (name, labels), hist in cls._histograms.items():
+                if name == 'getter_fetch_seconds':
+                    getter = dict(labels)['getter']
+                    totals['getter'][getter] = (
+                        totals['getter'].get(getter, 0) + hist.count
+                    )
+            for (name, labels), value in cls._counters.items():
+                if name == 'http_requests_total':
+                    host = dict(labels)['host']
+                    totals['host'][host] = totals['host'].get(host, 0) + value
+        return totals
+
+    @classmethod
+    def progress(cls, overall: bool = False) -> str:
+        """自上次调用（overall 为自开始）以来各 getter 类、各 host 的速率（次/秒）。"""
+        now = time.monotonic()
+        totals = cls._totals()
+        last_time, last_totals = cls._last_progress or (cls._started, {})
+        if overall:
+            last_time, last_totals = cls._started, {}
+        cls._last_progress = (now, totals)
+        interval = max(now - last_time, 1e-9)
+        parts = []
+        for kind, values in totals.items():
+            last = last_totals.get(kind, {})
+            rates = ', '.join(
+                f'{name} {(value - last.get(name, 0)) / interval:.1f}/s'
+                for name, value in sorted(values.items())
+            )
+            if rates:
+                parts.append(f'{kind}: {rates}')
+        return ' | '.join(parts)
+
+
 _compress_executor = ThreadPoolExecutor(max_workers=min(8, (os.cpu_count() or 4)))
 
+# 离线读取本地资源（stat、读取、解压、解析）用独立的线程池与信号量，
+# 不占用网络并发名额，冷缓存或网络文件系统上也不阻塞事件循环
+DISK_CONCURRENCY = 16
+_io_executor = ThreadPoolExecutor(
+    max_workers=DISK_CONCURRENCY, thread_name_prefix='asset-io'
+)
+_disk_semaphore = asyncio.Semaphore(DISK_CONCURRENCY)
+
 
 def _compress_sync(json_bytes: bytes, quality: int) -> bytes:
-    return brotli.compress(json_bytes, quality=quality)
+    with Metrics.timer('compress_seconds'):
+        return brotli.compress(json_bytes, quality=quality)
+
+
+class AssetStore:
+    """
+    资源清单：一个 SQLite 文件记录 (url, 保存路径) → 大小、压缩方式、sha256、获取时间。
+
+    离线读取时用一次索引查询代替逐个候选 url 的 os.path.exists 探测；
+    文件仍按原目录结构保存，清单里没有的旧文件按原方式探测后补记（懒迁移）。
+    记录只接受与本次保存路径（append_save_path、是否压缩）一致的行。
+
+    清单放在资源目录之外（其 -wal/-shm 文件不应出现在资源目录中）。查询在
+    _io_executor 中执行；写入先缓存，攒够 _FLUSH_ROWS 条或查询、关闭时一并提交。
+    """
+
+    _SCHEMA_VERSION = 2
+    _FLUSH_ROWS = 500
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self.root = os.path.dirname(os.path.abspath(manifest_path))
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, tuple]] = []
+        self._conn = sqlite3.connect(
+            manifest_path, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < self._SCHEMA_VERSION:
+            # 旧版只按 url 记录；清单可由懒迁移重建，直接丢弃
+            self._conn.execute('DROP TABLE IF EXISTS assets')
+            self._conn.execute(f'PRAGMA user_version = {self._SCHEMA_VERSION}')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS assets ('
+            'url TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, '
+            'compression TEXT NOT NULL, sha256 TEXT NOT NULL, fetched_at REAL NOT NULL, '
+            'PRIMARY KEY (url, path))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS assets_path ON assets(path)')
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._conn.execute('BEGIN')
+        try:
+            for sql, params in pending:
+                self._conn.execute(sql, params)
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _queue(self, sql: str, params: tuple) -> None:
+        with self._lock:
+            self._pending.append((sql, params))
+            full = len(self._pending) >= self._FLUSH_ROWS
+        if full:
+            _io_executor.submit(self.flush)
+
+    def lookup(
+        self, urls: list[str], save_dir: str, append_save_path: str | None
+    ) -> tuple[str, str] | None:
+        """
+        按 urls 顺序返回第一个保存路径与本次一致的记录 (绝对路径, 压缩方式)。
+        会执行 SQLite 查询，事件循环中应经 _io_executor 调用。
+        """
+        expected: dict[str, set[str]] = {}
+        for url in urls:
+            base = self._rel(_local_asset_path(url, save_dir, append_save_path))
+            expected[url] = {base, base + '.br', base + '.zst'}
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                f'SELECT url, path, compression FROM assets '
+                f'WHERE url IN ({", ".join("?" * len(urls))})',
+                urls,
+            ).fetchall()
+        found = {
+            url: (path, compression)
+            for url, path, compression in rows
+            if path in expected[url]
+        }
+        for url in urls:
+            if url in found:
+                path, compression = found[url]
+                return os.path.join(self.root, path), compression
+        return None
+
+    def record(self, url: str, path: str, data: bytes, compression: str) -> None:
+        self.record_digest(
+            url, path, len(data), hashlib.sha256(data).hexdigest(), compression
+        )
+
+    def record_digest(
+        self, url: str, path: str, size: int, sha256: str, compression: str
+    ) -> None:
+        rel_path = self._rel(path)
+        # 同一 url 换了压缩方式时，旧格式的记录作废
+        stem = rel_path.removesuffix('.br').removesuffix('.zst')
+        self._queue(
+            'DELETE FROM assets WHERE url = ? AND path IN (?, ?, ?)',
+            (url, stem, stem + '.br', stem + '.zst'),
+        )
+        self._queue(
+            'INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?)',
+            (url, rel_path, size, compression, sha256, time.time()),
+        )
+
+    def update_file(
+        self, old_path: str, new_path: str, size: int, sha256: str, compression: str
+    ) -> None:
+        """文件被重新压缩或转换格式后，更新指向它的记录。"""
+        self._queue(
+            'UPDATE assets SET path = ?, size = ?, compression = ?, sha256 = ? '
+            'WHERE path = ?',
+            (self._rel(new_path), size, compression, sha256, self._rel(old_path)),
+        )
+
+    def forget(self, url: str, path: str) -> None:
+        self._queue(
+            'DELETE FROM assets WHERE url = ? AND path = ?', (url, self._rel(path))
+        )
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+class MasterCache:
+    """
+    进程内共享的 master 数据缓存，键为 (source, lang, file, force_online)。
+
+    同一键的并发请求只获取、解析一次，所有 getter 拿到同一个对象；
+    DictLookup 也按 (数据对象, 属性名) 共享。master 数据视为只读。
+    force_online 不同的 getter 不共享（离线读本地与强制在线获取的结果可能不同）。
+    获取失败（抛出异常或返回 'ERROR: ...'）时不缓存，下次调用重新获取。
+    """
+
+    _tasks: dict[tuple[str, str, str, bool], asyncio.Task] = {}
+    _lookups: dict[tuple[int, str], tuple[Any, 'DictLookup']] = {}
+
+    hits = 0
+    misses = 0
+    lookup_hits = 0
+    lookup_misses = 0
+
+    @classmethod
+    async def get(
+        cls, key: tuple[str, str, str, bool], fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        task = cls._tasks.get(key)
+        if task is None:
+            cls.misses += 1
+            task = asyncio.ensure_future(fetch())
+            cls._tasks[key] = task
+        else:
+            cls.hits += 1
+        try:
+            result = await asyncio.shield(task)
+        except Exception:
+            if cls._tasks.get(key) is task:
+                del cls._tasks[key]
+            raise
+        if isinstance(result, str) and cls._tasks.get(key) is task:
+            del cls._tasks[key]
+        return result
+
+    @classmethod
+    def lookup(cls, data: list[dict[str, Any]], attr_name: str) -> 'DictLookup':
+        key = (id(data), attr_name)
+        cached = cls._lookups.get(key)
+        if cached is not None and cached[0] is data:
+            cls.lookup_hits += 1
+            return cached[1]
+        cls.lookup_misses += 1
+        dict_lookup = DictLookup(data, attr_name)
+        cls._lookups[key] = (data, dict_lookup)  # 持有 data，保证 id 不被复用
+        return dict_lookup
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        return {
+            'entries': len(cls._tasks),
+            'hits': cls.hits,
+            'misses': cls.misses,
+            'lookup_hits': cls.lookup_hits,
+            'lookup_misses': cls.lookup_misses,
+        }
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._tasks.clear()
+        cls._lookups.clear()
+        cls.hits = cls.misses = cls.lookup_hits = cls.lookup_misses = 0
+
+
+class BuildState:
+    """
+    增量重建：记录每个输出文件的输入指纹，与上次相同且输出文件仍在时跳过
+    获取、解析与写入。
+
+    指纹包含输入资源文件的 sha256、相关 master 行、reader 选项与渲染代码本身
+    （src 下的 .py 文件），任一变化即重建。资源的 sha256 按 (大小, mtime) 缓存在
+    状态文件中，未变的文件不再重读。只在离线运行时生效。
+    """
+
+    _path: str | None = None
+    _outputs: dict[str, str] = {}
+    _assets: dict[str, list] = {}  # 资源路径 → [大小, mtime_ns, sha256]
+    _code_digest = ''
+
+    skipped = 0
+    built = 0
+
+    @classmethod
+    def load(cls, path: str) -> None:
+        cls._path = path
+        cls._outputs = {}
+        cls._assets = {}
+        try:
+            with open(path, encoding='utf8') as f:
+                data = json.load(f)
+            cls._outputs = data['outputs']
+            cls._assets = data['assets']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError):
+            logging.warning(f'Failed to load build state from {path}, rebuild all')
+
+        code_hash = hashlib.sha256()
+        for py_file in sorted(Path(__file__).parent.glob('*.py')):
+            code_hash.update(py_file.read_bytes())
+        cls._code_digest = code_hash.hexdigest()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls._path is not None
+
+    @classmethod
+    def save(cls) -> None:
+        if cls._path is None:
+            return
+        tmp_path = cls._path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump({'outputs': cls._outputs, 'assets': cls._assets}, f)
+        os.replace(tmp_path, cls._path)
+
+    @classmethod
+    async def asset_digest(
+        cls,
+        urls: list[str],
+        save_dir: str,
+        append_save_path: str | None,
+        asset_store: AssetStore | None = None,
+    ) -> str | None:
+        """本地资源文件的 sha256；本地没有时返回 None。找到的路径照常记入成功日志。"""
+        async with _disk_semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                _io_executor,
+                cls._asset_digest_sync,
+                urls,
+                save_dir,
+                append_save_path,
+                asset_store,
+            )
+
+    @classmethod
+    def _asset_digest_sync(
+        cls,
+        urls: list[str],
+        save_dir: str,
+        append_save_path: str | None,
+        asset_store: AssetStore | None,
+    ) -> str | None:
+        found = (
+            asset_store.lookup(urls, save_dir, append_save_path)
+            if asset_store is not None
+            else None
+        )
+        if found is None or not os.path.exists(found[0]):
+            for url in urls:
+                if found := _probe_local_asset(url, save_dir, append_save_path):
+                    break
+            else:
+                return None
+        path, compression = found
+
+        success_assets_file = 'assets_success.log' if RECORD_ASSET_SUCCESS else None
+        AssetLog.write(success_assets_file, path)
+        if compression == 'zstd':
+            AssetLog.write(success_assets_file, os.path.join(save_dir, ZSTD_DICT_NAME))
+
+        stat = os.stat(path)
+        cached = cls._assets.get(path)
+        if cached is not None and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return cached[2]
+        with open(path, 'rb') as f:
+            sha256 = hashlib.file_digest(f, 'sha256').hexdigest()
+        cls._assets[path] = [stat.st_size, stat.st_mtime_ns, sha256]
+        return sha256
+
+    @classmethod
+    def key(cls, *parts: Any) -> str:
+        data = json.dumps(
+            [cls._code_digest, *parts], ensure_ascii=False, sort_keys=True, default=str
+        )
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def unchanged(cls, output_path: str | Path, key: str | None) -> bool:
+        output_path = os.path.normpath(output_path)
+        if (
+            key is not None
+            and cls._outputs.get(output_path) == key
+            and os.path.exists(output_path)
+        ):
+            cls.skipped += 1
+            return True
+        return False
+
+    @classmethod
+    def record(cls, output_path: str | Path, key: str | None) -> None:
+        if key is not None:
+            cls._outputs[os.path.normpath(output_path)] = key
+            cls.built += 1
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        return {
+            'outputs': len(cls._outputs),
+            'skipped': cls.skipped,
+            'built': cls.built,
+        }
+
+
+class NegativeCache:
+    """
+    上游确定缺失的资源（404/410，或应为 JSON 却返回了别的内容）按 url 记录，
+    复查间隔按确认次数指数增长（RECHECK_BASE 起，至多 RECHECK_MAX）。
+    未到复查时间时直接返回记录的错误，不再请求；获取成功即移除。
+    """
+
+    RECHECK_BASE = 12 * 3600
+    RECHECK_MAX = 30 * 24 * 3600
+
+    _path: str | None = None
+    # url → {'first_seen', 'last_checked', 'status', 'checks', 'error'}
+    _entries: dict[str, dict[str, Any]] = {}
+
+    hits = 0
+    recorded = 0
+    cleared = 0
+
+    @classmethod
+    def load(cls, path: str) -> None:
+        cls._path = path
+        cls._entries = {}
+        try:
+            with open(path, encoding='utf8') as f:
+                cls._entries = json.load(f)['entries']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError):
+            logging.warning(f'Failed to load negative cache from {path}, ignore it')
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls._path is not None
+
+    @classmethod
+    def save(cls) -> None:
+        if cls._path is None:
+            return
+        tmp_path = cls._path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump({'entries': cls._entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, cls._path)
+
+    @classmethod
+    def _recheck_at(cls, entry: dict[str, Any]) -> float:
+        interval = cls.RECHECK_BASE * 2 ** (entry['checks'] - 1)
+        return entry['last_checked'] + min(interval, cls.RECHECK_MAX)
 
+    @classmethod
+    def lookup(cls, urls: list[str]) -> str | None:
+        """所有镜像都已知缺失且未到复查时间时，返回记录的错误。"""
+        if cls._path is None:
+            return None
+        now = time.time()
+        entries = [cls._entries.get(url) for url in urls]
+        if all(entry is not None and now < cls._recheck_at(entry) for entry in entries):
+            cls.hits += 1
+            return entries[-1]['error']  # type: ignore[index]
+        return None
+
+    @staticmethod
+    def is_permanent(e: Exception) -> bool:
+        return isinstance(e, json.decoder.JSONDecodeError) or (
+            isinstance(e, aiohttp.ClientResponseError) and e.status in (404, 410)
+        )
+
+    @classmethod
+    def record(cls, url: str, e: Exception) -> None:
+        if cls._path is None or not cls.is_permanent(e):
+            return
+        now = int(time.time())
+        entry = cls._entries.get(url)
+        if entry is None:
+            entry = cls._entries[url] = {'first_seen': now, 'checks': 0}
+            cls.recorded += 1
+        entry['last_checked'] = now
+        entry['checks'] += 1
+        entry['status'] = (
+            e.status if isinstance(e, aiohttp.ClientResponseError) else type(e).__name__
+        )
+        entry['error'] = f'{type(e)}: {e}'
 
-def _decompress_sync(compressed_bytes: bytes) -> bytes:
-    return brotli.decompress(compressed_bytes)
+    @classmethod
+    def forget(cls, url: str) -> None:
+        if cls._entries.pop(url, None) is not None:
+            cls.cleared += 1
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        return {
+            'entries': len(cls._entries),
+            'hits': cls.hits,
+            'recorded': cls.recorded,
+            'cleared': cls.cleared,
+        }
 
 
 class Base_fetcher:
@@ -224,8 +1298,10 @@ class Base_fetcher:
         self,
         session: aiohttp.ClientSession | None = None,
         network_semaphore: Semaphore | None = None,
+        asset_store: AssetStore | None = None,
     ) -> None:
         self.session = session
+        self.asset_store = asset_store
 
         if network_semaphore is None:
             self.network_semaphore = _net_semaphore
@@ -252,65 +1328,443 @@ class Base_fetcher:
             online = self.online | force_online
             missing_download = self.missing_download
 
-        return await fetch_url_json(
-            url,
-            online,
-            self.save_assets,
-            self.assets_save_dir,
-            missing_download,
-            extra_record_msg=extra_record_msg,
-            session=self.session,
-            network_semaphore=self.network_semaphore,
-            print_done=print_done,
-            append_save_path=append_save_path,
-            compress=compress,
-            skip_read=skip_read,
-            content_save_edit=content_save_edit,
-            format=format,
+        with Metrics.timer('getter_fetch_seconds', getter=type(self).__name__):
+            return await fetch_url_json(
+                url,
+                online,
+                self.save_assets,
+                self.assets_save_dir,
+                missing_download,
+                extra_record_msg=extra_record_msg,
+                session=self.session,
+                network_semaphore=self.network_semaphore,
+                print_done=print_done,
+                append_save_path=append_save_path,
+                compress=compress,
+                skip_read=skip_read,
+                content_save_edit=content_save_edit,
+                format=format,
+                asset_store=self.asset_store,
+                revalidate=force_online,
+            )
+
+    def asset_append_save_path(self, urls: list[str]) -> str | None:
+        """资源保存的相对路径；None 表示按 url 推出（url_to_path）。"""
+        return None
+
+    async def asset_digest(self, url: str | list[str]) -> str | None:
+        urls = [url] if isinstance(url, str) else url
+        return await BuildState.asset_digest(
+            urls,
+            self.assets_save_dir,
+            self.asset_append_save_path(urls),
+            self.asset_store,
+        )
+
+    def master_lang(self) -> str:
+        """master 数据的语言；各语言合在同一文件中的数据源（如 Bestdori）为 'all'。"""
+        return getattr(self, 'lang', None) or 'all'
+
+    async def fetch_master_json(
+        self,
+        url: str | list[str],
+        content_save_edit: Callable | None = None,
+    ) -> Any:
+        """
+        经 MasterCache 获取 master 表，键为 (host, master_lang(), url 路径,
+        force_master_online)；只用于整张 master 表，单个活动、卡面等的信息
+        直接用 fetch_url_json。
+        """
+        urls = [url] if isinstance(url, str) else url
+        parts = urlsplit(urls[0])
+        return await MasterCache.get(
+            (
+                parts.hostname or '',
+                self.master_lang(),
+                parts.path,
+                self.force_master_online,
+            ),
+            lambda: self.fetch_url_json(
+                url,
+                force_online=self.force_master_online,
+                content_save_edit=content_save_edit,
+            ),
+        )
+
+
+class Base_getter(Base_fetcher):
+    def __init__(
+        self,
+        save_dir: str,
+        assets_save_dir: str,
+        online: bool,
+        save_assets: bool,
+        parse: bool,
+        missing_download: bool,
+        compress_assets: bool,
+        force_master_online: bool,
+    ):
+        super().__init__(
+            assets_save_dir,
+            online,
+            save_assets,
+            missing_download,
+            compress_assets,
+            force_master_online,
+        )
+
+        self.save_dir = save_dir
+        self.parse = parse
+
+    async def build_key(
+        self, asset_urls: list[str | list[str]], *parts: Any
+    ) -> str | None:
+        """
+        输出文件的输入指纹：asset_urls 为各输入资源的 url（或候选 url 列表），
+        parts 为 reader 选项、用到的 master 行等。未启用 BuildState、在线运行或
+        有输入资源不在本地时返回 None（照常重建）。
+        """
+        if not BuildState.enabled() or self.online or not self.parse:
+            return None
+        digests = []
+        for url in asset_urls:
+            digest = await self.asset_digest(url)
+            if digest is None:
+                return None
+            digests.append(digest)
+        return BuildState.key(digests, *parts)
+
+
+class Checkpoint:
+    """
+    中断后续跑：日志中逐行追加已完成的 job 名（JobQueue 的 name，含语言、
+    getter 与 id）与已保存资源的 url。续跑时跳过已完成的 job，已保存的资源
+    直接读本地；整轮完成后删除日志。未启用时各方法均为空操作。
+
+    getter 以返回 'ERROR: ...' 而非抛出异常表示获取失败，因此 fetch_url_json
+    经 fetch_failed 计入当前 job，有获取失败的 job 不记为完成，续跑时重做。
+    """
+
+    _path: str | None = None
+    _file: Any = None
+    _jobs: set[str] = set()
+    _assets: set[str] = set()
+    # 当前 job 的获取失败次数；job 内创建的子任务复制上下文，共享同一个列表
+    _job_failures: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar(
+        'checkpoint_job_failures', default=None
+    )
+
+    skipped_jobs = 0
+    resumed_assets = 0
+    unfinished_jobs = 0
+
+    @classmethod
+    def start(cls, path: str, resume: bool) -> None:
+        cls._path = path
+        cls._jobs = set()
+        cls._assets = set()
+        if resume:
+            try:
+                with open(path, encoding='utf8') as f:
+                    for line in f:
+                        if not line.endswith('\n'):
+                            break  # 中断时写了一半的行
+                        entry = json.loads(line)
+                        if 'job' in entry:
+                            cls._jobs.add(entry['job'])
+                        else:
+                            cls._assets.add(entry['asset'])
+            except FileNotFoundError:
+                pass
+            logging.info(
+                f'Resume from {path}: {len(cls._jobs)} jobs, '
+                f'{len(cls._assets)} assets done'
+            )
+        cls._file = open(path, 'a' if resume else 'w', encoding='utf8')
+
+    @classmethod
+    def _append(cls, entry: dict[str, str]) -> None:
+        if cls._file is not None:
+            cls._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            cls._file.flush()
+
+    @classmethod
+    def job_done(cls, name: str) -> None:
+        if cls._file is not None and name:
+            cls._jobs.add(name)
+            cls._append({'job': name})
+
+    @classmethod
+    def begin_job(cls) -> list[int]:
+        """在当前任务中开始计数一个 job 的获取失败，返回计数。"""
+        failures = [0]
+        cls._job_failures.set(failures)
+        return failures
+
+    @classmethod
+    def fetch_failed(cls) -> None:
+        failures = cls._job_failures.get()
+        if failures is not None:
+            failures[0] += 1
+
+    @classmethod
+    def is_job_done(cls, name: str) -> bool:
+        if name in cls._jobs:
+            cls.skipped_jobs += 1
+            return True
+        return False
+
+    @classmethod
+    def asset_saved(cls, url: str) -> None:
+        if cls._file is not None and url not in cls._assets:
+            cls._assets.add(url)
+            cls._append({'asset': url})
+
+    @classmethod
+    def saved_url(cls, urls: list[str]) -> str | None:
+        """本轮（含中断前）已保存过的镜像 url。"""
+        for url in urls:
+            if url in cls._assets:
+                return url
+        return None
+
+    @classmethod
+    def close(cls) -> None:
+        if cls._file is not None:
+            cls._file.close()
+            cls._file = None
+
+    @classmethod
+    def finish(cls) -> None:
+        """整轮完成：关闭并删除日志，下次从头开始。"""
+        cls.close()
+        if cls._path is not None:
+            delete_path(cls._path)
+        cls._jobs = set()
+        cls._assets = set()
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        return {
+            'skipped_jobs': cls.skipped_jobs,
+            'resumed_assets': cls.resumed_assets,
+            'unfinished_jobs': cls.unfinished_jobs,
+        }
+
+
+class JobQueue:
+    """
+    有界并发的任务调度：job 为无参的协程工厂，按 priority（小者优先）出队，
+    固定数量的 worker 依次执行，协程在出队时才创建。
+
+    任一 job 抛出异常时停止调度并向上抛出（与 asyncio.gather 一致）。
+    """
+
+    def __init__(self, workers: int = 16, progress_interval: float | None = 30):
+        self.workers = workers
+        self.progress_interval = progress_interval
+        self._queue: asyncio.PriorityQueue[
+            tuple[int, int, str, Callable[[], Awaitable[Any]]]
+        ] = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self.added = 0
+        self.running = 0
+        self.done = 0
+        self.failed = 0
+
+    def add(
+        self, job: Callable[[], Awaitable[Any]], priority: int = 0, name: str = ''
+    ) -> None:
+        if name and Checkpoint.is_job_done(name):
+            return
+        self._queue.put_nowait((priority, next(self._seq), name, job))
+        self.added += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'queued': self._queue.qsize(),
+            'running': self.running,
+            'done': self.done,
+            'failed': self.failed,
+            'total': self.added,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                _, _, name, job = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            self.running += 1
+            failures = Checkpoint.begin_job()
+            try:
+                await job()
+            except Exception:
+                self.failed += 1
+                logging.error(f'job {name} failed')
+                raise
+            finally:
+                self.running -= 1
+            self.done += 1
+            if failures[0]:  # 有资源获取失败，续跑时重做
+                Checkpoint.unfinished_jobs += 1
+                continue
+            if FSYNC_WRITES:  # job 的文件落盘后才记为完成
+                await asyncio.get_running_loop().run_in_executor(
+                    _io_executor, FileWrites.sync
+                )
+            Checkpoint.job_done(name)
+
+    async def _report_progress(self) -> None:
+        assert self.progress_interval is not None
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            logging.info(f'job progress: {self.stats()}')
+            rates = Metrics.progress()
+            if rates:
+                logging.info(f'rates: {rates}')
+
+    async def run(self) -> None:
+        workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(min(self.workers, max(self._queue.qsize(), 1)))
+        ]
+        reporter = (
+            asyncio.create_task(self._report_progress())
+            if self.progress_interval
+            else None
         )
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            if reporter is not None:
+                reporter.cancel()
+            FileWrites.sync()
+        logging.info(f'job progress: {self.stats()}')
+        rates = Metrics.progress(overall=True)
+        if rates:
+            logging.info(f'rates: {rates}')
 
 
-class Base_getter(Base_fetcher):
+_parse_worker_reader: Any = None
+
+
+def _init_parse_worker(factory: Callable[..., Any], snapshot: tuple) -> None:
+    global _parse_worker_reader
+    _parse_worker_reader = factory(*snapshot)
+
+
+def _parse_in_worker(args: tuple) -> str:
+    return _parse_worker_reader.read_story_in_json(*args)
+
+
+class Parse_pool:
+    """
+    在子进程中执行 read_story_in_json，离线全量重建时用满多核。
+
+    reader 的配置与 master 快照在每个 worker 启动时经 initializer 传入一次，
+    由 factory(*snapshot) 在 worker 内重建 reader；之后每个任务只传剧情 json
+    及 read_story_in_json 的其余参数。factory 须可 pickle（模块级函数或类方法）。
+    """
+
     def __init__(
-        self,
-        save_dir: str,
-        assets_save_dir: str,
-        online: bool,
-        save_assets: bool,
-        parse: bool,
-        missing_download: bool,
-        compress_assets: bool,
-        force_master_online: bool,
-    ):
-        super().__init__(
-            assets_save_dir,
-            online,
-            save_assets,
-            missing_download,
-            compress_assets,
-            force_master_online,
+        self, factory: Callable[..., Any], snapshot: tuple, workers: int
+    ) -> None:
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_parse_worker,
+            initargs=(factory, snapshot),
         )
 
-        self.save_dir = save_dir
-        self.parse = parse
+    async def read_story_in_json(self, *args: Any) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _parse_in_worker, args)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
 
 
 class DictLookup:
+    """
+    master 行按某个整数属性的索引。find_index 返回该值第一行的下标，find_all
+    返回所有行的下标（按行顺序），均不依赖数据的排序。
+
+    值分布稠密时用 array('i') 偏移表直接寻址，否则用 dict；重复值的其余行另存。
+    是否按该属性有序在构建时检查一次，只有 find_max_le_index 需要有序视图，
+    无序时按需构建。
+    """
+
+    # 取值跨度不超过 行数 * DENSE_RATIO + DENSE_SLACK 时视为稠密
+    DENSE_RATIO = 2
+    DENSE_SLACK = 64
+
     def __init__(self, data: list[dict[str, Any]], attr_name: str):
         self.data = data
+        self.attr_name = attr_name
         self.ids = [int(d[attr_name]) for d in data]
+        self.is_sorted = all(a <= b for a, b in zip(self.ids, self.ids[1:]))
+        if not self.is_sorted:
+            logging.debug(f'DictLookup: data not sorted by {attr_name}')
+
+        self._rest: dict[int, list[int]] = {}  # 重复值：第一行之外的下标
+        self._offset = 0
+        self._table: array.array | None = None
+        self._map: dict[int, int] | None = None
+        self._sorted_view: tuple[list[int], list[int]] | None = None
+
+        if not self.ids:
+            self._map = {}
+            return
+        low, high = min(self.ids), max(self.ids)
+        if high - low + 1 <= len(self.ids) * self.DENSE_RATIO + self.DENSE_SLACK:
+            self._offset = low
+            table = array.array('i', [-1]) * (high - low + 1)
+            for index, id in enumerate(self.ids):
+                if table[id - low] == -1:
+                    table[id - low] = index
+                else:
+                    self._rest.setdefault(id, []).append(index)
+            self._table = table
+        else:
+            first: dict[int, int] = {}
+            for index, id in enumerate(self.ids):
+                if first.setdefault(id, index) != index:
+                    self._rest.setdefault(id, []).append(index)
+            self._map = first
+
+    @property
+    def is_dense(self) -> bool:
+        return self._table is not None
 
     def find_index(self, target_id: int) -> int:
-        left_index = bisect.bisect_left(self.ids, target_id)
-        if left_index < len(self.ids) and self.ids[left_index] == target_id:
-            return left_index
-        return -1
+        if self._table is not None:
+            offset = target_id - self._offset
+            if 0 <= offset < len(self._table):
+                return self._table[offset]
+            return -1
+        assert self._map is not None
+        return self._map.get(target_id, -1)
+
+    def find_all(self, target_id: int) -> list[int]:
+        first = self.find_index(target_id)
+        if first == -1:
+            return []
+        return [first, *self._rest.get(target_id, ())]
 
     def find_max_le_index(self, target_id: int) -> int:
-        insert_pos = bisect.bisect_right(self.ids, target_id)
+        if self.is_sorted:
+            ids, indexes = self.ids, None
+        else:
+            if self._sorted_view is None:
+                order = sorted(range(len(self.ids)), key=self.ids.__getitem__)
+                self._sorted_view = ([self.ids[i] for i in order], order)
+            ids, indexes = self._sorted_view
+        insert_pos = bisect.bisect_right(ids, target_id)
         if insert_pos == 0:
             return -1
-        return insert_pos - 1
+        return insert_pos - 1 if indexes is None else indexes[insert_pos - 1]
 
 
 def valid_filename(filename: str) -> str:
@@ -338,10 +1792,265 @@ def url_to_path(url: str, save_dir: str) -> str:
     return os.path.normpath(os.path.join(save_dir, url_path))
 
 
-def write_to_file(file_path: str | None, content: str) -> None:
-    if file_path is not None:
-        with open(file_path, 'a', encoding='utf-8') as f:
-            f.write(f"{content}\n")
+class AssetLog:
+    """
+    assets_*.log 的缓冲写入：行先存在内存中，同一次运行内去重，积累到
+    FLUSH_LINES 行或距上次写入超过 FLUSH_INTERVAL 秒时交给后台线程批量追加，
+    退出时（或 close）写完剩余的行。
+
+    每个 xxx.log 旁同时写一份 xxx.jsonl，每行为 {"path", "urls", "message"}；
+    .log 保持 `path || url: ... || message: ...` 格式供 misc/clean_assets.py 解析。
+    """
+
+    FLUSH_LINES = 1000
+    FLUSH_INTERVAL = 5.0
+
+    _pending: dict[str, list[tuple[str, str]]] = {}
+    _seen: dict[str, set[str]] = {}
+    _count = 0
+    _last_flush = time.monotonic()
+    _lock = threading.Lock()
+    _executor = ThreadPoolExecutor(max_workers=1)  # 单线程，保证写入顺序
+
+    @classmethod
+    def write(
+        cls,
+        file_path: str | None,
+        path: str,
+        urls: list[str] | None = None,
+        message: str = '',
+    ) -> None:
+        if file_path is None:
+            return
+        line = path
+        if urls is not None:
+            line += f" || url: {', '.join(urls)}"
+        if message:
+            line += f' || message: {message}'
+        with cls._lock:
+            seen = cls._seen.setdefault(file_path, set())
+            if line in seen:
+                return
+            seen.add(line)
+            record = json.dumps(
+                {'path': path, 'urls': urls or [], 'message': message},
+                ensure_ascii=False,
+            )
+            cls._pending.setdefault(file_path, []).append((line, record))
+            cls._count += 1
+            if (
+                cls._count < cls.FLUSH_LINES
+                and time.monotonic() - cls._last_flush < cls.FLUSH_INTERVAL
+            ):
+                return
+            batch = cls._take()
+        cls._executor.submit(cls._append, batch)
+
+    @classmethod
+    def _take(cls) -> dict[str, list[tuple[str, str]]]:
+        batch = cls._pending
+        cls._pending = {}
+        cls._count = 0
+        cls._last_flush = time.monotonic()
+        return batch
+
+    @staticmethod
+    def _append(batch: dict[str, list[tuple[str, str]]]) -> None:
+        for file_path, entries in batch.items():
+            jsonl_path = os.path.splitext(file_path)[0] + '.jsonl'
+            with open(file_path, 'a', encoding='utf-8') as f:
+                f.writelines(f'{line}\n' for line, _ in entries)
+            with open(jsonl_path, 'a', encoding='utf-8') as f:
+                f.writelines(f'{record}\n' for _, record in entries)
+
+    @classmethod
+    def flush(cls) -> None:
+        """写出所有缓冲的行并等待完成。"""
+        with cls._lock:
+            batch = cls._take()
+        try:
+            cls._executor.submit(cls._append, batch).result()
+        except RuntimeError:  # 解释器退出时线程池已关闭，直接在当前线程写
+            cls._append(batch)
+
+
+atexit.register(AssetLog.flush)
+
+
+VALIDATORS_SUFFIX = '.validators.json'
+
+
+def load_validators(save_path: str, url: str) -> dict[str, str]:
+    """读取 save_path 旁记录的 ETag/Last-Modified，返回可直接用作请求头的条件头。"""
+    if not os.path.exists(save_path):
+        return {}
+    try:
+        with open(save_path + VALIDATORS_SUFFIX, encoding='utf8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('url') != url:
+        return {}
+    headers = {}
+    if data.get('etag'):
+        headers['If-None-Match'] = data['etag']
+    if data.get('last_modified'):
+        headers['If-Modified-Since'] = data['last_modified']
+    return headers
+
+
+def save_validators(save_path: str, url: str, res_headers: Any) -> str | None:
+    """记录响应的 ETag/Last-Modified；响应不带校验头则删掉旧记录。返回记录文件路径。"""
+    validators_path = save_path + VALIDATORS_SUFFIX
+    etag = res_headers.get('ETag')
+    last_modified = res_headers.get('Last-Modified')
+    if not etag and not last_modified:
+        delete_path(validators_path)
+        return None
+    data = {'url': url, 'etag': etag, 'last_modified': last_modified}
+    atomic_write(validators_path, json.dumps(data, ensure_ascii=False, indent=2))
+    return validators_path
+
+
+class FileWrites:
+    """
+    资源与剧情文本的写入统计，以及 FSYNC_WRITES 时待 fsync 的文件。
+
+    fsync 不在每次写入时进行，而是在检查点由 sync() 统一处理：先逐个 fsync
+    文件，再 fsync 所在目录使改名落盘。
+    """
+
+    _lock = threading.Lock()
+    _pending: set[str] = set()
+
+    written = 0
+    unchanged = 0
+    synced = 0
+
+    @classmethod
+    def _add_pending(cls, path: str) -> None:
+        with cls._lock:
+            cls._pending.add(path)
+
+    @classmethod
+    def sync(cls) -> None:
+        with cls._lock:
+            pending, cls._pending = cls._pending, set()
+        if not pending:
+            return
+        dirs = set()
+        for path in pending:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:  # 已被改名或删除
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            cls.synced += 1
+            dirs.add(os.path.dirname(path) or '.')
+        for dir_path in dirs:
+            with contextlib.suppress(OSError):  # 部分平台不能打开目录
+                fd = os.open(dir_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        return {
+            'written': cls.written,
+            'unchanged': cls.unchanged,
+            'synced': cls.synced,
+        }
+
+
+def atomic_write(path: str | Path, data: bytes | str) -> bool:
+    """
+    先写同目录的临时文件再改名，中断时不会留下截断的文件；与磁盘上的内容
+    逐字节相同时不写（不改 mtime）。str 按 utf-8 与平台换行写出，与文本模式
+    的 open 一致。返回是否实际写入。
+    """
+    path = os.fspath(path)
+    if isinstance(data, str):
+        if os.linesep != '\n':
+            data = data.replace('\n', os.linesep)
+        data = data.encode('utf-8')
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    FileWrites.unchanged += 1
+                    return False
+    except OSError:
+        pass
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        # 临时文件是新建的，沿用原文件的权限
+        with contextlib.suppress(FileNotFoundError):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    DirIndex.created(path)
+    FileWrites.written += 1
+    if FSYNC_WRITES:
+        FileWrites._add_pending(path)
+    return True
+
+
+@contextlib.contextmanager
+def open_for_write(path: str | Path):
+    """
+    代替 open(path, 'w', encoding='utf8')：写入先缓存在内存中，with 块正常
+    结束时经 atomic_write 写出，抛出异常时不写。
+    """
+    buffer = io.StringIO()
+    yield buffer
+    atomic_write(path, buffer.getvalue())
+
+
+def get_save_path(
+    url: str, save_dir: str, append_save_path: str | None, compress: bool
+) -> str:
+    if append_save_path is None:
+        path = url_to_path(url, save_dir)
+    else:
+        path = os.path.normpath(os.path.join(save_dir, append_save_path))
+    return (path + '.br') if compress else path
+
+
+def _stored_file(save_path: str, save_dir: str) -> tuple[str, bytes, str, bytes] | None:
+    """
+    已保存的 .br（或由它转换出的 .zst）：返回 (路径, 文件内容, 压缩方式, 解压后的内容)；
+    没有或无法解压时返回 None。
+    """
+    try:
+        with open(save_path, 'rb') as f:
+            file_bytes = f.read()
+        return save_path, file_bytes, 'br', brotli.decompress(file_bytes)
+    except FileNotFoundError:
+        pass
+    except (OSError, brotli.error):
+        return None
+    zstd_path = save_path.removesuffix('.br') + '.zst'
+    dict_path = os.path.join(save_dir, ZSTD_DICT_NAME)
+    if zstandard is None or not os.path.exists(zstd_path):
+        return None
+    try:
+        with open(zstd_path, 'rb') as f:
+            file_bytes = f.read()
+        decompressor = zstandard.ZstdDecompressor(dict_data=_load_zstd_dict(dict_path))
+        return zstd_path, file_bytes, 'zstd', decompressor.decompress(file_bytes)
+    except (OSError, zstandard.ZstdError):
+        return None
 
 
 async def save_json_to_url(
@@ -353,13 +2062,10 @@ async def save_json_to_url(
     content_edit: Callable | None = None,
     skip_save: bool = False,
     format: str = 'json',
+    asset_store: AssetStore | None = None,
 ) -> str:
     is_json = format == 'json'
-    if append_save_path is None:
-        path = url_to_path(url, save_dir)
-    else:
-        path = os.path.normpath(os.path.join(save_dir, append_save_path))
-    save_path = (path + '.br') if compress else path
+    save_path = get_save_path(url, save_dir, append_save_path, compress)
 
     if skip_save:
         return save_path
@@ -375,17 +2081,36 @@ async def save_json_to_url(
         else:
             raw_bytes = (content or '').encode('utf-8')
         loop = asyncio.get_event_loop()
+        # 内容未变时保留已有文件：按解压后的内容比较，避免把 misc/recompress_assets.py
+        # 升级过的 ARCHIVE_QUALITY .br 或 .zst 又改写回 COMPRESS_QUALITY
+        stored = await loop.run_in_executor(
+            _io_executor, _stored_file, save_path, save_dir
+        )
+        if stored is not None and stored[3] == raw_bytes:
+            FileWrites.unchanged += 1
+            # 清单中缺失或指向旧路径的记录也在此修复
+            if asset_store is not None:
+                asset_store.record(url, stored[0], stored[1], stored[2])
+            return save_path
         compressed = await loop.run_in_executor(
-            _compress_executor, _compress_sync, raw_bytes, 11
+            _compress_executor, _compress_sync, raw_bytes, COMPRESS_QUALITY
         )
-        with open(save_path, 'wb') as f:
-            f.write(compressed)
+        atomic_write(save_path, compressed)
+        # 重新获取的 .br 取代归档时转换出的旧 .zst
+        zstd_path = save_path.removesuffix('.br') + '.zst'
+        if os.path.exists(zstd_path):
+            os.remove(zstd_path)
+            DirIndex.removed(zstd_path)
+        if asset_store is not None:
+            asset_store.record(url, save_path, compressed, 'br')
     else:
-        with open(save_path, 'w', encoding='utf8') as f:
-            if is_json:
-                f.write(json.dumps(content, ensure_ascii=False, indent=2))
-            else:
-                f.write(content or '')
+        if is_json:
+            text = json.dumps(content, ensure_ascii=False, indent=2)
+        else:
+            text = content or ''
+        atomic_write(save_path, text)
+        if asset_store is not None:
+            asset_store.record(url, save_path, text.encode('utf-8'), 'none')
 
     return save_path
 
@@ -393,6 +2118,133 @@ async def save_json_to_url(
 _MISSING_FILE = object()
 
 
+_READ_CHUNK_SIZE = 1 << 20
+
+
+@functools.lru_cache(maxsize=None)
+def _load_zstd_dict(dict_path: str) -> Any:
+    if zstandard is None:
+        raise RuntimeError('zstandard is not installed, cannot read .zst assets')
+    with open(dict_path, 'rb') as f:
+        return zstandard.ZstdCompressionDict(f.read())
+
+
+def _read_local_file_sync(
+    path: str, compression: str, is_json: bool, zstd_dict_path: str | None = None
+) -> tuple[Any, int, str]:
+    """
+    分块读取并流式解压，边读边算 sha256，不同时持有压缩数据与解压数据；
+    JSON 直接从解压后的字节解析，不再生成中间的 str。
+    返回 (解析后的内容, 文件大小, 文件的 sha256)。
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        if compression == 'br':
+            decompressor = brotli.Decompressor()
+            data: bytes | bytearray = bytearray()
+            while chunk := f.read(_READ_CHUNK_SIZE):
+                size += len(chunk)
+                digest.update(chunk)
+                data += decompressor.process(chunk)
+            if not decompressor.is_finished():
+                raise brotli.error(f'Truncated brotli stream: {path}')
+        elif compression == 'zstd':
+            # .zst 只用于小文件，整体解压即可
+            raw_bytes = f.read()
+            size = len(raw_bytes)
+            digest.update(raw_bytes)
+            assert zstd_dict_path is not None
+            decompressor = zstandard.ZstdDecompressor(
+                dict_data=_load_zstd_dict(zstd_dict_path)
+            )
+            data = decompressor.decompress(raw_bytes)
+            del raw_bytes
+        else:
+            data = f.read()
+            size = len(data)
+            digest.update(data)
+            if not is_json:
+                # 与文本模式 open() 的换行处理保持一致
+                text = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                return text, size, digest.hexdigest()
+    if is_json:
+        return json.loads(data), size, digest.hexdigest()
+    return data.decode('utf-8'), size, digest.hexdigest()
+
+
+# 读取本地副本时文件缺失、截断或损坏可能抛出的异常
+_LOCAL_READ_ERRORS: tuple[type[Exception], ...] = (
+    OSError,
+    ValueError,
+    brotli.error,
+) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+async def _read_local_file(
+    path: str,
+    compression: str,
+    is_json: bool,
+    zstd_dict_path: str | None = None,
+) -> tuple[Any, int, str]:
+    """compression 为 'br' / 'zstd' / 'none'；返回 (解析后的内容, 文件大小, 文件 sha256)。"""
+    async with _disk_semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _io_executor,
+            _read_local_file_sync,
+            path,
+            compression,
+            is_json,
+            zstd_dict_path,
+        )
+
+
+def _local_asset_path(url: str, save_dir: str, append_save_path: str | None) -> str:
+    if append_save_path is None:
+        return url_to_path(url, save_dir)
+    return os.path.normpath(os.path.join(save_dir, append_save_path))
+
+
+def _probe_local_asset(
+    url: str, save_dir: str, append_save_path: str | None
+) -> tuple[str, str] | None:
+    """按 原文件 / .br / .zst 顺序查找本地副本，返回 (路径, 压缩方式)。"""
+    path = _local_asset_path(url, save_dir, append_save_path)
+    if os.path.exists(path):
+        return path, 'none'
+    elif os.path.exists(path + '.br'):
+        return path + '.br', 'br'
+    elif zstandard is not None and os.path.exists(path + '.zst'):
+        return path + '.zst', 'zstd'
+    return None
+
+
+def _find_local_asset_sync(
+    urls: list[str],
+    save_dir: str,
+    append_save_path: str | None,
+    is_json: bool,
+    skip_read: bool,
+    zstd_dict_path: str,
+) -> tuple[str, str, str, Any, int, str] | None:
+    """
+    依次探测 urls 的本地副本并读取第一个找到的；在 I/O 线程中运行。
+    返回 (url, 路径, 压缩方式, 内容, 大小, sha256)，skip_read 时只探测。
+    """
+    for url in urls:
+        if (found := _probe_local_asset(url, save_dir, append_save_path)) is None:
+            continue
+        path, compression = found
+        if skip_read:
+            return url, path, compression, None, 0, ''
+        content, size, sha256 = _read_local_file_sync(
+            path, compression, is_json, zstd_dict_path
+        )
+        return url, path, compression, content, size, sha256
+    return None
+
+
 async def read_json_from_url(
     urls: list[str],
     missing_download: bool,
@@ -407,35 +2259,56 @@ async def read_json_from_url(
     compress: bool,
     skip_read: bool,
     format: str = 'json',
+    asset_store: AssetStore | None = None,
 ) -> Any:
     is_json = format == 'json'
-    for url in urls:
-        if append_save_path is None:
-            path = url_to_path(url, save_dir)
-        else:
-            path = os.path.normpath(os.path.join(save_dir, append_save_path))
-        if os.path.exists(path):
-            write_to_file(success_assets_file, path)
-            if skip_read:
-                return 'ERROR: skip read'
-            async with network_semaphore:
-                with open(path, encoding='utf8') as f:
-                    content = f.read()
-                    return json.loads(content) if is_json else content
-        elif os.path.exists(path + '.br'):
-            path = path + '.br'
-            write_to_file(success_assets_file, path)
-            if skip_read:
-                return 'ERROR: skip read'
-            async with network_semaphore:
-                with open(path, 'rb') as f:
-                    compressed_bytes = f.read()
-                    loop = asyncio.get_event_loop()
-                    decompressed_bytes = await loop.run_in_executor(
-                        _compress_executor, _decompress_sync, compressed_bytes
-                    )
-                    content = decompressed_bytes.decode("utf-8")
-                    return json.loads(content) if is_json else content
+    zstd_dict_path = os.path.join(save_dir, ZSTD_DICT_NAME)
+
+    hit = (
+        await asyncio.get_running_loop().run_in_executor(
+            _io_executor, asset_store.lookup, urls, save_dir, append_save_path
+        )
+        if asset_store is not None
+        else None
+    )
+    if asset_store is not None and hit is not None:
+        path, compression = hit
+        AssetLog.write(success_assets_file, path)
+        if compression == 'zstd':
+            AssetLog.write(success_assets_file, zstd_dict_path)
+        if skip_read:
+            return 'ERROR: skip read'
+        try:
+            content, _, _ = await _read_local_file(
+                path, compression, is_json, zstd_dict_path
+            )
+            return content
+        except FileNotFoundError:
+            for url in urls:
+                asset_store.forget(url, path)
+
+    async with _disk_semaphore:
+        found = await asyncio.get_running_loop().run_in_executor(
+            _io_executor,
+            _find_local_asset_sync,
+            urls,
+            save_dir,
+            append_save_path,
+            is_json,
+            skip_read,
+            zstd_dict_path,
+        )
+    if found is not None:
+        url, path, compression, content, size, sha256 = found
+
+        AssetLog.write(success_assets_file, path)
+        if compression == 'zstd':
+            AssetLog.write(success_assets_file, zstd_dict_path)
+        if skip_read:
+            return 'ERROR: skip read'
+        if asset_store is not None:
+            asset_store.record_digest(url, path, size, sha256, compression)
+        return content
 
     if missing_download:
         return await fetch_url_json(
@@ -454,16 +2327,32 @@ async def read_json_from_url(
             compress=compress,
             skip_read=skip_read,
             format=format,
+            asset_store=asset_store,
         )
     else:
-        write_to_file(
-            missing_assets_file,
-            f"{path} || url: {', '.join(urls)}"
-            + (f' || message: {extra_record_msg}' if extra_record_msg else ''),
-        )
+        path = _local_asset_path(urls[-1], save_dir, append_save_path)
+        _write_failure_log(missing_assets_file, path, urls, extra_record_msg)
         return _MISSING_FILE
 
 
+# 进行中的获取 → (任务, 合并进来的其他调用的 extra_record_msg)
+_inflight_fetches: dict[tuple, tuple[asyncio.Task, list[str]]] = {}
+# 当前获取任务（含 missing_download 嵌套的获取）合并进来的 extra_record_msg
+_joined_record_msgs: contextvars.ContextVar[tuple[list[str], ...]] = (
+    contextvars.ContextVar('joined_record_msgs', default=())
+)
+
+
+def _write_failure_log(
+    file_path: str | None, path: str, urls: list[str], extra_record_msg: str
+) -> None:
+    """错误/缺失日志：合并进同一次获取的每个调用按各自的 extra_record_msg 各记一行。"""
+    AssetLog.write(file_path, path, urls, extra_record_msg)
+    for joined in _joined_record_msgs.get():
+        for msg in joined:
+            AssetLog.write(file_path, path, urls, msg)
+
+
 async def fetch_url_json(
     url: str | list[str],
     online: bool,
@@ -485,6 +2374,194 @@ async def fetch_url_json(
     skip_read: bool = False,
     content_save_edit: Callable | None = None,
     format: str = 'json',
+    asset_store: AssetStore | None = None,
+    revalidate: bool = False,
+) -> Any:
+    '''
+    revalidate: 保存时在资源旁记录 ETag/Last-Modified，再次在线获取时发条件请求，
+    304 则直接读本地副本
+
+    同一资源（url 列表、保存路径、获取方式与日志文件都相同）正在获取时，并发调用
+    等待同一次获取的结果：只发一次请求、只写一次文件。失败时错误/缺失日志按每个
+    调用的 extra_record_msg 各记一行。
+    '''
+    urls = [url] if isinstance(url, str) else url
+    key = (
+        tuple(urls),
+        save_dir,
+        append_save_path,
+        online,
+        save,
+        missing_download,
+        compress,
+        skip_read,
+        format,
+        content_save_edit,
+        revalidate,
+        success_assets_file,
+        error_assets_file,
+        missing_assets_file,
+    )
+
+    entry = _inflight_fetches.get(key)
+    if entry is not None:
+        task, joined = entry
+        if extra_record_msg not in joined:
+            joined.append(extra_record_msg)
+    else:
+        joined = []
+        # 任务创建时复制当前上下文，之后合并进来的调用追加到 joined
+        token = _joined_record_msgs.set(_joined_record_msgs.get() + (joined,))
+        task = asyncio.ensure_future(
+            _fetch_url_json(
+                urls,
+                online,
+                save,
+                save_dir,
+                missing_download,
+                extra_record_msg,
+                success_assets_file,
+                error_assets_file,
+                missing_assets_file,
+                session,
+                network_semaphore,
+                append_save_path,
+                max_retries,
+                compress,
+                skip_read,
+                content_save_edit,
+                format,
+                asset_store,
+                revalidate,
+            )
+        )
+        _joined_record_msgs.reset(token)
+        _inflight_fetches[key] = (task, joined)
+        task.add_done_callback(lambda _: _inflight_fetches.pop(key, None))
+
+    content = await asyncio.shield(task)
+    if (
+        isinstance(content, str)
+        and content.startswith('ERROR:')
+        and content != 'ERROR: skip read'
+    ):
+        Checkpoint.fetch_failed()
+
+    if print_done:
+        logging.info('fetch ' + (urls[0] if len(urls) == 1 else str(urls)) + ' done.')
+
+    return content
+
+
+async def _get_url(
+    session: aiohttp.ClientSession,
+    url: str,
+    request_headers: dict[str, str],
+    is_json: bool,
+) -> tuple[bool, Any, Any]:
+    """返回 (是否 304, 内容, 响应头)；失败时抛出异常并记入 MirrorHealth。"""
+    host = urlsplit(url).hostname or ''
+    async with Connections.slot(url):
+        start = time.monotonic()
+        try:
+            async with session.get(url, headers=request_headers) as res:
+                if request_headers and res.status == 304:
+                    result = (True, None, res.headers)
+                else:
+                    res.raise_for_status()
+                    content = (
+                        await res.json(content_type=None)
+                        if is_json
+                        else await res.text()
+                    )
+                    result = (False, content, res.headers)
+        except Exception as e:
+            MirrorHealth.record_error(url, e)
+            Metrics.inc(
+                'http_requests_total',
+                host=host,
+                status=(
+                    e.status if isinstance(e, aiohttp.ClientResponseError) else 'error'
+                ),
+            )
+            raise
+        elapsed = time.monotonic() - start
+        MirrorHealth.record_success(url, elapsed)
+        Metrics.inc('http_requests_total', host=host, status=304 if result[0] else 200)
+        Metrics.observe('http_request_seconds', elapsed, host=host)
+    return result
+
+
+async def _get_url_hedged(
+    session: aiohttp.ClientSession,
+    url: str,
+    hedge_url: str | None,
+    request_headers_for: Callable[[str], dict[str, str]],
+    is_json: bool,
+) -> tuple[str, bool, Any, Any]:
+    """
+    请求 url；超过其延迟分位数仍未返回时再向 hedge_url 发请求，取先成功者。
+    返回 (实际成功的 url, 是否 304, 内容, 响应头)；都失败时抛出 url 的异常。
+    """
+    primary = asyncio.ensure_future(
+        _get_url(session, url, request_headers_for(url), is_json)
+    )
+    delay = MirrorHealth.hedge_delay(url) if hedge_url is not None else None
+    if delay is not None:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+    if delay is None or done:
+        return (url, *await primary)
+
+    assert hedge_url is not None
+
+    async def backup_request() -> tuple[bool, Any, Any]:
+        await RateLimit.wait(hedge_url)
+        return await _get_url(
+            session, hedge_url, request_headers_for(hedge_url), is_json
+        )
+
+    MirrorHealth._get(url).hedges += 1
+    pending = {primary: url, asyncio.ensure_future(backup_request()): hedge_url}
+    primary_error: BaseException | None = None
+    try:
+        while pending:
+            done, _ = await asyncio.wait(
+                pending.keys(), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                task_url = pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    return (task_url, *task.result())
+                if task is primary:
+                    primary_error = error
+    finally:
+        for task in pending:
+            task.cancel()
+    assert primary_error is not None
+    raise primary_error
+
+
+async def _fetch_url_json(
+    urls: list[str],
+    online: bool,
+    save: bool,
+    save_dir: str,
+    missing_download: bool,
+    extra_record_msg: str,
+    success_assets_file: str | None,
+    error_assets_file: str | None,
+    missing_assets_file: str | None,
+    session: aiohttp.ClientSession | None,
+    network_semaphore: Semaphore | None,
+    append_save_path: str | None,
+    max_retries: int,
+    compress: bool,
+    skip_read: bool,
+    content_save_edit: Callable | None,
+    format: str,
+    asset_store: AssetStore | None,
+    revalidate: bool,
 ) -> Any:
 
     is_json = format == 'json'
@@ -492,32 +2569,89 @@ async def fetch_url_json(
     if network_semaphore is None:
         network_semaphore = _net_semaphore
 
-    urls = [url] if isinstance(url, str) else url
-
     if online:
         assert session is not None
 
+        # 续跑：中断前已保存的资源直接读本地（skip_read 时只确认文件在）
+        resumed_url = (
+            Checkpoint.saved_url(urls) if save and content_save_edit is None else None
+        )
+        if resumed_url is not None and skip_read:
+            save_path = get_save_path(resumed_url, save_dir, append_save_path, compress)
+            if os.path.exists(save_path):
+                Checkpoint.resumed_assets += 1
+                AssetLog.write(success_assets_file, save_path)
+                return 'ERROR: skip read'
+        elif resumed_url is not None:
+            save_path = get_save_path(resumed_url, save_dir, append_save_path, compress)
+            try:
+                content, _, _ = await _read_local_file(
+                    save_path, 'br' if compress else 'none', is_json
+                )
+            except _LOCAL_READ_ERRORS:
+                pass
+            else:
+                Checkpoint.resumed_assets += 1
+                AssetLog.write(success_assets_file, save_path)
+                return content
+
         content = None
         last_error = None
 
-        for current_url in urls:
+        def request_headers_for(url: str) -> dict[str, str]:
+            if revalidate and save and content_save_edit is None:
+                return load_validators(
+                    get_save_path(url, save_dir, append_save_path, compress), url
+                )
+            return {}
+
+        candidates = MirrorHealth.order(urls)
+        known_missing = NegativeCache.lookup(urls)
+        if known_missing is not None:
+            # 上游已知缺失且未到复查时间：不再请求，按记录的错误返回
+            current_url = candidates[-1]
+            last_error = (
+                f'ERROR: Fetch {"json" if is_json else "text"} error, known missing || '
+                + f'{known_missing} || url: {current_url}'
+                + (f' || message: {extra_record_msg}' if extra_record_msg else '')
+            )
+            Metrics.inc(
+                'negative_cache_hits_total',
+                host=urlsplit(current_url).hostname or '',
+            )
+            candidates = []
+        for index, current_url in enumerate(candidates):
+            hedge_url = MirrorHealth.hedge_target(candidates[index + 1 :])
+            fetched_url = current_url
+            not_modified = False
+            res_headers = None
             for attempt in range(max_retries):
                 retry_after = None
                 await RateLimit.wait(current_url)
+                wait_start = time.perf_counter()
                 async with network_semaphore:
+                    Metrics.observe(
+                        'network_semaphore_wait_seconds',
+                        time.perf_counter() - wait_start,
+                    )
                     try:
-                        async with session.get(current_url) as res:
-                            retry_after = res.headers.get('Retry-After')
-                            res.raise_for_status()
-                            content = (
-                                await res.json(content_type=None)
-                                if is_json
-                                else await res.text()
+                        fetched_url, not_modified, content, res_headers = (
+                            await _get_url_hedged(
+                                session,
+                                current_url,
+                                hedge_url,
+                                request_headers_for,
+                                is_json,
                             )
-                            last_error = None
-                            break
+                        )
+                        last_error = None
+                        RateLimit.on_success(fetched_url)
+                        NegativeCache.forget(fetched_url)
+                        break
 
                     except Exception as e:
+                        if isinstance(e, aiohttp.ClientResponseError) and e.headers:
+                            retry_after = e.headers.get('Retry-After')
                         last_error = (
                             f'ERROR: Fetch {"json" if is_json else "text"} error, '
                             f'attempt {attempt + 1}/{max_retries} || '
@@ -530,6 +2664,8 @@ async def fetch_url_json(
                             )
                         )
                         is_rate_limited = RateLimit.is_rate_limited(e)
+                        if is_rate_limited:
+                            RateLimit.on_rate_limited(current_url, retry_after)
                         # 429/5xx 需重试且每次警告，不按普通 4xx 放弃
                         no_retry = (
                             (
@@ -538,32 +2674,109 @@ async def fetch_url_json(
                             )
                             or (is_json and isinstance(e, json.decoder.JSONDecodeError))
                         ) and not is_rate_limited
+                        if no_retry:
+                            NegativeCache.record(current_url, e)
+                        # 镜像已熔断且还有其他镜像时，不再耗尽重试次数
+                        skip_mirror = (
+                            not no_retry
+                            and index + 1 < len(candidates)
+                            and MirrorHealth.is_open(current_url)
+                        )
                         retryable = is_rate_limited or (
                             isinstance(e, aiohttp.ClientResponseError)
                             and 500 <= e.status < 600
                         )
-                        will_retry = not no_retry and attempt + 1 < max_retries
+                        will_retry = (
+                            not no_retry
+                            and not skip_mirror
+                            and attempt + 1 < max_retries
+                        )
                         if no_retry or retryable or attempt + 1 == max_retries:
                             logging.warning(
                                 last_error + ' || retry' if will_retry else last_error
                             )
-                        if no_retry:
+                        if will_retry:
+                            Metrics.inc(
+                                'fetch_retries_total',
+                                host=urlsplit(current_url).hostname or '',
+                                reason=(
+                                    str(e.status)
+                                    if isinstance(e, aiohttp.ClientResponseError)
+                                    else type(e).__name__
+                                ),
+                            )
+                        if no_retry or skip_mirror:
                             break
-                        if attempt + 1 < max_retries:
+                        # 429 的等待由 RateLimit 的令牌桶暂停该 host 实现
+                        if attempt + 1 < max_retries and not is_rate_limited:
                             await asyncio.sleep(RateLimit.retry_delay(retry_after))
 
+            if last_error is None and not_modified:
+                save_path = get_save_path(
+                    fetched_url, save_dir, append_save_path, compress
+                )
+                found = _probe_local_asset(fetched_url, save_dir, append_save_path)
+                try:
+                    if found is None:
+                        raise FileNotFoundError(save_path)
+                    content, _, _ = await _read_local_file(
+                        found[0],
+                        found[1],
+                        is_json,
+                        os.path.join(save_dir, ZSTD_DICT_NAME),
+                    )
+                except _LOCAL_READ_ERRORS as e:
+                    # 本地副本已删除、损坏或被转换：丢弃校验头记录，重新完整获取
+                    logging.warning(
+                        f'Local copy unreadable after 304, refetch || {type(e)}: {e} '
+                        f'|| url: {fetched_url}'
+                    )
+                    delete_path(save_path + VALIDATORS_SUFFIX)
+                    return await _fetch_url_json(
+                        urls,
+                        online,
+                        save,
+                        save_dir,
+                        missing_download,
+                        extra_record_msg,
+                        success_assets_file,
+                        error_assets_file,
+                        missing_assets_file,
+                        session,
+                        network_semaphore,
+                        append_save_path,
+                        max_retries,
+                        compress,
+                        skip_read,
+                        content_save_edit,
+                        format,
+                        asset_store,
+                        revalidate,
+                    )
+                AssetLog.write(success_assets_file, found[0])
+                AssetLog.write(success_assets_file, save_path + VALIDATORS_SUFFIX)
+                Checkpoint.asset_saved(fetched_url)
+                break
             if last_error is None:
                 if save:
                     save_path = await save_json_to_url(
-                        current_url,
+                        fetched_url,
                         content,
                         save_dir,
                         append_save_path,
                         compress,
                         content_save_edit,
                         format=format,
+                        asset_store=asset_store,
                     )
-                    write_to_file(success_assets_file, save_path)
+                    AssetLog.write(success_assets_file, save_path)
+                    Checkpoint.asset_saved(fetched_url)
+                    if revalidate and content_save_edit is None:
+                        validators_path = save_validators(
+                            save_path, fetched_url, res_headers
+                        )
+                        if validators_path is not None:
+                            AssetLog.write(success_assets_file, validators_path)
                 break
 
         if last_error is not None:
@@ -577,11 +2790,7 @@ async def fetch_url_json(
                 skip_save=True,
                 format=format,
             )
-            write_to_file(
-                error_assets_file,
-                f"{save_path} || url: {', '.join(urls)}"
-                + (f' || message: {extra_record_msg}' if extra_record_msg else ''),
-            )
+            _write_failure_log(error_assets_file, save_path, urls, extra_record_msg)
 
     else:  # offline
         result = await read_json_from_url(
@@ -598,12 +2807,10 @@ async def fetch_url_json(
             compress,
             skip_read,
             format=format,
+            asset_store=asset_store,
         )
         content = MISSING_MSG if result is _MISSING_FILE else result
 
-    if print_done:
-        logging.info('fetch ' + (urls[0] if len(urls) == 1 else str(urls)) + ' done.')
-
     return content
 
 
@@ -635,6 +2842,87 @@ def remove_leading_zeros(s: str) -> str:
     return re.sub(r'\d+', process_digit, s)
 
 
+class DirIndex:
+    """
+    remove_olds_or_rename_old 用的目录索引：每个 (父目录, 正则) 只 iterdir 一次，
+    按 remove_leading_zeros(捕获组) 归类文件名，之后的查找为 O(1)。
+
+    改名、删除与新建（new_path）时原地更新同一父目录下所有正则的索引；删除或
+    改名目录时丢弃其下的索引。atomic_write 写出的新文件与保存时删除的 .zst
+    经 created / removed 同步到索引。remove_olds_or_rename_old 内没有 await，协程间
+    天然互斥，锁用于线程池中的调用。
+    """
+
+    _dirs: dict[str, dict[str, dict[str, set[str]]]] = {}
+    _lock = threading.Lock()
+
+    builds = 0
+    hits = 0
+
+    @classmethod
+    def _index(cls, parent: str, name_index_reg: str) -> dict[str, set[str]]:
+        regs = cls._dirs.setdefault(parent, {})
+        index = regs.get(name_index_reg)
+        if index is not None:
+            cls.hits += 1
+            return index
+        cls.builds += 1
+        index = {}
+        with os.scandir(parent) as it:
+            for entry in it:
+                if match := re.match(name_index_reg, entry.name):
+                    key = remove_leading_zeros(match.group(1))
+                    index.setdefault(key, set()).add(entry.name)
+        regs[name_index_reg] = index
+        return index
+
+    @classmethod
+    def _add(cls, parent: str, name: str) -> None:
+        for reg, index in cls._dirs.get(parent, {}).items():
+            if match := re.match(reg, name):
+                index.setdefault(remove_leading_zeros(match.group(1)), set()).add(name)
+
+    @classmethod
+    def _discard(cls, parent: str, name: str) -> None:
+        for reg, index in cls._dirs.get(parent, {}).items():
+            if match := re.match(reg, name):
+                key = remove_leading_zeros(match.group(1))
+                names = index.get(key)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del index[key]
+        # 目录被删除或改名：其下的索引失效
+        path = os.path.join(parent, name)
+        prefix = path + os.sep
+        for stale in [d for d in cls._dirs if d == path or d.startswith(prefix)]:
+            del cls._dirs[stale]
+
+    @classmethod
+    def created(cls, path: str) -> None:
+        """在 remove_olds_or_rename_old 之外新建的文件（atomic_write 等）登记到已有索引。"""
+        parent, name = os.path.split(os.path.normpath(path))
+        with cls._lock:
+            cls._add(parent or '.', name)
+
+    @classmethod
+    def removed(cls, path: str) -> None:
+        """在 remove_olds_or_rename_old 之外删除的文件从已有索引中移除。"""
+        parent, name = os.path.split(os.path.normpath(path))
+        with cls._lock:
+            cls._discard(parent or '.', name)
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        return {'dirs': len(cls._dirs), 'builds': cls.builds, 'hits': cls.hits}
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._dirs.clear()
+            cls.builds = cls.hits = 0
+
+
 def remove_olds_or_rename_old(new_path_: str | Path, name_index_reg: str) -> None:
     '''
     make sure new_path's parent exist
@@ -645,25 +2933,28 @@ def remove_olds_or_rename_old(new_path_: str | Path, name_index_reg: str) -> Non
     assert index_match is not None
     new_index = index_match.group(1)
 
-    old_paths = [
-        p
-        for p in Path(new_path.parent).iterdir()
-        if (
-            (match := re.match(name_index_reg, p.name))
-            and (
-                remove_leading_zeros(match.group(1)) == remove_leading_zeros(new_index)
-            )
-        )
-    ]
-
-    if len(old_paths) == 0:
-        return
-    elif len(old_paths) == 1:
-        if old_paths[0] != new_path:
-            old_paths[0].rename(new_path)
-            logging.warning(f'Rename: {old_paths[0]} -> {new_path}')
-    else:
-        for p in old_paths:
-            if p != new_path:
-                delete_path(str(p))
-                logging.warning(f'Delete: {p}')
+    parent = os.path.normpath(new_path.parent)
+    with Metrics.timer('remove_olds_seconds'), DirIndex._lock:
+        index = DirIndex._index(parent, name_index_reg)
+        names = index.get(remove_leading_zeros(new_index), set())
+        old_paths = []
+        for name in sorted(names):
+            p = new_path.parent / name
+            if os.path.lexists(p):
+                old_paths.append(p)
+            else:  # 登记后未创建或被外部删除
+                DirIndex._discard(parent, name)
+
+        if len(old_paths) == 1:
+            if old_paths[0] != new_path:
+                old_paths[0].rename(new_path)
+                DirIndex._discard(parent, old_paths[0].name)
+                logging.warning(f'Rename: {old_paths[0]} -> {new_path}')
+        elif len(old_paths) > 1:
+            for p in old_paths:
+                if p != new_path:
+                    delete_path(str(p))
+                    DirIndex._discard(parent, p.name)
+                    logging.warning(f'Delete: {p}')
+        # 调用方随后创建 new_path
+        DirIndex._add(parent, new_path.name)
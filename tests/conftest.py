@@ -0,0 +1,103 @@
+import asyncio, threading
+from typing import Any, Callable
+
+import pytest
+from aiohttp import web
+
+import src.util as util
+
+
+@pytest.fixture(autouse=True)
+def isolated_util(tmp_path, monkeypatch):
+    """各测试使用独立的工作目录（资源日志写在其中）与空白的进程级状态。"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(util.RateLimit, '_buckets', {})
+    monkeypatch.setattr(util.AssetLog, '_seen', {})
+    monkeypatch.setattr(util.MirrorHealth, '_stats', {})
+    monkeypatch.setattr(util.Connections, '_hosts', {})
+    monkeypatch.setattr(util.NegativeCache, '_path', None)
+    monkeypatch.setattr(util.NegativeCache, '_entries', {})
+    monkeypatch.setattr(util.BuildState, '_path', None)
+    monkeypatch.setattr(util.BuildState, '_outputs', {})
+    monkeypatch.setattr(util.BuildState, '_assets', {})
+    monkeypatch.setattr(util.Checkpoint, '_path', None)
+    monkeypatch.setattr(util.Checkpoint, '_jobs', set())
+    monkeypatch.setattr(util.Checkpoint, '_assets', set())
+    yield
+    util.AssetLog.flush()  # 日志路径是相对的，须在恢复工作目录前写出
+    util.Checkpoint.close()
+
+
+class Mirror:
+    """在后台线程运行的本地 HTTP 服务器，按路径返回 routes 中的响应。"""
+
+    def __init__(self) -> None:
+        self.routes: dict[str, Callable[[web.Request], web.Response]] = {}
+        self.hits: list[str] = []
+        self.conditional: list[bool] = []  # 各请求是否带 If-None-Match
+        self.port = 0
+        self._loop = asyncio.new_event_loop()
+        self._runner: Any = None
+
+    def url(self, path: str) -> str:
+        return f'http://127.0.0.1:{self.port}/{path}'
+
+    def json(self, path: str, data: Any) -> None:
+        self.routes[path] = lambda request: web.json_response(data)
+
+    def status(self, path: str, status: int) -> None:
+        self.routes[path] = lambda request: web.Response(status=status)
+
+    def etag(self, path: str, data: Any, etag: str) -> None:
+        """带 ETag 的 JSON；If-None-Match 相同时返回 304。"""
+
+        def handle(request: web.Request) -> web.Response:
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304, headers={'ETag': etag})
+            return web.json_response(data, headers={'ETag': etag})
+
+        self.routes[path] = handle
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        path = request.path.lstrip('/')
+        self.hits.append(path)
+        self.conditional.append('If-None-Match' in request.headers)
+        route = self.routes.get(path)
+        return route(request) if route is not None else web.Response(status=404)
+
+    async def _start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    def start(self) -> None:
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(10)
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+@pytest.fixture
+def mirror():
+    server = Mirror()
+    server.start()
+    yield server
+    server.stop()
+
+
+def fetch(urls: str | list[str], save_dir: str, **kwargs: Any) -> Any:
+    """在新的事件循环中联网获取一次（保存到 save_dir）。"""
+
+    async def run() -> Any:
+        async with util.Connections.create_session(4) as session:
+            return await util.fetch_url_json(
+                urls, True, True, save_dir, False, session=session, **kwargs
+            )
+
+    return asyncio.run(run())
@@ -0,0 +1,107 @@
+import importlib.util, json, os, subprocess, sys, time
+from pathlib import Path
+
+import pytest
+
+import src.util as util
+
+ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture(autouse=True)
+def fresh_log(monkeypatch):
+    util.AssetLog.flush()
+    monkeypatch.setattr(util.AssetLog, '_pending', {})
+    monkeypatch.setattr(util.AssetLog, '_count', 0)
+    monkeypatch.setattr(util.AssetLog, '_last_flush', time.monotonic())
+
+
+def drain() -> None:
+    """等待后台线程写完已提交的批次（不主动 flush）。"""
+    util.AssetLog._executor.submit(lambda: None).result()
+
+
+def read_lines(path: str) -> list[str]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def test_log_format_is_parsed_by_clean_assets(tmp_path):
+    util.AssetLog.write(
+        'assets_error.log', 'a/story.asset.br', ['https://x/a', 'https://y/a'], 'ev 1'
+    )
+    util.AssetLog.write('assets_success.log', 'a/other.asset')
+    util.AssetLog.flush()
+
+    assert read_lines('assets_error.log') == [
+        'a/story.asset.br || url: https://x/a, https://y/a || message: ev 1'
+    ]
+    assert read_lines('assets_success.log') == ['a/other.asset']
+    assert [json.loads(line) for line in read_lines('assets_error.jsonl')] == [
+        {
+            'path': 'a/story.asset.br',
+            'urls': ['https://x/a', 'https://y/a'],
+            'message': 'ev 1',
+        }
+    ]
+
+    spec = importlib.util.spec_from_file_location(
+        'clean_assets', ROOT / 'misc' / 'clean_assets.py'
+    )
+    assert spec is not None and spec.loader is not None
+    clean_assets = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(clean_assets)
+    assert clean_assets._collect_valid_paths(tmp_path) == {
+        (tmp_path / 'a' / 'story.asset.br').resolve(),
+        (tmp_path / 'a' / 'other.asset').resolve(),
+    }
+
+
+def test_duplicate_lines_are_written_once():
+    for message in ('ev 1', 'ev 1', 'ev 2'):
+        util.AssetLog.write('assets_error.log', 'a.br', ['https://x/a'], message)
+    util.AssetLog.write('assets_error.log', 'a.br', ['https://x/a'], 'ev 1')
+    util.AssetLog.flush()
+
+    assert len(read_lines('assets_error.log')) == 2
+    assert len(read_lines('assets_error.jsonl')) == 2
+
+
+def test_flush_when_batch_is_full(monkeypatch):
+    monkeypatch.setattr(util.AssetLog, 'FLUSH_LINES', 3)
+    util.AssetLog.write('assets_success.log', 'a')
+    util.AssetLog.write('assets_success.log', 'b')
+    drain()
+    assert read_lines('assets_success.log') == []
+
+    util.AssetLog.write('assets_success.log', 'c')
+    drain()
+    assert read_lines('assets_success.log') == ['a', 'b', 'c']
+
+
+def test_flush_after_interval(monkeypatch):
+    util.AssetLog.write('assets_success.log', 'a')
+    drain()
+    assert read_lines('assets_success.log') == []
+
+    monkeypatch.setattr(
+        util.AssetLog,
+        '_last_flush',
+        time.monotonic() - util.AssetLog.FLUSH_INTERVAL - 1,
+    )
+    util.AssetLog.write('assets_success.log', 'b')
+    drain()
+    assert read_lines('assets_success.log') == ['a', 'b']
+
+
+def test_pending_lines_are_written_at_exit(tmp_path):
+    code = (
+        'import sys; sys.path.insert(0, sys.argv[1]); import src.util as util; '
+        "util.AssetLog.write('assets_missing.log', 'a.asset', ['https://x/a'])"
+    )
+    subprocess.run([sys.executable, '-c', code, str(ROOT)], cwd=tmp_path, check=True)
+    assert read_lines(str(tmp_path / 'assets_missing.log')) == [
+        'a.asset || url: https://x/a'
+    ]
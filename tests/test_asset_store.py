@@ -0,0 +1,80 @@
+import asyncio, hashlib, os, sqlite3
+
+import src.util as util
+
+URL = 'https://example.com/scenario/story.asset'
+
+
+def test_lookup_requires_matching_save_path(tmp_path):
+    save_dir = str(tmp_path / 'assets')
+    store = util.AssetStore(str(tmp_path / 'manifest.sqlite3'))
+    path = util.get_save_path(URL, save_dir, 'event/1.asset', True)
+    store.record(URL, path, b'data', 'br')
+
+    assert store.lookup([URL], save_dir, 'event/1.asset') == (path, 'br')
+    assert store.lookup([URL], save_dir, None) is None
+    assert store.lookup([URL], save_dir, 'event/2.asset') is None
+
+    # 换成不压缩保存后，旧的 .br 记录作废
+    plain_path = util.get_save_path(URL, save_dir, 'event/1.asset', False)
+    store.record(URL, plain_path, b'data', 'none')
+    assert store.lookup([URL], save_dir, 'event/1.asset') == (plain_path, 'none')
+    store.close()
+
+
+def test_manifest_survives_reopen_and_old_schema_is_dropped(tmp_path):
+    manifest = str(tmp_path / 'manifest.sqlite3')
+    save_dir = str(tmp_path / 'assets')
+    conn = sqlite3.connect(manifest)
+    conn.execute('CREATE TABLE assets (url TEXT PRIMARY KEY, path TEXT)')
+    conn.execute("INSERT INTO assets VALUES (?, 'stale.br')", (URL,))
+    conn.commit()
+    conn.close()
+    path = util.get_save_path(URL, save_dir, None, True)
+    store = util.AssetStore(manifest)
+    store.record(URL, path, b'data', 'br')
+    store.close()
+
+    store = util.AssetStore(manifest)
+    assert store.lookup([URL], save_dir, None) == (path, 'br')
+    store.close()
+
+
+def test_offline_read_goes_through_manifest(tmp_path):
+    save_dir = str(tmp_path / 'assets')
+    store = util.AssetStore(str(tmp_path / 'manifest.sqlite3'))
+
+    async def run():
+        await util.save_json_to_url(
+            URL, {'a': 1}, save_dir, None, True, asset_store=store
+        )
+        return await util.fetch_url_json(
+            URL, False, False, save_dir, False, asset_store=store
+        )
+
+    assert asyncio.run(run()) == {'a': 1}
+    assert store.lookup([URL], save_dir, None) is not None
+    store.close()
+    assert not os.path.exists(os.path.join(save_dir, 'manifest.sqlite3-wal'))
+
+
+def test_unchanged_payload_repairs_missing_row(tmp_path):
+    save_dir = str(tmp_path / 'assets')
+    manifest = str(tmp_path / 'manifest.sqlite3')
+    path = asyncio.run(util.save_json_to_url(URL, {'a': 1}, save_dir, None, True))
+
+    # 文件已在但清单中没有记录：内容未变也要补上
+    store = util.AssetStore(manifest)
+    assert store.lookup([URL], save_dir, None) is None
+    asyncio.run(
+        util.save_json_to_url(URL, {'a': 1}, save_dir, None, True, asset_store=store)
+    )
+    assert store.lookup([URL], save_dir, None) == (path, 'br')
+    store.close()
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    conn = sqlite3.connect(manifest)
+    row = conn.execute('SELECT size, sha256 FROM assets WHERE url = ?', (URL,))
+    assert row.fetchone() == (len(data), hashlib.sha256(data).hexdigest())
+    conn.close()
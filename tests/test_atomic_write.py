@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+import src.util as util
+
+
+def test_identical_content_is_not_rewritten(tmp_path):
+    path = tmp_path / 'story.txt'
+    assert util.atomic_write(path, '第一行\n第二行\n')
+    mtime = os.stat(path).st_mtime_ns
+    os.utime(path, ns=(mtime - 10**9, mtime - 10**9))
+
+    written = util.FileWrites.written
+    assert not util.atomic_write(path, '第一行\n第二行\n')
+    assert os.stat(path).st_mtime_ns == mtime - 10**9
+    assert util.FileWrites.written == written
+
+    assert util.atomic_write(path, '第一行\n')
+    with open(path, encoding='utf8') as f:
+        assert f.read() == '第一行\n'
+    assert os.listdir(tmp_path) == ['story.txt']
+
+
+def test_failed_write_keeps_old_file(tmp_path, monkeypatch):
+    path = tmp_path / 'story.txt'
+    util.atomic_write(path, 'old')
+
+    def fail(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(os, 'replace', fail)
+    with pytest.raises(OSError):
+        util.atomic_write(path, 'new')
+    with open(path, encoding='utf8') as f:
+        assert f.read() == 'old'
+    assert os.listdir(tmp_path) == ['story.txt']
+
+
+def test_rewrite_keeps_file_mode(tmp_path):
+    path = tmp_path / 'story.txt'
+    util.atomic_write(path, 'old')
+    os.chmod(path, 0o640)
+
+    assert util.atomic_write(path, 'new')
+    assert os.stat(path).st_mode & 0o777 == 0o640
+
+
+def test_open_for_write_discards_on_error(tmp_path):
+    path = tmp_path / 'story.txt'
+    with util.open_for_write(path) as f:
+        f.write('old\n')
+
+    with pytest.raises(RuntimeError):
+        with util.open_for_write(path) as f:
+            f.write('half')
+            raise RuntimeError
+    with open(path, encoding='utf8') as f:
+        assert f.read() == 'old\n'
+
+
+def test_sync_flushes_pending_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(util, 'FSYNC_WRITES', True)
+    monkeypatch.setattr(util.FileWrites, '_pending', set())
+    util.atomic_write(tmp_path / 'a.txt', 'a')
+    util.atomic_write(tmp_path / 'b.txt', 'b')
+    os.remove(tmp_path / 'b.txt')  # 已被删除的文件跳过
+
+    synced = util.FileWrites.synced
+    util.FileWrites.sync()
+    assert util.FileWrites.synced == synced + 1
+    assert util.FileWrites._pending == set()
@@ -0,0 +1,75 @@
+import asyncio, os
+
+import src.util as util
+
+URL = 'https://example.com/scenario/story.asset'
+
+
+class FakeGetter(util.Base_getter):
+    def __init__(self, assets_save_dir: str) -> None:
+        super().__init__('', assets_save_dir, False, False, True, False, False, False)
+        self.asset_store = None
+
+
+def build_key(getter: FakeGetter, option: str) -> str | None:
+    return asyncio.run(getter.build_key([URL], {'option': option}))
+
+
+def write_asset(assets_dir: str, content: str) -> None:
+    path = util.url_to_path(URL, assets_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf8') as f:
+        f.write(content)
+
+
+def test_unchanged_input_skips_rebuild(tmp_path):
+    util.BuildState.load(str(tmp_path / 'state.json'))
+    getter = FakeGetter(str(tmp_path / 'assets'))
+    output = tmp_path / 'story.txt'
+    assert build_key(getter, 'a') is None  # 资源不在本地
+
+    write_asset(getter.assets_save_dir, '{"TalkData": []}')
+    key = build_key(getter, 'a')
+    assert not util.BuildState.unchanged(output, key)
+    output.write_text('story')
+    util.BuildState.record(output, key)
+
+    assert util.BuildState.unchanged(output, build_key(getter, 'a'))
+    os.remove(output)
+    assert not util.BuildState.unchanged(output, build_key(getter, 'a'))
+
+
+def test_changed_asset_or_option_forces_rebuild(tmp_path):
+    util.BuildState.load(str(tmp_path / 'state.json'))
+    getter = FakeGetter(str(tmp_path / 'assets'))
+    output = tmp_path / 'story.txt'
+    output.write_text('story')
+    write_asset(getter.assets_save_dir, '{"TalkData": []}')
+    util.BuildState.record(output, build_key(getter, 'a'))
+
+    assert not util.BuildState.unchanged(output, build_key(getter, 'b'))
+    write_asset(getter.assets_save_dir, '{"TalkData": [1]}')
+    assert not util.BuildState.unchanged(output, build_key(getter, 'a'))
+
+
+def test_state_survives_save_and_load(tmp_path):
+    state = str(tmp_path / 'state.json')
+    util.BuildState.load(state)
+    getter = FakeGetter(str(tmp_path / 'assets'))
+    output = tmp_path / 'story.txt'
+    output.write_text('story')
+    write_asset(getter.assets_save_dir, '{"TalkData": []}')
+    util.BuildState.record(output, build_key(getter, 'a'))
+    util.BuildState.save()
+
+    util.BuildState.load(state)
+    assert util.BuildState._assets  # 资源 sha256 按大小与 mtime 缓存
+    assert util.BuildState.unchanged(output, build_key(getter, 'a'))
+
+
+def test_online_run_is_not_incremental(tmp_path):
+    util.BuildState.load(str(tmp_path / 'state.json'))
+    getter = FakeGetter(str(tmp_path / 'assets'))
+    getter.online = True
+    write_asset(getter.assets_save_dir, '{}')
+    assert build_key(getter, 'a') is None
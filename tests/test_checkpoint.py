@@ -0,0 +1,137 @@
+import asyncio, json, os
+
+import src.util as util
+
+from .conftest import fetch
+
+
+def test_resume_skips_completed_jobs(tmp_path):
+    journal = str(tmp_path / 'checkpoint.jsonl')
+    util.Checkpoint.start(journal, resume=False)
+    util.Checkpoint.job_done('jp event 1')
+    util.Checkpoint.asset_saved('https://example.com/a.asset')
+    util.Checkpoint.close()
+    with open(journal, 'a', encoding='utf8') as f:
+        f.write('{"job": "jp ev')  # 被中断时写了一半的行
+
+    util.Checkpoint.start(journal, resume=True)
+    ran = []
+
+    async def job(name: str) -> None:
+        ran.append(name)
+
+    queue = util.JobQueue(2, progress_interval=None)
+    for name in ('jp event 1', 'jp event 2'):
+        queue.add(lambda name=name: job(name), name=name)
+    asyncio.run(queue.run())
+
+    assert ran == ['jp event 2']
+    assert util.Checkpoint.saved_url(['https://example.com/a.asset']) is not None
+    util.Checkpoint.finish()
+    assert not os.path.exists(journal)
+
+
+def test_fresh_start_truncates_journal(tmp_path):
+    journal = str(tmp_path / 'checkpoint.jsonl')
+    util.Checkpoint.start(journal, resume=False)
+    util.Checkpoint.job_done('jp event 1')
+    util.Checkpoint.close()
+
+    util.Checkpoint.start(journal, resume=False)
+    assert not util.Checkpoint.is_job_done('jp event 1')
+
+
+def test_resumed_asset_is_read_locally(tmp_path, mirror):
+    mirror.json('story.asset', {'Snippets': [1]})
+    save_dir = str(tmp_path / 'assets')
+    journal = str(tmp_path / 'checkpoint.jsonl')
+
+    util.Checkpoint.start(journal, resume=False)
+    assert fetch(mirror.url('story.asset'), save_dir, compress=True) == {
+        'Snippets': [1]
+    }
+    util.Checkpoint.close()
+    assert mirror.hits == ['story.asset']
+
+    util.Checkpoint.start(journal, resume=True)
+    assert fetch(mirror.url('story.asset'), save_dir, compress=True) == {
+        'Snippets': [1]
+    }
+    # parse=False 的 assets_* 运行以 skip_read 获取，同样不应重新下载
+    assert (
+        fetch(mirror.url('story.asset'), save_dir, compress=True, skip_read=True)
+        == 'ERROR: skip read'
+    )
+    assert mirror.hits == ['story.asset']
+
+
+def test_resume_refetches_missing_file(tmp_path, mirror):
+    mirror.json('story.asset', {'a': 1})
+    save_dir = str(tmp_path / 'assets')
+    journal = str(tmp_path / 'checkpoint.jsonl')
+    with open(journal, 'w', encoding='utf8') as f:
+        f.write(json.dumps({'asset': mirror.url('story.asset')}) + '\n')
+
+    util.Checkpoint.start(journal, resume=True)
+    assert fetch(mirror.url('story.asset'), save_dir, skip_read=True) == {'a': 1}
+    assert mirror.hits == ['story.asset']
+
+
+def test_job_with_failed_fetch_runs_again(tmp_path, mirror):
+    mirror.status('story.asset', 503)
+    mirror.json('other.asset', {'b': 2})
+    save_dir = str(tmp_path / 'assets')
+    journal = str(tmp_path / 'checkpoint.jsonl')
+
+    def run_jobs() -> list[str]:
+        ran = []
+
+        async def job(name: str, path: str) -> None:
+            ran.append(name)
+            async with util.Connections.create_session(4) as session:
+                # getter 以返回值而非异常报告获取失败
+                await asyncio.gather(
+                    util.fetch_url_json(
+                        mirror.url(path),
+                        True,
+                        True,
+                        save_dir,
+                        False,
+                        session=session,
+                        max_retries=1,
+                    )
+                )
+
+        queue = util.JobQueue(2, progress_interval=None)
+        queue.add(lambda: job('jp event 1', 'story.asset'), name='jp event 1')
+        queue.add(lambda: job('jp event 2', 'other.asset'), name='jp event 2')
+        asyncio.run(queue.run())
+        return ran
+
+    util.Checkpoint.start(journal, resume=False)
+    assert sorted(run_jobs()) == ['jp event 1', 'jp event 2']
+    util.Checkpoint.close()
+
+    mirror.json('story.asset', {'a': 1})
+    util.Checkpoint.start(journal, resume=True)
+    assert run_jobs() == ['jp event 1']
+    util.Checkpoint.close()
+
+    util.Checkpoint.start(journal, resume=True)
+    assert run_jobs() == []
+
+
+def test_resume_refetches_corrupt_file(tmp_path, mirror):
+    mirror.json('story.asset', {'a': 1})
+    save_dir = str(tmp_path / 'assets')
+    journal = str(tmp_path / 'checkpoint.jsonl')
+    util.Checkpoint.start(journal, resume=False)
+    fetch(mirror.url('story.asset'), save_dir, compress=True)
+    util.Checkpoint.close()
+    save_path = util.get_save_path(mirror.url('story.asset'), save_dir, None, True)
+    with open(save_path, 'wb') as f:
+        f.write(b'not brotli')
+
+    util.Checkpoint.start(journal, resume=True)
+    assert fetch(mirror.url('story.asset'), save_dir, compress=True) == {'a': 1}
+    assert mirror.hits == ['story.asset', 'story.asset']
@@ -0,0 +1,28 @@
+import pytest
+
+from src.util import DictLookup
+
+
+@pytest.mark.parametrize('ids', [[1, 2, 2, 3, 2], [1, 2, 2, 50000, 2]])
+def test_find_all_returns_every_row_in_order(ids):
+    lookup = DictLookup([{'id': i} for i in ids], 'id')
+    assert lookup.is_dense == (max(ids) < 100)
+    assert lookup.find_all(2) == [1, 2, 4]
+    assert lookup.find_all(1) == [0]
+    assert lookup.find_all(7) == []
+    assert lookup.find_all(-5) == []
+    assert lookup.find_index(2) == 1
+
+
+def test_find_max_le_index_on_unsorted_data():
+    lookup = DictLookup([{'id': i} for i in (30, 10, 20)], 'id')
+    assert not lookup.is_sorted
+    assert lookup.find_max_le_index(25) == 2
+    assert lookup.find_max_le_index(100) == 0
+    assert lookup.find_max_le_index(5) == -1
+
+
+def test_empty():
+    lookup = DictLookup([], 'id')
+    assert lookup.find_all(1) == []
+    assert lookup.find_max_le_index(1) == -1
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+import src.util as util
+
+
+@pytest.fixture(autouse=True)
+def clear_index():
+    util.DirIndex.clear()
+    yield
+    util.DirIndex.clear()
+
+
+def test_atomic_write_registers_new_file(tmp_path):
+    reg = r'(\d+-\d+) '
+    util.remove_olds_or_rename_old(tmp_path / '1-1 first.txt', reg)
+    util.atomic_write(tmp_path / '1-1 first.txt', 'a')
+    # 索引已建立后，另一个写入者新建了文件
+    util.atomic_write(tmp_path / '01-02 second.txt', 'b')
+
+    util.remove_olds_or_rename_old(tmp_path / '1-2 renamed.txt', reg)
+    assert sorted(os.listdir(tmp_path)) == ['1-1 first.txt', '1-2 renamed.txt']
+
+
+def test_removed_file_is_not_resurrected(tmp_path):
+    reg = r'(\d+) '
+    util.atomic_write(tmp_path / '3 old.txt', 'a')
+    util.remove_olds_or_rename_old(tmp_path / '3 old.txt', reg)
+    os.remove(tmp_path / '3 old.txt')
+    util.DirIndex.removed(str(tmp_path / '3 old.txt'))
+    util.atomic_write(tmp_path / '3 other.txt', 'b')
+
+    util.remove_olds_or_rename_old(tmp_path / '3 new.txt', reg)
+    assert os.listdir(tmp_path) == ['3 new.txt']
@@ -0,0 +1,44 @@
+import asyncio, os
+
+import brotli
+
+import src.util as util
+
+URL = 'https://example.com/scenario/story.asset'
+
+
+def save(save_dir: str, content: object) -> str:
+    return asyncio.run(util.save_json_to_url(URL, content, save_dir, None, True))
+
+
+def test_archive_quality_br_is_kept_when_payload_unchanged(tmp_path):
+    save_dir = str(tmp_path)
+    path = save(save_dir, {'TalkData': ['台词'] * 50})
+    with open(path, 'rb') as f:
+        payload = brotli.decompress(f.read())
+    archived = brotli.compress(payload, quality=util.ARCHIVE_QUALITY, lgwin=24)
+    with open(path, 'wb') as f:
+        f.write(archived)
+    mtime = os.stat(path).st_mtime_ns
+
+    assert save(save_dir, {'TalkData': ['台词'] * 50}) == path
+    with open(path, 'rb') as f:
+        assert f.read() == archived
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_changed_payload_is_rewritten(tmp_path):
+    save_dir = str(tmp_path)
+    path = save(save_dir, {'TalkData': ['a']})
+    save(save_dir, {'TalkData': ['b']})
+    with open(path, 'rb') as f:
+        assert brotli.decompress(f.read()) == b'{"TalkData": ["b"]}'
+
+
+def test_read_local_file_parses_compressed_json(tmp_path):
+    path = save(str(tmp_path), {'名': ['台词'] * 3})
+    content, size, _ = util._read_local_file_sync(path, 'br', True)
+    assert content == {'名': ['台词'] * 3}
+    assert size == os.path.getsize(path)
+    text, _, _ = util._read_local_file_sync(path, 'br', False)
+    assert text == '{"名": ["台词", "台词", "台词"]}'
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+import src.util as util
+
+
+def test_newest_first_then_insertion_order():
+    ran = []
+
+    async def job(name: str) -> None:
+        ran.append(name)
+
+    queue = util.JobQueue(1, progress_interval=None)
+    event_ids = [1, 2, 3]  # newest_ids 按时间升序
+    for rank, event_id in enumerate(reversed(event_ids)):
+        queue.add(lambda i=event_id: job(f'event {i}'), rank)
+        queue.add(lambda i=event_id: job(f'talk {i}'), rank)
+    asyncio.run(queue.run())
+
+    assert ran == ['event 3', 'talk 3', 'event 2', 'talk 2', 'event 1', 'talk 1']
+
+
+def test_concurrency_is_bounded():
+    running = 0
+    peak = 0
+    created = 0
+
+    async def job() -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    def factory():
+        nonlocal created
+        created += 1
+        return job()
+
+    queue = util.JobQueue(3, progress_interval=None)
+    for _ in range(10):
+        queue.add(factory)
+    assert created == 0  # 协程在出队时才创建
+    asyncio.run(queue.run())
+
+    assert peak == 3
+    assert created == 10
+
+
+def test_failing_job_stops_scheduling():
+    ran = []
+
+    async def job(name: str) -> None:
+        ran.append(name)
+        if name == 'boom':
+            raise RuntimeError(name)
+
+    queue = util.JobQueue(1, progress_interval=None)
+    for name in ('ok', 'boom', 'after'):
+        queue.add(lambda name=name: job(name))
+    with pytest.raises(RuntimeError, match='boom'):
+        asyncio.run(queue.run())
+
+    assert ran == ['ok', 'boom']
+    assert queue.stats() == {
+        'queued': 1,
+        'running': 0,
+        'done': 1,
+        'failed': 1,
+        'total': 3,
+    }
+
+
+def test_stats_counts():
+    seen = []
+    queue = util.JobQueue(2, progress_interval=None)
+
+    async def job() -> None:
+        seen.append(queue.stats())
+
+    for _ in range(4):
+        queue.add(job)
+    assert queue.stats() == {
+        'queued': 4,
+        'running': 0,
+        'done': 0,
+        'failed': 0,
+        'total': 4,
+    }
+    asyncio.run(queue.run())
+
+    assert all(1 <= stats['running'] <= 2 for stats in seen)
+    assert queue.stats() == {
+        'queued': 0,
+        'running': 0,
+        'done': 4,
+        'failed': 0,
+        'total': 4,
+    }
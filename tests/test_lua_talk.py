@@ -0,0 +1,25 @@
+from src.pjsk import parse_lua_talk
+
+
+def test_labels_and_unescape():
+    lua = '\n'.join(
+        [
+            'text("before any label")',
+            'label("Ichika")',
+            r'text("line\none")',
+            r'text("say \"hi\" \\ ok")',
+            'label("Saki")',
+            r'text("keep \t as is")',
+        ]
+    )
+    assert parse_lua_talk(lua, 'cn') == '\n'.join(
+        [
+            'Ichika：line one',
+            'Ichika：say "hi" \\ ok',
+            r'Saki：keep \t as is',
+        ]
+    )
+
+
+def test_english_colon():
+    assert parse_lua_talk('label("A") text("b")', 'en') == 'A: b'
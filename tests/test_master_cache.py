@@ -0,0 +1,68 @@
+import asyncio
+
+import src.util as util
+
+
+class FakeFetcher(util.Base_fetcher):
+    def __init__(self, lang: str | None = None, force_online: bool = False) -> None:
+        super().__init__('', False, False, False, False, force_online)
+        if lang is not None:
+            self.lang = lang
+        self.fetched: list[str] = []
+        self.fail = False
+
+    async def fetch_url_json(self, url, **kwargs):  # type: ignore[override]
+        self.fetched.append(url)
+        if self.fail:
+            return f'ERROR: Fetch json error || url: {url}'
+        return {'url': url, 'force_online': kwargs['force_online']}
+
+
+def test_master_key_uses_path_and_lang():
+    util.MasterCache.clear()
+    multi, jp, cn = FakeFetcher(), FakeFetcher('jp'), FakeFetcher('cn')
+
+    async def run():
+        return await asyncio.gather(
+            multi.fetch_master_json('https://example.com/api/events/all.5.json'),
+            multi.fetch_master_json('https://example.com/api/cards/all.5.json'),
+            multi.fetch_master_json('https://example.com/api/cards/all.5.json'),
+            jp.fetch_master_json('https://example.com/master/cards.json'),
+            cn.fetch_master_json('https://example.com/master/cards.json'),
+        )
+
+    events, cards, cards_again, _, _ = asyncio.run(run())
+    assert events != cards and cards is cards_again
+    assert len(multi.fetched) == 2
+    assert jp.fetched and cn.fetched
+    assert set(key[1] for key in util.MasterCache._tasks) == {'all', 'jp', 'cn'}
+    util.MasterCache.clear()
+
+
+def test_failed_fetch_is_not_cached():
+    util.MasterCache.clear()
+    fetcher, other = FakeFetcher('jp'), FakeFetcher('jp')
+    url = 'https://example.com/master/events.json'
+    fetcher.fail = True
+
+    result = asyncio.run(fetcher.fetch_master_json(url))
+    assert isinstance(result, str) and result.startswith('ERROR')
+    assert asyncio.run(other.fetch_master_json(url))['url'] == url
+    assert len(other.fetched) == 1
+    util.MasterCache.clear()
+
+
+def test_force_online_readers_do_not_share():
+    util.MasterCache.clear()
+    offline, online = FakeFetcher('jp'), FakeFetcher('jp', force_online=True)
+    url = 'https://example.com/master/events.json'
+
+    async def run():
+        return await asyncio.gather(
+            offline.fetch_master_json(url), online.fetch_master_json(url)
+        )
+
+    from_offline, from_online = asyncio.run(run())
+    assert not from_offline['force_online'] and from_online['force_online']
+    assert len(offline.fetched) == len(online.fetched) == 1
+    util.MasterCache.clear()
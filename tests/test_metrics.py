@@ -0,0 +1,106 @@
+import json, re
+
+import pytest
+
+import src.util as util
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    util.Metrics.clear()
+    yield
+    util.Metrics.clear()
+
+
+def parse_prometheus(text: str) -> tuple[dict[str, str], list[tuple]]:
+    """返回 ({名称: 类型}, [(样本名, 标签, 值)])；格式不符时断言失败。"""
+    types: dict[str, str] = {}
+    samples = []
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            assert name not in types
+            types[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        samples.append((name, dict(LABEL.findall(labels or '')), float(value)))
+    return types, samples
+
+
+def record() -> None:
+    util.Metrics.inc('http_requests_total', host='a.example.com', status=200)
+    util.Metrics.inc('http_requests_total', host='a.example.com', status=200)
+    util.Metrics.inc('http_requests_total', 3, host='b.example.com', status=404)
+    util.Metrics.inc('legacy_retries', reason='5"03')
+    for seconds in (0.0005, 0.001, 0.3, 100.0):
+        util.Metrics.observe('http_request_seconds', seconds, host='a.example.com')
+
+
+def test_counters_and_histogram_buckets():
+    record()
+    report = util.Metrics.report()
+    counters = {
+        (c['name'], c['labels'].get('host')): c['value'] for c in report['counters']
+    }
+    assert counters[('http_requests_total', 'a.example.com')] == 2
+    assert counters[('http_requests_total', 'b.example.com')] == 3
+
+    (hist,) = report['histograms']
+    assert hist['count'] == 4 and hist['max'] == 100.0
+    assert hist['buckets']['0.001'] == 2  # 上界含边界值
+    assert hist['buckets']['0.5'] == 1
+    assert hist['buckets']['+Inf'] == 1
+    assert sum(hist['buckets'].values()) == 4
+
+
+def test_timer_records_on_exception():
+    with pytest.raises(ValueError):
+        with util.Metrics.timer('story_parse_seconds', getter='Event'):
+            raise ValueError
+    (hist,) = util.Metrics.report()['histograms']
+    assert hist['name'] == 'story_parse_seconds' and hist['count'] == 1
+
+
+def test_prometheus_text():
+    record()
+    types, samples = parse_prometheus(util.Metrics.prometheus_text())
+    assert types == {
+        'http_requests_total': 'counter',
+        'legacy_retries_total': 'counter',
+        'http_request_seconds': 'histogram',
+    }
+    for name, _, _ in samples:
+        base = re.sub(r'_(bucket|sum|count)$', '', name)
+        assert name in types or types.get(base) == 'histogram', name
+
+    assert ('legacy_retries_total', {'reason': '5\\"03'}, 1.0) in samples
+    buckets = [
+        (labels['le'], value)
+        for name, labels, value in samples
+        if name == 'http_request_seconds_bucket'
+    ]
+    assert buckets[0] == ('0.001', 2.0)
+    assert buckets[-1] == ('+Inf', 4.0)
+    assert [v for _, v in buckets] == sorted(v for _, v in buckets)  # 累计
+    assert ('http_request_seconds_count', {'host': 'a.example.com'}, 4.0) in samples
+
+
+def test_write_report(tmp_path):
+    record()
+    util.Metrics.write_report(
+        str(tmp_path / 'metrics.json'), str(tmp_path / 'metrics.prom')
+    )
+    with open(tmp_path / 'metrics.json', encoding='utf-8') as f:
+        report = json.load(f)
+    assert {c['name'] for c in report['counters']} == {
+        'http_requests_total',
+        'legacy_retries',
+    }
+    assert report['elapsed_seconds'] >= 0
+    with open(tmp_path / 'metrics.prom', encoding='utf-8') as f:
+        assert f.read() == util.Metrics.prometheus_text()
@@ -0,0 +1,45 @@
+import aiohttp
+
+import src.util as util
+
+A = 'https://a.example.com/x.json'
+B = 'https://b.example.com/x.json'
+
+
+def error(status: int) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(None, (), status=status)  # type: ignore[arg-type]
+
+
+def test_breaker_opens_after_consecutive_failures():
+    for _ in range(util.MirrorHealth._failure_threshold - 1):
+        util.MirrorHealth.record_error(A, error(503))
+    assert not util.MirrorHealth.is_open(A)
+    util.MirrorHealth.record_error(A, error(503))
+    assert util.MirrorHealth.is_open(A)
+    assert util.MirrorHealth.order([A, B]) == [B, A]
+    assert util.MirrorHealth.hedge_target([A, B]) == B
+
+
+def test_missing_resource_is_not_a_mirror_failure():
+    for _ in range(util.MirrorHealth._failure_threshold * 2):
+        util.MirrorHealth.record_error(A, error(404))
+    assert not util.MirrorHealth.is_open(A)
+
+
+def test_success_resets_failures_and_order_follows_score():
+    for _ in range(util.MirrorHealth._failure_threshold - 1):
+        util.MirrorHealth.record_error(A, error(503))
+    util.MirrorHealth.record_success(A, 0.1)
+    util.MirrorHealth.record_error(A, error(503))
+    assert not util.MirrorHealth.is_open(A)
+
+    util.MirrorHealth.record_success(B, 0.1)
+    assert util.MirrorHealth.order([A, B]) == [B, A]
+
+
+def test_hedge_delay_needs_samples():
+    for i in range(util.MirrorHealth._hedge_min_samples - 1):
+        util.MirrorHealth.record_success(A, 0.01 * (i + 1))
+    assert util.MirrorHealth.hedge_delay(A) is None
+    util.MirrorHealth.record_success(A, 1.0)
+    assert util.MirrorHealth.hedge_delay(A) == 1.0
@@ -0,0 +1,62 @@
+import json, time
+
+import src.util as util
+
+from .conftest import fetch
+
+
+def test_missing_asset_is_not_requested_again(tmp_path, mirror):
+    mirror.status('gone.asset', 404)
+    util.NegativeCache.load(str(tmp_path / 'negative.json'))
+
+    first = fetch(mirror.url('gone.asset'), str(tmp_path / 'assets'))
+    assert isinstance(first, str) and first.startswith('ERROR')
+    assert mirror.hits == ['gone.asset']
+
+    second = fetch(mirror.url('gone.asset'), str(tmp_path / 'assets'))
+    assert 'known missing' in second
+    assert mirror.hits == ['gone.asset']
+
+
+def test_transient_error_is_not_recorded(tmp_path, mirror):
+    mirror.status('busy.asset', 503)
+    util.NegativeCache.load(str(tmp_path / 'negative.json'))
+
+    fetch(mirror.url('busy.asset'), str(tmp_path / 'assets'), max_retries=1)
+    assert util.NegativeCache.stats()['entries'] == 0
+
+
+def test_recheck_interval_grows_and_success_clears(tmp_path, mirror):
+    url = mirror.url('later.asset')
+    mirror.status('later.asset', 404)
+    path = str(tmp_path / 'negative.json')
+    util.NegativeCache.load(path)
+    fetch(url, str(tmp_path / 'assets'))
+
+    entry = util.NegativeCache._entries[url]
+    base = util.NegativeCache.RECHECK_BASE
+    entry['last_checked'] -= base + 1  # 第一次复查时间已过
+    fetch(url, str(tmp_path / 'assets'))
+    assert len(mirror.hits) == 2
+    assert entry['checks'] == 2
+    entry['last_checked'] -= base + 1  # 第二次间隔翻倍，尚未到期
+    assert util.NegativeCache.lookup([url]) is not None
+
+    util.NegativeCache.save()
+    util.NegativeCache.load(path)
+    assert util.NegativeCache._entries[url]['checks'] == 2
+
+    util.NegativeCache._entries[url]['last_checked'] = int(time.time()) - 4 * base
+    mirror.json('later.asset', {'ok': True})
+    assert fetch(url, str(tmp_path / 'assets')) == {'ok': True}
+    assert url not in util.NegativeCache._entries
+    util.NegativeCache.save()
+    with open(path, encoding='utf8') as f:
+        assert json.load(f) == {'entries': {}}
+
+
+def test_disabled_without_load(tmp_path, mirror):
+    mirror.status('gone.asset', 404)
+    fetch(mirror.url('gone.asset'), str(tmp_path / 'assets'))
+    fetch(mirror.url('gone.asset'), str(tmp_path / 'assets'))
+    assert mirror.hits == ['gone.asset', 'gone.asset']
@@ -0,0 +1,62 @@
+import asyncio, functools, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import src.util as util
+from src import bang, pjsk
+
+from .test_story_render import BANG, PJSK
+
+
+@pytest.fixture(autouse=True)
+def spawn_workers(monkeypatch):
+    # spawn 时 factory 与快照须经 pickle 传给 worker，与 fork 相比检查更严格
+    monkeypatch.setattr(
+        util,
+        'ProcessPoolExecutor',
+        functools.partial(
+            ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn')
+        ),
+    )
+
+
+def test_pjsk_pool_matches_in_process():
+    reader = pjsk.Story_reader(
+        lang='jp', online=False, mark_lang='en', debug_parse=True, cg_add_link=False
+    )
+    reader.gameCharacters = PJSK['gameCharacters']
+    reader.character2ds = PJSK['character2ds']
+    reader.gameCharacters_lookup = util.MasterCache.lookup(reader.gameCharacters, 'id')
+    reader.character2ds_lookup = util.MasterCache.lookup(reader.character2ds, 'id')
+    expected = [reader.read_story_in_json(story) for story in PJSK['scenarios']]
+
+    async def run() -> list[str]:
+        return [await reader.render_story(story) for story in PJSK['scenarios']]
+
+    reader.start_parse_pool(1)
+    try:
+        assert asyncio.run(run()) == expected
+    finally:
+        reader.close_parse_pool()
+
+
+def test_bang_pool_matches_in_process():
+    reader = bang.Story_reader(online=False, debug_parse=True)
+    reader.characters_json = BANG['characters']
+    expected = [
+        reader.read_story_in_json(story, 'cn', 'en', False)
+        for story in BANG['scenarios']
+    ]
+
+    async def run() -> list[str]:
+        return [
+            await reader.render_story(story, 'cn', 'en', False)
+            for story in BANG['scenarios']
+        ]
+
+    reader.start_parse_pool(1)
+    try:
+        assert asyncio.run(run()) == expected
+    finally:
+        reader.close_parse_pool()
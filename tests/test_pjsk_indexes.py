@@ -0,0 +1,160 @@
+import asyncio, os
+
+from src import pjsk, util
+
+from .test_story_render import PJSK
+
+AREAS = [{'id': 1, 'name': '教室'}, {'id': 12, 'name': '屋上', 'subName': '夜'}]
+
+
+def action(id: int, area_id: int = 1, **fields) -> dict:
+    return {'id': id, 'areaId': area_id, 'releaseConditionId': 1, **fields}
+
+
+ACTION_SETS = [
+    action(1, scenarioId='areatalk_ev_1', releaseConditionId=100100),
+    action(2),  # 没有对话
+    action(3, 12, scenarioId='areatalk_lim_1', actionSetType='limited'),
+    action(4, scenarioId='areatalk_aprilfool2022_1', releaseConditionId=5),
+    action(5, scenarioId='areatalk_g1', actionSetType='normal', isNextGrade=False),
+    action(7, scenarioId='areatalk_g2', actionSetType='normal', isNextGrade=True),
+    action(8, scenarioId='areatalk_th', releaseConditionId=2000001),
+    action(9, 12, scenarioId='areatalk_lim_2', actionSetType='limited'),
+    action(10, scenarioId='areatalk_ev_2', releaseConditionId=100105),
+    action(2373, scenarioId='areatalk_mzk5', releaseConditionId=3),
+]
+
+GROUPS = [
+    {'id': 1, 'gameCharacterUnitId1': 1},
+    {'id': 2, 'gameCharacterUnitId1': 1, 'gameCharacterUnitId2': 2},
+    {'id': 3, 'gameCharacterUnitId1': 3, 'gameCharacterUnitId2': 3},
+    {'id': 4, 'gameCharacterUnitId1': 2, 'gameCharacterUnitId3': 5},
+]
+
+
+def talk(id: int, group_id: int, lua: str) -> dict:
+    return {
+        'id': id,
+        'mysekaiGameCharacterUnitGroupId': group_id,
+        'mysekaiCharacterTalkConditionGroupId': 1,
+        'characterArchiveMysekaiCharacterTalkGroupId': id,
+        'assetbundleName': 'ab',
+        'lua': lua,
+    }
+
+
+TALKS = [
+    talk(10, 2, 'a'),
+    talk(11, 1, 'b'),
+    talk(12, 3, 'c'),
+    talk(10, 4, 'duplicate id'),
+    talk(13, 4, 'd'),
+    talk(14, 2, 'e'),
+]
+
+MASTERS = {
+    'areas': AREAS,
+    'actionSets': ACTION_SETS,
+    'mysekaiCharacterTalks': TALKS,
+    'mysekaiGameCharacterUnitGroups': GROUPS,
+}
+
+
+class FixtureMasters:
+    async def fetch_master_json(self, url, **kwargs):
+        name = os.path.basename(url[0]).removesuffix('.json')
+        return MASTERS.get(name, [])
+
+
+class Area_talk_getter(FixtureMasters, pjsk.Area_talk_getter):
+    pass
+
+
+class Mysekai_talk_getter(FixtureMasters, pjsk.Mysekai_talk_getter):
+    pass
+
+
+def area_getter(tmp_path) -> Area_talk_getter:
+    reader = pjsk.Story_reader(online=False)
+    reader.gameCharacters = PJSK['gameCharacters']
+    reader.character2ds = PJSK['character2ds']
+    reader.gameCharacters_lookup = util.MasterCache.lookup(reader.gameCharacters, 'id')
+    reader.character2ds_lookup = util.MasterCache.lookup(reader.character2ds, 'id')
+    getter = Area_talk_getter(reader, save_dir=str(tmp_path / 'area'), online=False)
+    asyncio.run(getter.init())
+    return getter
+
+
+def test_area_category_index_matches_linear_scan(tmp_path):
+    getter = area_getter(tmp_path)
+    category = getter._Area_talk_getter__get_category
+
+    scanned = {category(a) for a in ACTION_SETS} - {''}
+    assert getter.tell_categories() == scanned
+    assert scanned == {
+        2,
+        145,
+        'limited_12',
+        'aprilfool2022',
+        'grade1',
+        'grade2',
+        'theater',
+    }
+    for cate in [*scanned, 999]:
+        assert getter.category_actions.get(cate, []) == [
+            a for a in ACTION_SETS if category(a) == cate
+        ]
+    assert getter.actionSets_categories == [category(a) for a in ACTION_SETS]
+
+
+def test_area_id_range_skips_missing_ids(tmp_path, monkeypatch):
+    getter = area_getter(tmp_path)
+    requested = []
+
+    async def get(target):
+        requested.append(target)
+
+    monkeypatch.setattr(getter, 'get', get)
+    asyncio.run(getter.get_id_range(2, 8))  # 2 没有对话，6 不存在
+    assert sorted(requested) == ['aprilfool2022', 'grade1', 'grade2', 'limited_12']
+
+
+def test_limited_talk_uses_area_name(tmp_path, monkeypatch):
+    getter = area_getter(tmp_path)
+    story = PJSK['scenarios'][0]
+
+    async def fetch_url_json(urls, *args, **kwargs):
+        return story
+
+    monkeypatch.setattr(getter, 'fetch_url_json', fetch_url_json)
+    asyncio.run(getter.get('limited_12'))
+
+    (filename,) = os.listdir(tmp_path / 'area')
+    assert filename == 'talk_limited_12 屋上.txt'
+    with open(tmp_path / 'area' / filename, encoding='utf-8') as f:
+        text = f.read()
+    story_text = getter.reader.read_story_in_json(story)
+    assert text == (
+        f'1 3:areatalk_lim_1\n\n【屋上 - 夜】\n\n{story_text}\n\n\n'
+        f'2 9:areatalk_lim_2\n\n【屋上 - 夜】\n\n{story_text}\n\n\n'
+    )
+
+
+def test_mysekai_indexes_match_linear_scan():
+    reader = pjsk.Story_reader(online=False)
+    getter = Mysekai_talk_getter(reader, online=False)
+    asyncio.run(getter.init())
+
+    def units(t: dict) -> list[int]:
+        group = next(
+            g for g in GROUPS if g['id'] == t['mysekaiGameCharacterUnitGroupId']
+        )
+        return [group[k] for k in sorted(group) if k != 'id']
+
+    for chara in (1, 2, 3, 4, 5):
+        assert getter.chara_talks.get(chara, []) == [
+            t for t in TALKS if chara in units(t)
+        ]
+    for talk_id in (10, 11, 12, 13, 14, 99):
+        first = next((t for t in TALKS if t['id'] == talk_id), None)
+        assert getter.talks_by_id.get(talk_id) is first
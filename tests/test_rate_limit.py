@@ -0,0 +1,52 @@
+import asyncio
+
+import src.util as util
+
+URL = 'https://limited.example.com/a.json'
+
+
+def test_gcra_spaces_requests(monkeypatch):
+    monkeypatch.setattr(util.RateLimit, '_qps_config', {'limited': 2.0})
+    bucket = util._HostBucket(2.0, 8.0)
+    assert bucket.reserve(100.0, 1) == 0.0
+    assert bucket.reserve(100.0, 1) == 0.5
+    assert bucket.reserve(100.0, 1) == 1.0
+    # 空闲后不会积攒超过 burst 的令牌
+    assert bucket.reserve(200.0, 1) == 0.0
+    assert bucket.reserve(200.0, 1) == 0.5
+    assert util.RateLimit.interval_for('limited.example.com') == 0.5
+
+
+def test_aimd(monkeypatch):
+    monkeypatch.setattr(util.RateLimit, '_qps_config', {'limited': 2.0})
+
+    async def run() -> None:
+        await util.RateLimit.wait(URL)
+        bucket = util.RateLimit._buckets['limited.example.com']
+        for _ in range(100):
+            util.RateLimit.on_success(URL)
+        assert bucket.qps == bucket.max_qps == 8.0
+
+        loop_time = asyncio.get_running_loop().time()
+        util.RateLimit.on_rate_limited(URL, '30')
+        assert bucket.qps == 4.0
+        assert bucket.tat >= loop_time + 30
+        for _ in range(10):
+            util.RateLimit.on_rate_limited(URL, None)
+        assert bucket.qps == util.RateLimit._min_qps
+
+    asyncio.run(run())
+
+
+def test_unlimited_host_starts_limiting_on_429(monkeypatch):
+    monkeypatch.setattr(util.RateLimit, '_qps_config', {})
+    monkeypatch.setattr(util.RateLimit, '_default_qps', None)
+
+    async def run() -> None:
+        await util.RateLimit.wait(URL)
+        assert util.RateLimit.rates() == {}
+        util.RateLimit.on_rate_limited(URL, None)
+        qps = util.RateLimit._unlimited_429_qps * util.RateLimit._decrease_factor
+        assert util.RateLimit.rates()['limited.example.com']['qps'] == qps
+
+    asyncio.run(run())
@@ -0,0 +1,80 @@
+import os
+
+import src.util as util
+
+from .conftest import fetch
+
+
+def saved_paths(tmp_path, mirror) -> tuple[str, str]:
+    save_path = util.get_save_path(
+        mirror.url('master.json'), str(tmp_path / 'assets'), None, True
+    )
+    return save_path, save_path + util.VALIDATORS_SUFFIX
+
+
+def test_not_modified_serves_local_copy(tmp_path, mirror):
+    mirror.etag('master.json', {'v': 1}, '"1"')
+    save_dir = str(tmp_path / 'assets')
+    assert fetch(
+        mirror.url('master.json'), save_dir, compress=True, revalidate=True
+    ) == {'v': 1}
+    # 服务器改为只认 ETag 的 304，内容若被重新下载会不同
+    mirror.etag('master.json', {'v': 'stale'}, '"1"')
+    assert fetch(
+        mirror.url('master.json'), save_dir, compress=True, revalidate=True
+    ) == {'v': 1}
+    assert mirror.conditional == [False, True]
+
+
+def test_new_etag_rewrites_file_and_validators(tmp_path, mirror):
+    save_path, validators_path = saved_paths(tmp_path, mirror)
+    save_dir = str(tmp_path / 'assets')
+    mirror.etag('master.json', {'v': 1}, '"1"')
+    fetch(mirror.url('master.json'), save_dir, compress=True, revalidate=True)
+
+    mirror.etag('master.json', {'v': 2}, '"2"')
+    assert fetch(
+        mirror.url('master.json'), save_dir, compress=True, revalidate=True
+    ) == {'v': 2}
+    assert util.load_validators(save_path, mirror.url('master.json')) == {
+        'If-None-Match': '"2"'
+    }
+    assert os.path.exists(validators_path)
+
+
+def test_not_modified_with_unreadable_copy_refetches(tmp_path, mirror):
+    save_path, validators_path = saved_paths(tmp_path, mirror)
+    save_dir = str(tmp_path / 'assets')
+    mirror.etag('master.json', {'v': 1}, '"1"')
+    fetch(mirror.url('master.json'), save_dir, compress=True, revalidate=True)
+
+    with open(save_path, 'wb') as f:
+        f.write(b'not brotli')
+    assert fetch(
+        mirror.url('master.json'), save_dir, compress=True, revalidate=True
+    ) == {'v': 1}
+    assert mirror.conditional == [False, True, False]
+    assert util.load_validators(save_path, mirror.url('master.json')) == {
+        'If-None-Match': '"1"'
+    }
+
+
+def test_not_modified_with_missing_copy_refetches(tmp_path, mirror, monkeypatch):
+    save_path, validators_path = saved_paths(tmp_path, mirror)
+    save_dir = str(tmp_path / 'assets')
+    mirror.etag('master.json', {'v': 1}, '"1"')
+    fetch(mirror.url('master.json'), save_dir, compress=True, revalidate=True)
+
+    # 校验头读出后、读取本地副本前文件被删掉
+    load_validators = util.load_validators
+
+    def load_then_delete(path: str, url: str) -> dict[str, str]:
+        headers = load_validators(path, url)
+        util.delete_path(path)
+        return headers
+
+    monkeypatch.setattr(util, 'load_validators', load_then_delete)
+    assert fetch(
+        mirror.url('master.json'), save_dir, compress=True, revalidate=True
+    ) == {'v': 1}
+    assert mirror.conditional == [False, True, False]
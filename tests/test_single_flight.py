@@ -0,0 +1,74 @@
+import asyncio
+
+import src.util as util
+
+
+def fetch_many(mirror, save_dir: str, messages: list[str], **kwargs) -> list:
+    async def run() -> list:
+        async with util.Connections.create_session(4) as session:
+            return await asyncio.gather(
+                *[
+                    util.fetch_url_json(
+                        mirror.url('story.asset'),
+                        True,
+                        True,
+                        save_dir,
+                        False,
+                        extra_record_msg=message,
+                        session=session,
+                        **kwargs,
+                    )
+                    for message in messages
+                ]
+            )
+
+    return asyncio.run(run())
+
+
+def test_concurrent_fetches_share_one_request_and_write(tmp_path, mirror):
+    mirror.json('story.asset', {'Snippets': [1]})
+    written = util.FileWrites.written
+
+    results = fetch_many(mirror, str(tmp_path / 'assets'), ['a', 'b', 'c', 'd'])
+    assert results == [{'Snippets': [1]}] * 4
+    assert results[0] is results[1]
+    assert mirror.hits == ['story.asset']
+    assert util.FileWrites.written == written + 1
+    assert util._inflight_fetches == {}
+
+
+def test_error_log_keeps_every_callers_message(tmp_path, mirror):
+    mirror.status('story.asset', 404)
+    results = fetch_many(mirror, str(tmp_path / 'assets'), ['event 1', 'event 2'])
+    assert all(result.startswith('ERROR') for result in results)
+    assert mirror.hits == ['story.asset']
+
+    util.AssetLog.flush()
+    with open('assets_error.log', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert [line.rsplit(' || message: ', 1)[1] for line in lines] == [
+        'event 1',
+        'event 2',
+    ]
+
+
+def test_missing_log_keeps_every_callers_message(tmp_path):
+    async def run() -> list:
+        return await asyncio.gather(
+            *[
+                util.fetch_url_json(
+                    'https://example.com/story.asset',
+                    False,
+                    False,
+                    str(tmp_path / 'assets'),
+                    False,
+                    extra_record_msg=message,
+                )
+                for message in ('card 1', 'card 2')
+            ]
+        )
+
+    assert asyncio.run(run()) == [util.MISSING_MSG] * 2
+    util.AssetLog.flush()
+    with open('assets_missing.log', encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 2
@@ -0,0 +1,55 @@
+"""
+Story_renderer 与引入前的 read_story_in_json 逐字节一致。
+
+fixtures 中的 expected 由 Story_renderer 引入前的 src/pjsk.py、src/bang.py
+渲染得到（misc/bench_story_render.py 的合成剧情，覆盖各类特效与角色名分支）。
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+import src.util as util
+from src import bang, pjsk
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+def load(name: str) -> dict:
+    with open(FIXTURES / name, encoding='utf-8') as f:
+        return json.load(f)
+
+
+PJSK = load('pjsk_story.json')
+BANG = load('bang_story.json')
+
+
+@pytest.mark.parametrize('options', sorted(PJSK['expected']))
+def test_pjsk_render_matches_baseline(options):
+    mark_lang, debug_parse, cg_add_link = options.split()
+    reader = pjsk.Story_reader(
+        online=False,
+        mark_lang=mark_lang,
+        debug_parse=debug_parse == 'debug=True',
+        cg_add_link=cg_add_link == 'cg_link=True',
+    )
+    reader.gameCharacters = PJSK['gameCharacters']
+    reader.character2ds = PJSK['character2ds']
+    reader.gameCharacters_lookup = util.MasterCache.lookup(reader.gameCharacters, 'id')
+    reader.character2ds_lookup = util.MasterCache.lookup(reader.character2ds, 'id')
+
+    rendered = [reader.read_story_in_json(story) for story in PJSK['scenarios']]
+    assert rendered == PJSK['expected'][options]
+
+
+@pytest.mark.parametrize('options', sorted(BANG['expected']))
+def test_bang_render_matches_baseline(options):
+    mark_lang, debug_parse = options.split()
+    reader = bang.Story_reader(online=False, debug_parse=debug_parse == 'debug=True')
+    reader.characters_json = BANG['characters']
+
+    rendered = [
+        reader.read_story_in_json(story, 'cn', mark_lang) for story in BANG['scenarios']
+    ]
+    assert rendered == BANG['expected'][options]